@@ -2,25 +2,81 @@ import tkinter as tk
 from tkinter import ttk, messagebox
 import random
 import uuid
+from config import settings
 from container import Container
+from gui_worker import BackgroundWorker
 from library.book import Book
 from library.user import User
+from virtual_list import ListSource, VirtualTreeview
 
 # Налаштування DI-контейнера
 container = Container()
 container.config.storage.backend.from_env('STORAGE_BACKEND', 'sqlite')
 container.config.storage.db_path.from_env('DB_PATH', 'library.db')
+container.config.storage.pool_size.from_env('DB_POOL_SIZE', 5, as_=int)
+# Для бекенду sqlite_cached: розмір LRU-кешу та TTL записів (секунди)
+container.config.storage.cache_size.from_env('CACHE_SIZE', 1024, as_=int)
+container.config.storage.cache_ttl.from_env('CACHE_TTL', 300.0, as_=float)
+# Доставка подій спостерігачам: sync — в потоці операції, async — у фоні з об'єднанням пачок
+container.config.events.mode.from_env('EVENT_BUS', 'sync')
+container.config.events.coalesce_ms.from_env('EVENT_COALESCE_MS', 50.0, as_=float)
 service = container.library_service()
 
+# Колонки списків: (атрибут моделі = колонка сортування, заголовок, ширина)
+BOOK_COLUMNS = [
+    ("title", "Назва", 220),
+    ("author", "Автор", 150),
+    ("year", "Рік", 50),
+    ("genre", "Жанр", 100),
+    ("isbn", "ISBN", 120),
+    ("available", "Статус", 130),
+]
+# Події сервісу, що змінюють один рядок каталогу, і вид зміни
+BOOK_EVENTS = {
+    'book_added': 'added',
+    'books_added': 'added',
+    'book_removed': 'removed',
+    'book_updated': 'updated',
+    'book_issued': 'updated',
+    'book_returned': 'updated',
+}
+# Зміни накопичуються протягом кадру (мс) і застосовуються разом
+FRAME_MS = 16
+# Більше змін за кадр — дешевше перечитати видиме вікно, ніж латати рядки по одному
+MAX_ROW_PATCHES = 200
+USER_COLUMNS = [
+    ("user_id", "ID", 90),
+    ("first_name", "Ім'я", 150),
+    ("last_name", "Прізвище", 150),
+    ("email", "Email", 250),
+]
+
 class LibraryGUI(tk.Tk):
     def __init__(self):
         super().__init__()
         self.title("Library Manager")
         self.geometry("850x500")
 
+        # Запити до бази виконуються у фоні, щоб вікно не зависало
+        self.worker = BackgroundWorker(self, on_busy_change=self._set_busy)
+        # Зміни каталогу з подій сервісу, ще не застосовані до списку
+        self._book_changes = {}
+        self._books_stale = False
+        self._flush_id = None
+
         # Observer pattern: підписуємо GUI на події сервісу
         service.register_observer(self)
 
+        # Рядок стану з індикатором фонової роботи
+        status_bar = ttk.Frame(self)
+        status_bar.pack(side="bottom", fill="x")
+        self.status_label = ttk.Label(status_bar, text="")
+        self.status_label.pack(side="left", padx=5)
+        self.progress = ttk.Progressbar(status_bar, mode="indeterminate", length=120)
+        self.progress.pack(side="right", padx=5, pady=2)
+        self.stats_label = ttk.Label(status_bar, text="")
+        self.stats_label.pack(side="right", padx=10)
+
         # Створюємо вкладки
         tabs = ttk.Notebook(self)
         self.tab_books = ttk.Frame(tabs)
@@ -32,14 +88,87 @@ class LibraryGUI(tk.Tk):
         # Будуємо UI
         self._build_books_tab()
         self._build_users_tab()
+        self._refresh_stats()
 
     def update(self, event: str, data: dict):
         """
         Метод Observer: реагує на події з LibraryService.
-        Наприклад, після додавання або видачі книги автоматично перелічує всі книги.
+        Подія може прийти з фонового потоку, тому обробка переноситься в головний.
         """
-        if event in ('book_added', 'book_removed', 'book_issued', 'book_returned'):
-            self.list_books()
+        self.worker.call_in_main(self._on_service_event, event, data)
+
+    def update_many(self, event: str, items: list):
+        """Пачка однотипних подій від шини (AsyncEventBus) — одним переходом у головний потік"""
+        self.worker.call_in_main(lambda: [self._on_service_event(event, data) for data in items])
+
+    def _on_service_event(self, event: str, data: dict):
+        kind = BOOK_EVENTS.get(event)
+        if kind is None:
+            return
+        if data.get('count', 1) > MAX_ROW_PATCHES:
+            self._books_stale = True
+        else:
+            for isbn in data.get('isbns') or [data['isbn']]:
+                # Додана й одразу видана книга лишається «доданою»
+                if not (kind == 'updated' and self._book_changes.get(isbn) == 'added'):
+                    self._book_changes[isbn] = kind
+        if self._flush_id is None:
+            self._flush_id = self.after(FRAME_MS, self._flush_book_changes)
+
+    def _flush_book_changes(self):
+        """Застосовує накопичені за кадр зміни до каталогу: латки рядків замість перечитування"""
+        self._flush_id = None
+        changes, self._book_changes = self._book_changes, {}
+        stale, self._books_stale = self._books_stale, False
+        self._refresh_stats()
+        if self.books_view.source is not service.books:
+            # Зараз показано результати пошуку — каталог перечитається при наступному показі
+            return
+        if stale or len(changes) > MAX_ROW_PATCHES:
+            self.books_view.refresh()
+            return
+        for isbn, kind in changes.items():
+            if kind == 'removed':
+                self.books_view.remove_key(isbn)
+        fetch = [(isbn, kind) for isbn, kind in changes.items() if kind != 'removed']
+        if fetch:
+            # По одному books.get на змінену книгу, усі — в одному фоновому завданні
+            self.worker.submit(
+                lambda: [(kind, isbn, service.books.get(isbn)) for isbn, kind in fetch],
+                on_success=self._apply_book_changes,
+                on_error=self._show_error,
+            )
+
+    def _apply_book_changes(self, changes):
+        for kind, isbn, book in changes:
+            if book is None:
+                self.books_view.remove_key(isbn)
+            elif kind == 'added':
+                self.books_view.insert_item(book)
+            else:
+                self.books_view.update_item(book)
+
+    def _refresh_stats(self):
+        # Лічильники з підсумкових таблиць: O(1), тож можна оновлювати на кожен кадр змін
+        self.worker.submit(service.library_stats, key="stats", on_success=self._show_stats)
+
+    def _show_stats(self, stats: dict):
+        self.stats_label.config(
+            text=f"Книг: {stats['books']}  Доступно: {stats['available']}  Видано: {stats['active_loans']}"
+        )
+
+    def _set_busy(self, busy: bool):
+        if busy:
+            self.status_label.config(text="Завантаження…")
+            self.progress.start(10)
+            self.config(cursor="watch")
+        else:
+            self.status_label.config(text="")
+            self.progress.stop()
+            self.config(cursor="")
+
+    def _show_error(self, error: BaseException):
+        messagebox.showerror("Помилка", f"Не вдалося: {error}")
 
     def _build_books_tab(self):
         frame = self.tab_books
@@ -58,8 +187,8 @@ class LibraryGUI(tk.Tk):
         ]:
             ttk.Button(toolbar, text=text, command=cmd).pack(side="left", padx=5)
 
-        self.books_list = tk.Text(frame, height=30)
-        self.books_list.pack(fill="both", padx=5, pady=5)
+        self.books_view = VirtualTreeview(frame, self.worker, BOOK_COLUMNS, self._book_row, key="isbn")
+        self.books_view.pack(fill="both", expand=True, padx=5, pady=5)
 
     def _build_users_tab(self):
         frame = self.tab_users
@@ -72,36 +201,49 @@ class LibraryGUI(tk.Tk):
         ]:
             ttk.Button(toolbar, text=text, command=cmd).pack(side="left", padx=5)
 
-        self.users_list = tk.Text(frame, height=25)
-        self.users_list.pack(fill="both", padx=5, pady=5)
+        self.users_view = VirtualTreeview(
+            frame, self.worker, USER_COLUMNS, self._user_row, key="user_id", empty_text="Немає користувачів."
+        )
+        self.users_view.pack(fill="both", expand=True, padx=5, pady=5)
+
+    @staticmethod
+    def _book_row(book: Book) -> tuple:
+        status = "доступна" if book.available else f"видана ({book.issued_to})"
+        return book.title, book.author, book.year, book.genre, book.isbn, status
+
+    @staticmethod
+    def _overdue_row(book: Book) -> tuple:
+        return book.title, book.author, book.year, book.genre, book.isbn, f"ПРОСТРОЧЕНА ({book.issued_to})"
+
+    @staticmethod
+    def _user_row(user: User) -> tuple:
+        return user.user_id, user.first_name, user.last_name, user.email
+
+    def _show_books(self, books, empty_text: str, format_row=None):
+        """Показує готовий список книг (пошук, прострочені) у тому ж віртуалізованому списку"""
+        self.books_view.empty_text = empty_text
+        self.books_view.set_source(ListSource(books), format_row)
 
     def list_books(self):
-        self.books_list.delete("1.0", tk.END)
-        for book in service.books.list_all():
-            status = "доступна" if book.available else f"видана ({book.issued_to})"
-            self.books_list.insert(
-                tk.END,
-                f"- {book.title} ({book.isbn}), {book.author}, {book.year}, {book.genre}, {status}\n"
-            )
+        # З бази читається лише видиме вікно рядків, сортування — в SQL
+        if self.books_view.source is service.books:
+            self.books_view.refresh()
+            return
+        self.books_view.empty_text = ""
+        self.books_view.set_source(service.books)
 
     def list_overdue(self):
-        self.books_list.delete("1.0", tk.END)
-        overdue = service.list_overdue()
-        if not overdue:
-            self.books_list.insert(tk.END, "Немає прострочених книг.")
-            return
-        for isbn in overdue:
-            book = service.books.get(isbn)
-            if book:
-                self.books_list.insert(
-                    tk.END,
-                    f"[ПРОСТРОЧЕНА] {book.title} - {isbn} (видана {book.issued_to})"
-                )
+        self.worker.submit(
+            service.list_overdue,
+            key="books_view",
+            on_success=lambda overdue: self._show_books(overdue, "Немає прострочених книг.", self._overdue_row),
+            on_error=self._show_error,
+        )
 
     def search_books_popup(self):
         popup = tk.Toplevel(self)
         popup.title("Пошук книг")
-        fields = ["Назва", "Автор", "Рік", "Жанр", "ISBN"]
+        fields = ["Назва", "Автор", "Рік", "Жанр", "ISBN", "Ключові слова"]
         entries = {}
         for i, label in enumerate(fields):
             ttk.Label(popup, text=label).grid(row=i, column=0, sticky="e", padx=5, pady=5)
@@ -110,25 +252,25 @@ class LibraryGUI(tk.Tk):
             entries[label] = ent
 
         def submit():
-            crit = {}
-            if entries["Назва"].get():    crit["title"] = entries["Назва"].get()
-            if entries["Автор"].get():   crit["author"] = entries["Автор"].get()
-            if entries["Рік"].get():      crit["year"] = int(entries["Рік"].get())
-            if entries["Жанр"].get():     crit["genre"] = entries["Жанр"].get()
-            if entries["ISBN"].get():     crit["isbn"] = entries["ISBN"].get()
-
-            results = service.search_books(**crit)
-            self.books_list.delete("1.0", tk.END)
-            if not results:
-                self.books_list.insert(tk.END, "Нічого не знайдено.")
+            keywords = entries["Ключові слова"].get().strip()
+            if keywords:
+                # Ранжований повнотекстовий пошук (FTS5) за назвою, автором і жанром
+                query = lambda: service.full_text_search(keywords)
             else:
-                for b in results:
-                    status = "доступна" if b.available else f"видана ({b.issued_to})"
-                    self.books_list.insert(
-                        tk.END,
-                        f"- {b.title} ({b.isbn}), {b.author}, {b.year}, {b.genre}, {status}\n"
-                    )
+                crit = {}
+                if entries["Назва"].get():    crit["title"] = entries["Назва"].get()
+                if entries["Автор"].get():   crit["author"] = entries["Автор"].get()
+                if entries["Рік"].get():      crit["year"] = int(entries["Рік"].get())
+                if entries["Жанр"].get():     crit["genre"] = entries["Жанр"].get()
+                if entries["ISBN"].get():     crit["isbn"] = entries["ISBN"].get()
+                query = lambda: service.search_books(**crit)
             popup.destroy()
+            self.worker.submit(
+                query,
+                key="books_view",
+                on_success=lambda results: self._show_books(results, "Нічого не знайдено."),
+                on_error=self._show_error,
+            )
 
         ttk.Button(popup, text="Пошук", command=submit).grid(row=len(fields), column=0, columnspan=2, pady=10)
 
@@ -144,6 +286,10 @@ class LibraryGUI(tk.Tk):
             entries[label] = ent
         isbn_val = ''.join(str(random.randint(0, 9)) for _ in range(13))
 
+        def on_added(_):
+            messagebox.showinfo("Успіх", "Книгу додано")
+            popup.destroy()
+
         def submit_book():
             try:
                 book = Book(
@@ -153,12 +299,10 @@ class LibraryGUI(tk.Tk):
                     entries["Жанр"].get(),
                     isbn_val
                 )
-                service.add_book(book)
-                messagebox.showinfo("Успіх", "Книгу додано")
-                popup.destroy()
-                self.list_books()
             except Exception as e:
-                messagebox.showerror("Помилка", f"Не вдалося: {e}")
+                self._show_error(e)
+                return
+            self.worker.submit(service.add_book, book, on_success=on_added, on_error=self._show_error)
 
         ttk.Button(popup, text="Додати", command=submit_book).grid(
             row=len(fields), column=0, columnspan=2, pady=10
@@ -171,14 +315,12 @@ class LibraryGUI(tk.Tk):
         ent = ttk.Entry(popup)
         ent.pack(padx=5, pady=5)
 
+        def on_deleted(_):
+            messagebox.showinfo("Успіх", "Книгу видалено")
+            popup.destroy()
+
         def delete_book():
-            try:
-                service.remove_book(ent.get())
-                messagebox.showinfo("Успіх", "Книгу видалено")
-                popup.destroy()
-                self.list_books()
-            except Exception as e:
-                messagebox.showerror("Помилка", f"Не вдалося: {e}")
+            self.worker.submit(service.remove_book, ent.get(), on_success=on_deleted, on_error=self._show_error)
 
         ttk.Button(popup, text="Видалити", command=delete_book).pack(pady=10)
 
@@ -189,15 +331,16 @@ class LibraryGUI(tk.Tk):
         ent = ttk.Entry(popup)
         ent.grid(row=0, column=1, padx=5, pady=5)
 
-        def load_book():
-            book = service.books.get(ent.get())
+        def on_loaded(book):
+            popup.destroy()
             if not book:
                 messagebox.showerror("Помилка", "Книгу не знайдено")
-                popup.destroy()
                 return
-            popup.destroy()
             self._show_book_edit_form(book)
 
+        def load_book():
+            self.worker.submit(service.books.get, ent.get(), on_success=on_loaded, on_error=self._show_error)
+
         ttk.Button(popup, text="Завантажити", command=load_book).grid(
             row=1, column=0, columnspan=2, pady=10
         )
@@ -219,35 +362,27 @@ class LibraryGUI(tk.Tk):
             ent.grid(row=i, column=1, padx=5, pady=5)
             entries[lbl] = ent
 
+        def on_saved(_):
+            messagebox.showinfo("Успіх", "Зміни збережено")
+            popup.destroy()
+
         def save_changes():
             try:
                 book.title = entries["Назва"].get()
                 book.author = entries["Автор"].get()
                 book.year = int(entries["Рік видання"].get())
                 book.genre = entries["Жанр"].get()
-                service.remove_book(book.isbn)
-                service.add_book(book)
-                messagebox.showinfo("Успіх", "Зміни збережено")
-                popup.destroy()
-                self.list_books()
             except Exception as e:
-                messagebox.showerror("Помилка", f"Не вдалося: {e}")
+                self._show_error(e)
+                return
+            self.worker.submit(service.update_book, book, on_success=on_saved, on_error=self._show_error)
 
         ttk.Button(popup, text="Зберегти", command=save_changes).grid(
             row=len(fields), column=0, columnspan=2, pady=10
         )
 
     def list_users(self):
-        self.users_list.delete("1.0", tk.END)
-        users = service.users.list_all()
-        if not users:
-            self.users_list.insert(tk.END, "Немає користувачів.")
-            return
-        for u in users:
-            self.users_list.insert(
-                tk.END,
-                f"- {u.user_id}: {u.first_name} {u.last_name} {u.email} \n"
-            )
+        self.users_view.set_source(service.users)
 
     def add_user_popup(self):
         popup = tk.Toplevel(self)
@@ -261,20 +396,20 @@ class LibraryGUI(tk.Tk):
             entries[label] = ent
 
         def submit_user():
-            try:
-                uid = str(uuid.uuid4())[:8]
-                user = User(
-                    uid,
-                    entries["Ім'я"].get(),
-                    entries["Прізвище"].get(),
-                    entries["Email"].get()
-                )
-                service.register_user(user)
+            uid = str(uuid.uuid4())[:8]
+            user = User(
+                uid,
+                entries["Ім'я"].get(),
+                entries["Прізвище"].get(),
+                entries["Email"].get()
+            )
+
+            def on_registered(_):
                 messagebox.showinfo("Успіх", f"Користувача додано. ID: {uid}")
                 popup.destroy()
                 self.list_users()
-            except Exception as e:
-                messagebox.showerror("Помилка", f"Не вдалося: {e}")
+
+            self.worker.submit(service.register_user, user, on_success=on_registered, on_error=self._show_error)
 
         ttk.Button(popup, text="Додати", command=submit_user).grid(
             row=len(fields), column=0, columnspan=2, pady=10
@@ -292,14 +427,19 @@ class LibraryGUI(tk.Tk):
         user_id_entry = tk.Entry(popup)
         user_id_entry.grid(row=1, column=1, padx=5, pady=5)
 
-        def confirm_issue():
-            success = service.issue_book(isbn_entry.get(), user_id_entry.get())
+        def on_issued(success):
             if success:
                 messagebox.showinfo("Успіх", "Книгу видано успішно")
             else:
                 messagebox.showerror("Помилка", "Неможливо видати книгу")
             popup.destroy()
 
+        def confirm_issue():
+            self.worker.submit(
+                service.issue_book, isbn_entry.get(), user_id_entry.get(),
+                on_success=on_issued, on_error=self._show_error,
+            )
+
         tk.Button(popup, text="Підтвердити", command=confirm_issue).grid(
             row=2, column=0, columnspan=2, pady=10
         )
@@ -316,16 +456,30 @@ class LibraryGUI(tk.Tk):
         user_id_entry = tk.Entry(popup)
         user_id_entry.grid(row=1, column=1, padx=5, pady=5)
 
-        def confirm_return():
-            service.return_book(isbn_entry.get(), user_id_entry.get())
-            messagebox.showinfo("Успіх", "Книгу повернуто")
+        def on_returned(returned):
+            if returned:
+                messagebox.showinfo("Успіх", "Книгу повернуто")
+            else:
+                messagebox.showerror("Помилка", "Ця книга не видавалась цьому користувачу")
             popup.destroy()
 
+        def confirm_return():
+            self.worker.submit(
+                service.return_book, isbn_entry.get(), user_id_entry.get(),
+                on_success=on_returned, on_error=self._show_error,
+            )
+
         tk.Button(popup, text="Підтвердити", command=confirm_return).grid(
             row=2, column=0, columnspan=2, pady=10
         )
 
 
 if __name__ == "__main__":
+    settings.configure_logging()
     app = LibraryGUI()
-    app.mainloop()
+    try:
+        app.mainloop()
+    finally:
+        app.worker.shutdown()
+        # Закриваємо пул з'єднань до бази
+        container.shutdown_resources()
@@ -1,4 +1,12 @@
+import asyncio
+import copy
+import contextlib
+import io
+import json
 import os
+import tempfile
+import threading
+import time
 import unittest
 import sqlite3
 from datetime import date, timedelta
@@ -11,13 +19,22 @@ from repository.sqlite_repository import (
     SQLiteBookRepository,
     SQLiteUserRepository,
     SQLiteLoanRepository,
+    TransactionRolledBack,
 )
 from repository.factory import RepositoryFactory, RepoBundle
+from repository.connection_pool import SQLiteConnectionPool, PoolTimeoutError
+from repository.caching_repository import LRUCache, CachingBookRepository
 from container import Container
+from database import initialize_database, migrate, schema_version, vacuum, MIGRATIONS
+from config import Settings, StorageProfile, STORAGE_PROFILES
 from library.book import Book
 from library.user import User
 from service.library_service import LibraryService
+from service.event_bus import AsyncEventBus, SyncEventBus, coalesce
+from service.async_library_service import AsyncLibraryService
 from Client import LibraryGUI
+from gui_worker import BackgroundWorker, InlineWorker
+from virtual_list import ListSource, VirtualTreeview
 
 
 # -----------------------------------------
@@ -65,6 +82,40 @@ class TestSQLiteBookRepository(unittest.TestCase):
         self.assertEqual(u.times_issued, 7)
         self.assertEqual(u.issue_date, date(2025, 1, 1))
 
+    def test_update_writes_only_dirty_columns(self):
+        self.repo.add(Book("C", "Auth", 2001, "G", "ISBN3"))
+        book = self.repo.get("ISBN3")
+        self.assertEqual(book.dirty_fields, frozenset())
+        statements = []
+        self.conn.set_trace_callback(statements.append)
+        book.title = "C"
+        self.repo.update(book)
+        self.assertEqual(statements, [])
+        book.title = "C2"
+        book.year = 2005
+        self.assertEqual(book.dirty_fields, {"title", "year"})
+        self.repo.update(book)
+        self.conn.set_trace_callback(None)
+        self.assertIn("UPDATE books SET title='C2', year=2005 WHERE isbn='ISBN3'", statements)
+        self.assertEqual(book.dirty_fields, frozenset())
+        self.assertEqual((self.repo.get("ISBN3").title, self.repo.get("ISBN3").author), ("C2", "Auth"))
+
+    def test_loaded_models_are_slotted_and_clean(self):
+        self.repo.add(Book("E", "Auth", 2001, "G", "ISBN5"))
+        book = self.repo.list_all()[0]
+        self.assertIs(type(book), Book)
+        self.assertFalse(hasattr(book, "__dict__"))
+        self.assertFalse(hasattr(User("u", "F", "L", "e"), "__dict__"))
+        self.assertEqual(book.dirty_fields, frozenset())
+        self.assertIs(book.available, True)
+        copied = copy.copy(book)
+        copied.title = "E2"
+        self.assertEqual((book.dirty_fields, copied.dirty_fields), (frozenset(), {"title"}))
+
+    def test_update_inserts_missing_book(self):
+        self.repo.update(Book("D", "Auth", 2001, "G", "ISBN4"))
+        self.assertEqual(self.repo.get("ISBN4").title, "D")
+
     def test_list_all_and_delete(self):
         b1 = Book("X", "A", 2002, "G", "I1")
         b2 = Book("Y", "B", 2003, "G", "I2")
@@ -79,6 +130,87 @@ class TestSQLiteBookRepository(unittest.TestCase):
     def test_get_nonexistent_returns_none(self):
         self.assertIsNone(self.repo.get("NOISBN"))
 
+    def test_add_many_streams_chunks_in_one_transaction(self):
+        statements = []
+        self.conn.set_trace_callback(statements.append)
+        books = (Book(f"T{i}", "A", 2000 + i, "G", f"M{i}") for i in range(5))
+        self.assertEqual(self.repo.add_many(books, chunk_size=2), 5)
+        self.conn.set_trace_callback(None)
+        self.assertEqual(len(self.repo.list_all()), 5)
+        self.assertEqual(self.repo.get("M3").year, 2003)
+        self.assertEqual(sum(1 for st in statements if st.upper() == "COMMIT"), 1)
+
+    def test_search_pushes_criteria_into_sql(self):
+        self.repo.add(Book("Кобзар", "Шевченко", 1840, "Поезія", "S1"))
+        self.repo.add(Book("Python 100%", "Guido", 2020, "Prog", "S2"))
+        self.repo.add(Book("Pythonic", "Guido", 2015, "Prog", "S3"))
+        self.assertEqual([b.isbn for b in self.repo.search({"title": "кобз"})], ["S1"])
+        self.assertEqual([b.isbn for b in self.repo.search({"author": "GUIDO"})], ["S2", "S3"])
+        self.assertEqual([b.isbn for b in self.repo.search({"title": "100%"})], ["S2"])
+        self.assertEqual([b.isbn for b in self.repo.search({"year": (2000, None)})], ["S2", "S3"])
+        self.assertEqual([b.isbn for b in self.repo.search({"available": True}, limit=1, offset=1)], ["S2"])
+        self.assertEqual(self.repo.search({"year": 1999}), [])
+        with self.assertRaises(ValueError):
+            self.repo.search({"publisher": "x"})
+
+    def test_search_rejects_values_of_wrong_type(self):
+        self.repo.add(Book("Kobzar", "Shevchenko", 2000, "Poetry", "Y1"))
+        self.assertEqual([b.isbn for b in self.repo.search({"year": 2000, "available": True})], ["Y1"])
+        self.assertEqual([b.isbn for b in self.repo.search({"issue_date": None})], ["Y1"])
+        # Без перевірки SQLite знайшов би книгу за рядком "2000" через приведення типів
+        for criteria in ({"year": "2000"}, {"available": "1"}, {"year": ("1990", None)},
+                         {"title": 2000}, {"issue_date": "2025-01-01"}):
+            with self.subTest(criteria=criteria), self.assertRaises(ValueError):
+                self.repo.search(criteria)
+
+    def test_iter_all_and_keyset_pages(self):
+        self.repo.add_many(Book(f"T{i}", "A", 2000, "G", f"K{i:02d}") for i in range(7))
+        self.assertEqual(sorted(b.isbn for b in self.repo.iter_all(batch_size=3)),
+                         [f"K{i:02d}" for i in range(7)])
+        pages, after = [], None
+        while True:
+            page = self.repo.page(after_key=after, limit=3)
+            if not page:
+                break
+            pages.append([b.isbn for b in page])
+            after = page[-1].isbn
+        self.assertEqual(pages, [["K00", "K01", "K02"], ["K03", "K04", "K05"], ["K06"]])
+
+    def test_add_many_rejects_bad_chunk_size(self):
+        with self.assertRaises(ValueError):
+            self.repo.add_many([Book("A", "B", 2000, "G", "Z1")], chunk_size=0)
+
+    def test_add_many_rolls_back_when_source_fails(self):
+        def books():
+            for i in range(1200):
+                if i == 1100:
+                    raise ValueError("bad row")
+                yield Book(f"T{i}", "A", 2000, "G", f"F{i}")
+
+        with self.assertRaises(ValueError):
+            self.repo.add_many(books(), chunk_size=500)
+        self.assertFalse(self.conn.in_transaction)
+        # Наступний add() не фіксує залишки перерваної вставки
+        self.repo.add(Book("One", "A", 2000, "G", "ONE"))
+        self.assertEqual(self.repo.count(), 1)
+
+    def test_count_and_sorted_windows(self):
+        self.repo.add_many([
+            Book("B", "A", 2001, "G", "W1"),
+            Book("A", "A", 2003, "G", "W2"),
+            Book("A", "A", 2002, "G", "W3"),
+            Book("C", "A", 2000, "G", "W4"),
+        ])
+        self.assertEqual(self.repo.count(), 4)
+        self.assertEqual([b.isbn for b in self.repo.fetch_window(1, 2)], ["W2", "W3"])
+        # Рівні назви впорядковуються за isbn, вікна не перекриваються
+        self.assertEqual([b.isbn for b in self.repo.fetch_window(0, 2, order_by="title")], ["W2", "W3"])
+        self.assertEqual([b.isbn for b in self.repo.fetch_window(2, 2, order_by="title")], ["W1", "W4"])
+        self.assertEqual([b.year for b in self.repo.fetch_window(0, 4, "year", descending=True)],
+                         [2003, 2002, 2001, 2000])
+        with self.assertRaises(ValueError):
+            self.repo.fetch_window(0, 10, order_by="title; DROP TABLE books")
+
 
 class TestSQLiteUserRepository(unittest.TestCase):
     def setUp(self):
@@ -109,6 +241,40 @@ class TestSQLiteUserRepository(unittest.TestCase):
         self.assertEqual(self.repo.list_all(), [])
         self.assertIsNone(self.repo.get("nouser"))
 
+    def test_iter_all_and_page_users(self):
+        self.repo.add_many(User(f"u{i}", "F", "L", "e") for i in range(4))
+        self.assertEqual(len(list(self.repo.iter_all(batch_size=1))), 4)
+        self.assertEqual([u.user_id for u in self.repo.page("u1", limit=2)], ["u2", "u3"])
+
+    def test_add_many_users(self):
+        users = [User(f"u{i}", "F", "L", f"{i}@e") for i in range(3)]
+        self.assertEqual(self.repo.add_many(users, chunk_size=2), 3)
+        self.assertEqual({u.user_id for u in self.repo.list_all()}, {"u0", "u1", "u2"})
+
+    def test_add_many_users_rolls_back_on_bad_object(self):
+        users = [User(f"u{i}", "F", "L", "e") for i in range(700)] + [object()]
+        with self.assertRaises(AttributeError):
+            self.repo.add_many(users, chunk_size=500)
+        self.repo.add(User("u1000", "F", "L", "e"))
+        self.assertEqual(self.repo.count(), 1)
+
+    def test_count_and_window_users(self):
+        self.repo.add_many([User("u1", "F", "Bond", "e"), User("u2", "F", "Adams", "e")])
+        self.assertEqual(self.repo.count(), 2)
+        self.assertEqual([u.user_id for u in self.repo.fetch_window(0, 10, order_by="last_name")], ["u2", "u1"])
+        self.assertEqual([u.user_id for u in self.repo.fetch_window(1, 1)], ["u2"])
+
+
+class TestListSource(unittest.TestCase):
+    def test_window_sorted_in_memory(self):
+        books = [Book("B", "X", 2001, "G", "1"), Book("A", "X", None, "G", "2"), Book("C", "X", 1999, "G", "3")]
+        source = ListSource(books)
+        self.assertEqual(source.count(), 3)
+        self.assertEqual([b.isbn for b in source.fetch_window(1, 5)], ["2", "3"])
+        self.assertEqual([b.isbn for b in source.fetch_window(0, 2, order_by="title")], ["2", "1"])
+        # Порожні значення — першими, як NULL у SQLite
+        self.assertEqual([b.isbn for b in source.fetch_window(0, 3, order_by="year")], ["2", "3", "1"])
+
 
 class TestSQLiteLoanRepository(unittest.TestCase):
     def setUp(self):
@@ -125,7 +291,9 @@ class TestSQLiteLoanRepository(unittest.TestCase):
             )
         """)
         c.execute("CREATE TABLE issued_books (user_id TEXT, isbn TEXT)")
+        c.execute("CREATE TABLE users (user_id TEXT PRIMARY KEY)")
         c.execute("INSERT INTO books VALUES(?,?,?,?,?)", ("B1", 1, None, None, 0))
+        c.execute("INSERT INTO users VALUES(?)", ("u1",))
         self.conn.commit()
         self.loan = SQLiteLoanRepository(self.conn)
 
@@ -142,6 +310,24 @@ class TestSQLiteLoanRepository(unittest.TestCase):
         self.assertEqual(row["issued_to"], "u1")
         self.assertEqual(row["issue_date"], "2025-01-02")
 
+    def test_issue_is_conditional_and_counts(self):
+        self.assertTrue(self.loan.issue("B1", "u1", "2025-01-02"))
+        # Уже видана, невідомий читач, невідома книга
+        self.assertFalse(self.loan.issue("B1", "u1", "2025-01-03"))
+        self.assertTrue(self.loan.return_book("B1", "u1"))
+        self.assertFalse(self.loan.issue("B1", "ghost", "2025-01-03"))
+        self.assertFalse(self.loan.issue("NOPE", "u1", "2025-01-03"))
+        self.assertTrue(self.loan.issue("B1", "u1", "2025-01-04"))
+        self.assertEqual(self.loan.list_issued(), ["B1"])
+        row = self.conn.execute("SELECT times_issued FROM books WHERE isbn='B1'").fetchone()
+        self.assertEqual(row["times_issued"], 2)
+
+    def test_return_reports_whether_anything_returned(self):
+        self.assertFalse(self.loan.return_book("B1", "u1"))
+        self.loan.issue("B1", "u1", "2025-01-02")
+        self.assertFalse(self.loan.return_book("B1", "other"))
+        self.assertTrue(self.loan.return_book("B1", "u1"))
+
     def test_return_book_clears_issued(self):
         self.loan.issue("B1", "u1", "2025-01-02")
         self.loan.return_book("B1", "u1")
@@ -190,6 +376,838 @@ class TestRepositoryFactoryAndBundle(unittest.TestCase):
         self.assertTrue(callable(b2.loan_repo.issue))
 
 
+class TestSchemaMigrations(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp.name, "legacy.db")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _objects(self, conn, kind):
+        return {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type=?", (kind,))}
+
+    def test_legacy_database_upgrades_in_place(self):
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("CREATE TABLE books (isbn TEXT PRIMARY KEY, title TEXT, author TEXT, year INTEGER, genre TEXT, available INTEGER, issued_to TEXT, issue_date TEXT, times_issued INTEGER)")
+        conn.execute("CREATE TABLE users (user_id TEXT PRIMARY KEY, first_name TEXT, last_name TEXT, email TEXT)")
+        conn.execute("CREATE TABLE issued_books (user_id TEXT, isbn TEXT)")
+        conn.execute("INSERT INTO books VALUES ('L1', 'Legacy', 'Old Author', 1990, 'G', 1, NULL, NULL, 0)")
+        conn.commit()
+        conn.close()
+
+        initialize_database(self.db_path)
+        conn = sqlite3.connect(self.db_path)
+        self.assertEqual(schema_version(conn), MIGRATIONS[-1][0])
+        self.assertTrue({
+            "idx_issued_books_isbn", "idx_issued_books_user", "idx_books_available",
+            "idx_books_issue_date", "idx_books_author", "idx_books_genre",
+        } <= self._objects(conn, "index"))
+        self.assertEqual(conn.execute("SELECT title FROM books").fetchall(), [("Legacy",)])
+        plan = conn.execute(
+            "EXPLAIN QUERY PLAN DELETE FROM issued_books WHERE user_id=? AND isbn=?", ("u", "i")
+        ).fetchall()
+        self.assertIn("idx_issued_books_user", " ".join(row[3] for row in plan))
+        conn.close()
+
+        bundle = RepositoryFactory.create_sqlite(self.db_path)
+        self.assertEqual([b.isbn for b in bundle.book_repo.full_text_search("legacy")], ["L1"])
+        # Підсумкові таблиці заповнено з наявних рядків
+        self.assertEqual((bundle.book_repo.count(), bundle.book_repo.count_available()), (1, 1))
+        bundle.close()
+
+    def test_sort_columns_are_served_by_indexes(self):
+        bundle = RepositoryFactory.create_sqlite(self.db_path)
+        self.addCleanup(bundle.close)
+        conn = bundle.pool.connection()
+        windows = [("books", "isbn", column) for column in ("title", "author", "year", "genre", "available")]
+        windows += [("users", "user_id", column) for column in ("first_name", "last_name", "email")]
+        for table, key, column in windows:
+            with self.subTest(column=column):
+                plan = " ".join(row[3] for row in conn.execute(
+                    f"EXPLAIN QUERY PLAN SELECT * FROM {table} ORDER BY {column} DESC, {key} DESC LIMIT 50 OFFSET 100"
+                ))
+                self.assertNotIn("TEMP B-TREE", plan)
+
+    def test_migrations_are_idempotent(self):
+        initialize_database(self.db_path)
+        initialize_database(self.db_path)
+        conn = sqlite3.connect(self.db_path)
+        self.assertEqual(schema_version(conn), MIGRATIONS[-1][0])
+        conn.close()
+
+
+class TestFullTextSearch(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp.name, "fts.db")
+        self.bundle = RepositoryFactory.create_sqlite(self.db_path)
+        self.repo = self.bundle.book_repo
+        self.repo.add(Book("Kobzar", "Taras Shevchenko", 1840, "Poetry", "F1"))
+        self.repo.add(Book("Poetry of Kyiv", "Lesya Ukrainka", 1900, "Drama", "F2"))
+        self.repo.add(Book("Лісова пісня", "Леся Українка", 1911, "Драма", "F3"))
+
+    def tearDown(self):
+        self.bundle.close()
+        self.tmp.cleanup()
+
+    def test_ranked_prefix_match(self):
+        self.assertTrue(self.repo._fulltext_available())
+        self.assertEqual([b.isbn for b in self.repo.full_text_search("poet")], ["F2", "F1"])
+        self.assertEqual([b.isbn for b in self.repo.full_text_search("лес пісн")], ["F3"])
+        self.assertEqual(self.repo.full_text_search('"*'), [])
+
+    def test_index_follows_replace_update_and_delete(self):
+        self.repo.add(Book("Haidamaky", "Taras Shevchenko", 1841, "Poetry", "F1"))
+        self.assertEqual(self.repo.full_text_search("kobzar"), [])
+        self.assertEqual([b.isbn for b in self.repo.full_text_search("haidam")], ["F1"])
+        self.repo.delete("F1")
+        self.assertEqual(self.repo.full_text_search("taras"), [])
+
+    def test_vacuum_rebuilds_index_after_rowid_change(self):
+        conn = self.bundle.pool.connection()
+        # Так VACUUM може перенумерувати rowid books: тригери FTS про це не знають
+        conn.execute("UPDATE books SET rowid = rowid + 100")
+        conn.commit()
+        self.assertNotEqual([b.isbn for b in self.repo.full_text_search("kobzar")], ["F1"])
+        vacuum(conn)
+        self.assertEqual([b.isbn for b in self.repo.full_text_search("kobzar")], ["F1"])
+        self.assertEqual([b.isbn for b in self.repo.full_text_search("лес пісн")], ["F3"])
+
+    def test_fallback_without_index(self):
+        self.repo._has_fts = False
+        self.assertEqual({b.isbn for b in self.repo.full_text_search("poetry")}, {"F1", "F2"})
+        self.assertEqual([b.isbn for b in self.repo.full_text_search("леся драма")], ["F3"])
+
+
+class TestOverdueQuery(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.bundle = RepositoryFactory.create_sqlite(os.path.join(self.tmp.name, "loans.db"))
+        self.bundle.user_repo.add(User("u1", "F", "L", "e"))
+        for i, day in enumerate(["2025-01-05", "2025-01-01", "2025-03-01"]):
+            self.bundle.book_repo.add(Book(f"T{i}", "A", 2000, "G", f"O{i}"))
+            self.bundle.loan_repo.issue(f"O{i}", "u1", day)
+        self.bundle.book_repo.add(Book("Shelf", "A", 2000, "G", "O9"))
+
+    def tearDown(self):
+        self.bundle.close()
+        self.tmp.cleanup()
+
+    def test_list_overdue_returns_books_oldest_first(self):
+        overdue = self.bundle.loan_repo.list_overdue("2025-02-01")
+        self.assertEqual([b.isbn for b in overdue], ["O1", "O0"])
+        self.assertEqual(overdue[0].issue_date, date(2025, 1, 1))
+        self.assertEqual(overdue[0].issued_to, "u1")
+        self.assertEqual(len(self.bundle.loan_repo.list_overdue(date(2025, 2, 1), limit=1)), 1)
+
+    def test_list_overdue_uses_issue_date_index(self):
+        plan = self.bundle.loan_repo.conn.execute(
+            "EXPLAIN QUERY PLAN SELECT b.* FROM books b WHERE b.issue_date < ? "
+            "AND EXISTS (SELECT 1 FROM issued_books l WHERE l.isbn = b.isbn) ORDER BY b.issue_date",
+            ("2025-02-01",),
+        ).fetchall()
+        self.assertIn("idx_books_issue_date", " ".join(row[3] for row in plan))
+
+
+class TestStatsTables(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.bundle = RepositoryFactory.create_sqlite(os.path.join(self.tmp.name, "stats.db"))
+        self.service = LibraryService.from_bundle(self.bundle)
+        self.service.register_users([User("u1", "F", "L", "e"), User("u2", "F", "L", "e")])
+        self.service.add_books([
+            Book("A", "X", 2000, "Poetry", "S1"),
+            Book("B", "X", 2000, "Poetry", "S2"),
+            Book("C", "Y", 2000, None, "S3"),
+        ])
+
+    def tearDown(self):
+        self.bundle.close()
+        self.tmp.cleanup()
+
+    def _totals(self):
+        books, loans = self.bundle.book_repo, self.bundle.loan_repo
+        return books.count(), books.count_available(), loans.count_active()
+
+    def test_triggers_follow_loans_replace_and_delete(self):
+        self.assertTrue(self.service.issue_book("S1", "u1"))
+        self.assertTrue(self.service.issue_book("S3", "u1"))
+        self.assertEqual(self._totals(), (3, 1, 2))
+        self.assertEqual(self.bundle.loan_repo.active_loans("u1"), 2)
+        self.assertEqual(self.bundle.loan_repo.active_loans("u2"), 0)
+        self.assertEqual(self.service.library_stats(), {"books": 3, "available": 1, "active_loans": 2})
+        self.assertTrue(self.service.return_book("S3", "u1"))
+        self.assertEqual(self.bundle.loan_repo.active_loans("u1"), 1)
+
+        # INSERT OR REPLACE не рахує книгу двічі; зміна жанру переносить її між групами
+        self.service.add_book(Book("B2", "X", 2001, "Prose", "S2"))
+        self.service.remove_book("S3")
+        self.assertEqual(self._totals(), (2, 1, 1))
+        self.assertEqual(self.bundle.book_repo.genre_stats(), {
+            "Poetry": {"books": 1, "available": 0, "times_issued": 1},
+            "Prose": {"books": 1, "available": 1, "times_issued": 0},
+        })
+
+    def test_counters_are_read_without_scanning(self):
+        plan = self.bundle.book_repo.conn.execute(
+            "EXPLAIN QUERY PLAN SELECT available FROM library_totals WHERE id=1"
+        ).fetchall()
+        self.assertNotIn("SCAN", " ".join(row[3] for row in plan))
+
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+@unittest.skipUnless(numpy, "numpy is not installed")
+class TestCirculationReport(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.bundle = RepositoryFactory.create_sqlite(os.path.join(self.tmp.name, "report.db"))
+        books = []
+        for i, (genre, author, year, issued) in enumerate([
+            ("Poetry", "Shevchenko", 1840, 5), ("Poetry", "Franko", 1887, 1),
+            ("Prose", "Franko", 1887, 3), ("Prose", "Ukrainka", None, 0), ("Drama", "Ukrainka", 1911, 3),
+        ]):
+            book = Book(f"T{i}", author, year, genre, f"R{i}")
+            book.times_issued = issued
+            books.append(book)
+        books[0].available = False
+        self.bundle.book_repo.add_many(books)
+        self.service = LibraryService.from_bundle(self.bundle)
+
+    def tearDown(self):
+        self.bundle.close()
+        self.tmp.cleanup()
+
+    def test_report_groups_and_distribution(self):
+        report = self.service.circulation_report(top_n=2)
+        self.assertEqual(report["books"], 5)
+        self.assertAlmostEqual(report["availability_ratio"], 0.8)
+        self.assertEqual(report["total_issues"], 12)
+        self.assertEqual(report["books_by_genre"], {"Drama": 1, "Poetry": 2, "Prose": 2})
+        self.assertEqual(report["issues_by_genre"], {"Drama": 3, "Poetry": 6, "Prose": 3})
+        self.assertEqual(list(report["issues_by_year"].items()), [(None, 0), (1840, 5), (1887, 4), (1911, 3)])
+        self.assertEqual(report["times_issued"]["p50"], 3.0)
+        self.assertEqual(report["times_issued"]["histogram"], {0: 1, 1: 1, 3: 2, 5: 1})
+        self.assertEqual(report["top_authors"], [("Shevchenko", 5), ("Franko", 4)])
+        self.assertEqual(report["top_genres"], [("Poetry", 6), ("Prose", 3)])
+
+    def test_snapshot_streams_in_batches(self):
+        from service.analytics import CirculationSnapshot
+        snapshot = CirculationSnapshot.load(self.bundle.book_repo, batch_size=2)
+        self.assertEqual(len(snapshot), 5)
+        self.assertEqual(snapshot.available_by("author"), {"Franko": 2, "Shevchenko": 0, "Ukrainka": 2})
+        self.assertEqual(snapshot.top("author", 1, by="count"), [("Franko", 2)])
+        with self.assertRaises(ValueError):
+            snapshot.count_by("title")
+
+    def test_empty_catalog(self):
+        self.bundle.book_repo.conn.execute("DELETE FROM books")
+        report = self.service.circulation_report()
+        self.assertEqual((report["books"], report["top_authors"], report["times_issued"]["p99"]), (0, [], 0.0))
+
+
+class TestBenchmarkSuite(unittest.TestCase):
+    def test_seeded_run_and_regression_compare(self):
+        from benchmarks import suite
+        self.assertTrue(all(
+            sum(int(d) * (3 if i % 2 else 1) for i, d in enumerate(suite.isbn13(n))) % 10 == 0
+            for n in (0, 7, 123456)
+        ))
+        with tempfile.TemporaryDirectory() as tmp, patch("sys.stdout"):
+            suite.main(["run", "--scale", "1k", "--iterations", "2", "--db-dir", tmp,
+                        "--ops", "get", "issue_book", "--json", os.path.join(tmp, "old.json")])
+            with open(os.path.join(tmp, "old.json"), encoding="utf-8") as f:
+                old = json.load(f)
+            self.assertEqual(old["meta"]["books"], 1000)
+            self.assertEqual([r["op"] for r in old["results"]], ["get", "issue_book"])
+            self.assertTrue({"p50_ms", "p95_ms", "p99_ms", "ops_per_s", "peak_kib"} <= set(old["results"][0]))
+            # Видача в бенчмарку не змінює згенеровану базу
+            bundle = RepositoryFactory.create_sqlite(os.path.join(tmp, "bench-1000-42.db"))
+            self.assertEqual(bundle.loan_repo.count_active(), 200)
+            bundle.close()
+
+            new = json.loads(json.dumps(old))
+            new["results"][0]["p95_ms"] = old["results"][0]["p95_ms"] * 2
+            self.assertEqual(suite.compare(old, new, 10.0), [{"op": "get", "metrics": ["p95_ms"]}])
+
+
+class TestCatalogImporter(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.bundle = RepositoryFactory.create_sqlite(os.path.join(self.tmp.name, "import.db"))
+        self.service = LibraryService.from_bundle(self.bundle)
+
+    def tearDown(self):
+        self.bundle.close()
+        self.tmp.cleanup()
+
+    def _path(self, name, text):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+        return path
+
+    def _rejected(self, path):
+        import csv
+        with open(path, encoding="utf-8", newline="") as f:
+            return [(int(row["line"]), row["reason"].split(":")[0]) for row in csv.DictReader(f)]
+
+    def test_csv_import_validates_and_rejects(self):
+        from data_io.importer import import_file
+        path = self._path("catalog.csv", (
+            "ISBN,Title,Author,Year,Genre\n"
+            "978-0-306-40615-7,Good,Author A,1999,Fiction\n"
+            "9780306406158,Bad checksum,Author B,2000,\n"
+            "0-306-40615-2,Same as ISBN-10,Author C,2001,\n"
+            "9781861972712,Too old,Author D,1200,\n"
+            "9781861972712,Ok,Author D,2010,\n"
+        ))
+        rejected = os.path.join(self.tmp.name, "rejected.csv")
+        for workers in (0, 2):
+            with self.subTest(workers=workers):
+                self.bundle.book_repo.conn.execute("DELETE FROM books")
+                stats = import_file(self.service, "books", path, rejected_path=rejected,
+                                    chunk_size=2, workers=workers)
+                self.assertEqual((stats.read, stats.imported, stats.rejected), (5, 2, 3))
+                self.assertEqual(self._rejected(rejected), [
+                    (3, "bad ISBN-13 checksum"), (5, "year out of range"), (4, "duplicate key 9780306406157"),
+                ])
+        book = self.bundle.book_repo.get("9780306406157")
+        self.assertEqual((book.title, book.year, book.genre), ("Good", 1999, "Fiction"))
+        self.assertIsNone(self.bundle.book_repo.get("9781861972712").genre)
+
+    def test_reimport_keeps_existing_rows(self):
+        from data_io.importer import import_file
+        path = self._path("users.jsonl", (
+            '{"user_id": "u1", "first_name": "Ann", "last_name": "Lee", "email": "ANN@x.org"}\n'
+            "\n"
+            "not json\n"
+            '{"user_id": "u2", "first_name": "Bob", "last_name": "Ray", "email": "nope"}\n'
+        ))
+        first = import_file(self.service, "users", path, workers=0)
+        self.assertEqual((first.imported, first.rejected), (1, 2))
+        self.assertEqual(self.bundle.user_repo.get("u1").email, "ann@x.org")
+        rejected = os.path.join(self.tmp.name, "again.csv")
+        second = import_file(self.service, "users", path, rejected_path=rejected, workers=0)
+        self.assertEqual((second.imported, second.rejected), (0, 3))
+        self.assertIn((1, "already exists"), self._rejected(rejected))
+
+
+class TestExporter(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.bundle = RepositoryFactory.create_sqlite(os.path.join(self.tmp.name, "export.db"))
+        self.service = LibraryService.from_bundle(self.bundle)
+        self.service.add_books(Book(f"T{i}", "Автор", 2000 + i, None, f"isbn-{i}") for i in range(3))
+        self.service.register_user(User("u1", "Ann", "Lee", "ann@x.org"))
+        self.service.issue_book("isbn-1", "u1")
+
+    def tearDown(self):
+        self.bundle.close()
+        self.tmp.cleanup()
+
+    def test_formats_round_trip(self):
+        import csv, gzip, io
+        path = os.path.join(self.tmp.name, "books.csv.gz")
+        self.assertEqual(self.service.export("books", None, path), 3)
+        with gzip.open(path, "rt", encoding="utf-8", newline="") as f:
+            rows = list(csv.DictReader(f))
+        self.assertEqual([r["isbn"] for r in rows], ["isbn-0", "isbn-1", "isbn-2"])
+        self.assertEqual((rows[1]["author"], rows[1]["issued_to"], rows[1]["available"]), ("Автор", "u1", "0"))
+
+        out = io.StringIO()
+        self.assertEqual(self.service.export("issued_books", "jsonl", out), 1)
+        self.assertEqual(json.loads(out.getvalue()), {"user_id": "u1", "isbn": "isbn-1"})
+        raw = io.BytesIO()
+        self.service.export("users", "jsonl.gz", raw)
+        self.assertEqual(json.loads(gzip.decompress(raw.getvalue()))["email"], "ann@x.org")
+        with self.assertRaises(ValueError):
+            self.service.export("loans", "csv", out)
+
+    def test_snapshot_does_not_block_writers(self):
+        import io
+        added = threading.Event()
+
+        def writer():
+            self.service.add_book(Book("New", "B", 2020, None, "isbn-9"))
+            added.set()
+
+        with self.service.snapshot():
+            self.assertEqual(self.service.export("books", "csv", io.StringIO()), 3)
+            thread = threading.Thread(target=writer)
+            thread.start()
+            thread.join(5)
+            self.assertTrue(added.is_set())
+            # Запис іншого потоку не видно до кінця знімка
+            self.assertEqual(self.service.export("books", "csv", io.StringIO()), 3)
+        self.assertEqual(self.service.export("books", "csv", io.StringIO()), 4)
+
+    def test_cli_exports_all_kinds(self):
+        from data_io.exporter import main
+        db = os.path.join(self.tmp.name, "export.db")
+        with patch("sys.stderr"), patch.object(Settings, "configure_logging"):
+            counts = main(["--db", db, "--format", "jsonl", "--out-dir", self.tmp.name])
+        self.assertEqual(counts, {"books": 3, "users": 1, "issued_books": 1})
+        self.assertTrue(os.path.exists(os.path.join(self.tmp.name, "issued_books.jsonl")))
+
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        from metrics import registry
+        self.registry = registry
+        self.registry.reset()
+        self.registry.enable()
+        self.bundle = RepositoryFactory.create_in_memory()
+        self.service = LibraryService.from_bundle(self.bundle)
+
+    def tearDown(self):
+        self.registry.disable()
+        self.registry.reset()
+        self.bundle.close()
+
+    def test_records_calls_rows_and_commits(self):
+        self.service.add_books(Book(f"T{i}", "A", 2000, None, f"isbn-{i}") for i in range(3))
+        self.service.register_user(User("u1", "Ann", "Lee", "ann@x.org"))
+        self.service.issue_book("isbn-1", "u1")
+        self.service.search_books(author="A")
+        self.assertEqual(sum(len(b) for b in self.bundle.book_repo.row_batches(batch_size=2)), 3)
+        with self.assertRaises(ValueError):
+            list(self.bundle.book_repo.column_batches(["nope"]))
+        ops = self.registry.snapshot()
+        self.assertEqual((ops["service.add_books"]["calls"], ops["service.add_books"]["commits"]), (1, 1))
+        self.assertEqual((ops["books.add_many"]["calls"], ops["books.add_many"]["commits"]), (1, 0))
+        self.assertEqual(ops["service.search_books"]["rows"], 3)
+        self.assertEqual((ops["books.row_batches"]["rows"], ops["books.column_batches"]["errors"]), (3, 1))
+        self.assertEqual(sum(ops["loans.issue"]["buckets"]), 1)
+        self.assertNotIn("service.transaction", ops)
+
+    def test_disabled_records_nothing_and_dumps(self):
+        self.registry.disable()
+        self.service.library_stats()
+        self.assertEqual(self.registry.snapshot(), {})
+        self.registry.enable()
+        self.service.library_stats()
+        prom = self.registry.render("prom")
+        self.assertIn('library_operation_calls_total{op="service.library_stats"} 1', prom)
+        self.assertIn('library_operation_duration_seconds_bucket{op="books.count",le="+Inf"} 1', prom)
+        self.assertIn("service.library_stats", self.registry.render("text"))
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "metrics.json")
+            self.registry.dump(path)
+            with open(path, encoding="utf-8") as f:
+                self.assertEqual(json.load(f)["operations"]["loans.count_active"]["calls"], 1)
+
+
+class TestRepoBundleTransaction(unittest.TestCase):
+    def setUp(self):
+        self.bundle = RepositoryFactory.create_in_memory()
+        conn = self.bundle.book_repo.conn
+        conn.execute("CREATE TABLE IF NOT EXISTS books (isbn TEXT PRIMARY KEY, title TEXT, author TEXT, year INTEGER, genre TEXT, available INTEGER, issued_to TEXT, issue_date TEXT, times_issued INTEGER)")
+        conn.execute("CREATE TABLE IF NOT EXISTS users (user_id TEXT PRIMARY KEY, first_name TEXT, last_name TEXT, email TEXT)")
+        conn.commit()
+        self.statements = []
+        conn.set_trace_callback(self.statements.append)
+
+    def _commits(self):
+        return sum(1 for st in self.statements if st.upper() == "COMMIT")
+
+    def test_transaction_commits_once(self):
+        with self.bundle.transaction():
+            self.bundle.book_repo.add(Book("A", "B", 2000, "G", "T1"))
+            self.bundle.user_repo.add(User("u1", "F", "L", "e"))
+            self.bundle.book_repo.delete("T1")
+            self.assertEqual(self._commits(), 0)
+        self.assertEqual(self._commits(), 1)
+        self.assertIsNotNone(self.bundle.user_repo.get("u1"))
+
+    def test_transaction_rolls_back_on_exception(self):
+        with self.assertRaises(RuntimeError):
+            with self.bundle.transaction():
+                self.bundle.book_repo.add(Book("A", "B", 2000, "G", "T2"))
+                raise RuntimeError("boom")
+        self.assertIsNone(self.bundle.book_repo.get("T2"))
+
+    def test_books_marked_clean_only_after_commit(self):
+        self.bundle.book_repo.add_many([Book("A", "B", 2000, "G", f"D{i}") for i in range(3)])
+        books = [self.bundle.book_repo.get(f"D{i}") for i in range(3)]
+        for book in books:
+            book.title = "Changed"
+        with self.assertRaises(RuntimeError):
+            with self.bundle.transaction():
+                self.bundle.book_repo.add(books[0])
+                self.bundle.book_repo.update(books[1])
+                self.assertEqual(books[0].dirty_fields, {"title"})
+                raise RuntimeError("boom")
+        # Відкочені зміни лишаються "брудними": наступний update їх запише
+        self.assertEqual([b.dirty_fields for b in books[:2]], [{"title"}] * 2)
+        with self.bundle.transaction():
+            self.bundle.book_repo.add_many(books)
+            self.assertEqual(books[2].dirty_fields, {"title"})
+        self.assertEqual([b.dirty_fields for b in books], [frozenset()] * 3)
+        self.assertEqual(self.bundle.book_repo.get("D1").title, "Changed")
+
+    def test_commit_keeps_fields_edited_after_update(self):
+        svc = LibraryService.from_bundle(self.bundle)
+        svc.add_book(Book("A", "B", 2000, "G", "E1"))
+        book = svc.books.get("E1")
+        with svc.transaction():
+            book.title = "A2"
+            svc.update_book(book)
+            # Правки після запису, ще до commit: title вдруге і новий genre
+            book.genre = "G2"
+            book.title = "A3"
+        self.assertEqual(book.dirty_fields, {"title", "genre"})
+        self.assertEqual(svc.books.get("E1").title, "A2")
+        svc.update_book(book)
+        self.assertEqual(book.dirty_fields, frozenset())
+        self.assertEqual((svc.books.get("E1").title, svc.books.get("E1").genre), ("A3", "G2"))
+
+    def test_service_defers_events_until_commit(self):
+        svc = LibraryService.from_bundle(self.bundle)
+        obs = MagicMock()
+        svc.register_observer(obs)
+        with svc.transaction():
+            svc.remove_book("T3")
+            svc.add_book(Book("A", "B", 2000, "G", "T3"))
+            obs.update.assert_not_called()
+        self.assertEqual(self._commits(), 1)
+        self.assertEqual(obs.update.call_count, 2)
+
+    def test_repository_error_rolls_back_and_drops_events(self):
+        svc = LibraryService.from_bundle(self.bundle)
+        obs = MagicMock()
+        svc.register_observer(obs)
+        with self.assertRaises(TransactionRolledBack):
+            with svc.transaction():
+                svc.add_book(Book("A", "B", 2000, "G", "T4"))
+                self.bundle.user_repo.conn.execute("DROP TABLE users")
+                svc.register_user(User("u4", "F", "L", "e"))
+        obs.update.assert_not_called()
+        self.assertFalse(self.bundle.uow.committed)
+        self.assertIsNone(self.bundle.book_repo.get("T4"))
+
+    def test_commit_failure_propagates_and_drops_events(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "locked.db")
+            bundle = RepositoryFactory.create_sqlite(path, profile=StorageProfile(
+                journal_mode="DELETE", synchronous="FULL", busy_timeout=100))
+            svc = LibraryService.from_bundle(bundle)
+            svc.add_book(Book("A", "B", 2000, "G", "L1"))
+            svc.register_user(User("u1", "F", "L", "e"))
+            obs = MagicMock()
+            svc.register_observer(obs)
+            # Інше з'єднання тримає SHARED-блокування: commit не отримає EXCLUSIVE
+            other = sqlite3.connect(path)
+            other.execute("BEGIN")
+            other.execute("SELECT * FROM books").fetchall()
+            try:
+                with self.assertRaises(sqlite3.OperationalError):
+                    svc.issue_book("L1", "u1")
+            finally:
+                other.rollback()
+                other.close()
+            obs.update.assert_not_called()
+            self.assertTrue(bundle.book_repo.get("L1").available)
+            self.assertEqual(bundle.loan_repo.count_active(), 0)
+            bundle.close()
+
+
+class TestConnectionPool(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.pool = SQLiteConnectionPool(os.path.join(self.tmp.name, "pool.db"), pool_size=2, timeout=0.2)
+
+    def tearDown(self):
+        self.pool.close()
+        self.tmp.cleanup()
+
+    def _in_thread(self, fn):
+        result = {}
+        t = threading.Thread(target=lambda: result.setdefault("value", fn()))
+        t.start()
+        t.join()
+        return result.get("value")
+
+    def test_connection_per_thread_and_reuse_after_thread_exit(self):
+        main = self.pool.connection()
+        self.assertIs(self.pool.connection(), main)
+        other = self._in_thread(self.pool.connection)
+        self.assertIsNot(other, main)
+        # The finished thread's connection is reclaimed instead of opening a third one
+        self.assertIs(self._in_thread(self.pool.connection), other)
+        self.assertEqual(self.pool.open_connections, 2)
+
+    def test_exhausted_pool_times_out_and_release_frees_slot(self):
+        self.pool.connection()
+        hold, done = threading.Event(), threading.Event()
+
+        def holder():
+            self.pool.connection()
+            hold.set()
+            done.wait()
+            self.pool.release()
+
+        t = threading.Thread(target=holder)
+        t.start()
+        hold.wait()
+        errors = []
+        self._in_thread(lambda: self._try(errors))
+        self.assertIsInstance(errors[0], PoolTimeoutError)
+        done.set()
+        t.join()
+
+    def _try(self, errors):
+        try:
+            self.pool.connection()
+        except sqlite3.Error as e:
+            errors.append(e)
+
+    def test_closed_pool_rejects_requests(self):
+        self.pool.connection()
+        self.pool.close()
+        with self.assertRaises(sqlite3.ProgrammingError):
+            self.pool.connection()
+
+    def test_in_memory_pool_shares_one_database(self):
+        bundle = RepositoryFactory.create_in_memory()
+        bundle.book_repo.add(Book("A", "B", 2000, "G", "P1"))
+        self.assertEqual(self._in_thread(lambda: bundle.book_repo.get("P1").title), "A")
+        bundle.close()
+
+    def test_more_worker_threads_than_pool_slots(self):
+        from repository.async_sqlite_repository import SQLiteExecutor
+        bundle = RepositoryFactory.create_sqlite(os.path.join(self.tmp.name, "workers.db"), pool_size=2)
+        self.addCleanup(bundle.close)
+        bundle.pool.timeout = 2
+        bundle.book_repo.add(Book("A", "B", 2000, "G", "W1"))
+        # Головний потік теж тримає з'єднання: виконавцям лишається один слот на 5+3 потоки
+        executor = SQLiteExecutor(read_workers=4)
+        self.addCleanup(executor.shutdown)
+
+        def read():
+            time.sleep(0.01)
+            return bundle.book_repo.count()
+
+        async def run():
+            calls = [executor.read(read) for _ in range(20)] + [executor.write(read)]
+            return await asyncio.gather(*calls)
+
+        self.assertEqual(asyncio.run(run()), [1] * 21)
+
+        bus = AsyncEventBus(max_workers=3, coalesce_window=0)
+        self.addCleanup(bus.close)
+        seen = []
+        for _ in range(3):
+            bus.subscribe(MagicMock(spec=["update"], update=lambda e, d: seen.append(bundle.book_repo.get(d["isbn"]))))
+        for i in range(5):
+            bus.publish("book_added", {"isbn": "W1", "n": i})
+        self.assertTrue(bus.flush(timeout=10))
+        self.assertEqual(len(seen), 15)
+        self.assertTrue(all(book is not None for book in seen))
+
+    def test_in_memory_pool_concurrent_reader_and_writer(self):
+        bundle = RepositoryFactory.create_in_memory()
+        self.addCleanup(bundle.close)
+        bundle.book_repo.add(Book("Seed", "B", 2000, "G", "C0"))
+
+        def writer():
+            for i in range(1, 201):
+                bundle.book_repo.add(Book(f"T{i}", "B", 2000, "G", f"C{i}"))
+
+        t = threading.Thread(target=writer)
+        t.start()
+        # Читач не отримує "table is locked", проковтнуте репозиторієм як порожній результат
+        found = [len(bundle.book_repo.search({"author": "B"})) for _ in range(200)]
+        t.join()
+        self.assertTrue(all(found))
+        self.assertEqual(bundle.book_repo.count(), 201)
+
+
+class TestStorageProfile(unittest.TestCase):
+    def test_profile_applied_to_every_pooled_connection(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            bundle = RepositoryFactory.create_sqlite(
+                os.path.join(tmp, "wal.db"),
+                profile=StorageProfile(busy_timeout=1234, synchronous="off"),
+            )
+            conn = bundle.book_repo.conn
+            self.assertEqual(conn.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+            self.assertEqual(conn.execute("PRAGMA busy_timeout").fetchone()[0], 1234)
+            self.assertEqual(conn.execute("PRAGMA synchronous").fetchone()[0], 0)
+            result = {}
+            t = threading.Thread(target=lambda: result.setdefault(
+                "timeout", bundle.book_repo.conn.execute("PRAGMA busy_timeout").fetchone()[0]))
+            t.start()
+            t.join()
+            self.assertEqual(result["timeout"], 1234)
+            bundle.close()
+
+    def test_settings_profile_with_overrides_and_validation(self):
+        s = Settings()
+        s.DB_PROFILE = "legacy"
+        s.DB_CACHE_SIZE = "-4000"
+        profile = s.storage_profile()
+        self.assertEqual(profile.journal_mode, "DELETE")
+        self.assertEqual(profile.cache_size, -4000)
+        self.assertEqual(STORAGE_PROFILES["wal"].journal_mode, "WAL")
+        with self.assertRaises(ValueError):
+            StorageProfile(journal_mode="wal; DROP TABLE books")
+        s.DB_PROFILE = "nope"
+        with self.assertRaises(ValueError):
+            s.storage_profile()
+
+
+class TestSlowQueryLog(unittest.TestCase):
+    def _repo(self, threshold):
+        from repository.slow_query import slow_query_connection
+        pool = SQLiteConnectionPool(":memory:", factory=slow_query_connection(threshold))
+        self.addCleanup(pool.close)
+        migrate(pool.connection())
+        return SQLiteBookRepository(pool)
+
+    def test_slow_statements_logged_with_shape_and_plan(self):
+        repo = self._repo(0.0)
+        with self.assertLogs("repository.slow_query", "WARNING") as logs:
+            repo.add_many([Book("T", "A", 2000, None, "isbn-1"), Book("U", "B", 2001, None, "isbn-2")])
+            self.assertEqual(repo.get("isbn-1").title, "T")
+        select = next(line for line in logs.output if "WHERE isbn=?" in line)
+        self.assertIn("params=(str)", select)
+        self.assertIn("plan=SEARCH books", select)
+        self.assertTrue(any("params=2 x (str, str, str, int, NoneType" in line for line in logs.output))
+        self.assertFalse(any("'isbn-1'" in line for line in logs.output))
+
+        fast = self._repo(60.0)
+        with self.assertNoLogs("repository.slow_query", "WARNING"):
+            fast.get("isbn-1")
+
+    def test_fetch_time_counts_towards_threshold(self):
+        repo = self._repo(0.05)
+        repo.add_many([Book(f"T{i}", "A", 2000, "G", f"S{i}") for i in range(5)])
+        repo.conn.create_function("slow_title", 1, lambda t: time.sleep(0.02) or t)
+        with self.assertLogs("repository.slow_query", "WARNING") as logs:
+            # execute обчислює лише перший рядок, решта часу — у fetchall
+            rows = repo.conn.execute("SELECT slow_title(title) FROM books").fetchall()
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(len(logs.output), 1)
+        self.assertIn("sql=SELECT slow_title(title) FROM books", logs.output[0])
+
+    def test_silent_without_configured_logging(self):
+        import logging
+        repo = self._repo(0.0)
+        slow_log = logging.getLogger("repository.slow_query")
+        slow_log.propagate = False
+        self.addCleanup(setattr, slow_log, "propagate", True)
+        stderr = io.StringIO()
+        with patch("repository.slow_query._query_plan") as plan, contextlib.redirect_stderr(stderr):
+            repo.get("isbn-1")
+        plan.assert_not_called()
+        self.assertEqual(stderr.getvalue(), "")
+
+    def test_settings_threshold_and_rotating_file(self):
+        import logging
+        s = Settings()
+        if "SLOW_QUERY_MS" not in os.environ:
+            # Журнал лише за явним увімкненням: інакше звичайні з'єднання без обгорток
+            self.assertIsNone(s.slow_query_threshold())
+            self.assertEqual(s.SLOW_QUERY_LOG, os.getenv("SLOW_QUERY_LOG", ""))
+        s.SLOW_QUERY_MS = "off"
+        self.assertIsNone(s.slow_query_threshold())
+        s.SLOW_QUERY_MS = "250"
+        self.assertEqual(s.slow_query_threshold(), 0.25)
+        s.SLOW_QUERY_MS = "-1"
+        with self.assertRaises(ValueError):
+            s.slow_query_threshold()
+
+        slow_log = logging.getLogger("repository.slow_query")
+        root_level = logging.getLogger().level
+        with tempfile.TemporaryDirectory() as tmp:
+            s.LOG_LEVEL = "debug"
+            # Відносний шлях — у LOG_DIR, а не в поточному каталозі
+            s.LOG_DIR = os.path.join(tmp, "logs")
+            s.SLOW_QUERY_LOG = "slow.log"
+            s.configure_logging()
+            s.configure_logging()
+            path = os.path.join(tmp, "logs", "slow.log")
+            handlers = [h for h in slow_log.handlers if getattr(h, "baseFilename", None) == path]
+            try:
+                self.assertEqual(logging.getLogger().level, logging.DEBUG)
+                self.assertEqual(len(handlers), 1)
+                slow_log.warning("duration_ms=%.1f sql=%s", 123.0, "SELECT 1")
+                handlers[0].flush()
+                with open(path, encoding="utf-8") as f:
+                    self.assertIn("duration_ms=123.0 sql=SELECT 1", f.read())
+            finally:
+                for handler in handlers:
+                    slow_log.removeHandler(handler)
+                    handler.close()
+                slow_log.propagate = True
+                logging.getLogger().setLevel(root_level)
+        s.LOG_LEVEL = "loud"
+        with self.assertRaises(ValueError):
+            s.configure_logging()
+
+
+class TestCachingRepositories(unittest.TestCase):
+    def setUp(self):
+        self.bundle = RepositoryFactory.create_cached_sqlite(":memory:", cache_size=2, cache_ttl=60)
+        self.books = self.bundle.book_repo
+        self.bundle.user_repo.add(User("u1", "F", "L", "e"))
+        self.books.add_many([Book(f"T{i}", "A", 2000, "G", f"C{i}") for i in range(3)])
+
+    def tearDown(self):
+        self.bundle.close()
+
+    def test_hits_misses_and_lru_eviction(self):
+        self.books.get("C0")
+        self.books.get("C0")
+        self.books.get("C1")
+        self.books.get("C2")
+        stats = self.books.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["evictions"]), (1, 3, 1))
+        self.assertEqual(stats["size"], 2)
+
+    def test_cached_copy_is_isolated_and_writes_invalidate(self):
+        self.books.get("C0").title = "mutated, not saved"
+        self.assertEqual(self.books.get("C0").title, "T0")
+        self.bundle.loan_repo.issue("C0", "u1", "2025-01-01")
+        self.assertFalse(self.books.get("C0").available)
+        self.books.delete("C0")
+        self.assertIsNone(self.books.get("C0"))
+        self.assertTrue(callable(self.books.search))
+
+    def test_rolled_back_changes_not_cached(self):
+        with self.assertRaises(RuntimeError):
+            with self.bundle.transaction():
+                self.books.add(Book("Draft", "A", 2000, "G", "C1"))
+                self.assertEqual(self.books.get("C1").title, "Draft")
+                raise RuntimeError("abort")
+        self.assertEqual(self.books.get("C1").title, "T1")
+
+    def test_ttl_expiry(self):
+        now = [0.0]
+        cache = LRUCache(maxsize=10, ttl=5, clock=lambda: now[0])
+        cache.put("k", 1)
+        self.assertEqual(cache.get("k"), 1)
+        now[0] = 6
+        self.assertEqual(cache.stats()["size"], 1)
+        self.assertIsNot(cache.get("k"), 1)
+        self.assertEqual(cache.stats()["expirations"], 1)
+
+    def test_container_cached_backend(self):
+        c = Container()
+        c.config.storage.backend.from_value("sqlite_cached")
+        c.config.storage.db_path.from_value(":memory:")
+        svc = c.library_service()
+        self.assertIsInstance(svc.books, CachingBookRepository)
+        self.assertEqual(svc.books.list_all(), [])
+        c.shutdown_resources()
+
+
 class TestContainerInjection(unittest.TestCase):
     def test_sqlite_strategy_injection(self):
         os.environ["STORAGE_BACKEND"] = "sqlite"
@@ -242,6 +1260,17 @@ class TestContainerInjection(unittest.TestCase):
 
         self.assertEqual(svc.users.list_all(), [])
 
+    def test_repositories_share_one_bundle_until_shutdown(self):
+        c = Container()
+        c.config.storage.backend.from_value("in_memory")
+        svc = c.library_service()
+        self.assertIs(c.book_repository(), svc.books)
+        self.assertIs(c.loan_repository().uow, svc.uow)
+        pool = svc.uow._connections
+        c.shutdown_resources()
+        with self.assertRaises(sqlite3.ProgrammingError):
+            pool.connection()
+
 
 # -----------------------------------------
 # Service Tests
@@ -295,13 +1324,34 @@ class TestLibraryService(unittest.TestCase):
         past = (date.today() - timedelta(days=40)).isoformat()
         self.service.loans.issue("B100", "uX", past)
         overdue = self.service.list_overdue(max_days=30)
-        self.assertIn("B100", overdue)
+        self.assertEqual([b.isbn for b in overdue], ["B100"])
+        self.assertEqual(overdue[0].title, "Old")
         recent = (date.today() - timedelta(days=5)).isoformat()
+        self.service.loans.return_book("B100", "uX")
         self.service.loans.issue("B100", "uX", recent)
-        self.assertNotIn("B100", self.service.list_overdue(max_days=30))
+        self.assertNotIn("B100", [b.isbn for b in self.service.list_overdue(max_days=30)])
+
+    def test_return_book_false_when_not_issued(self):
+        self.assertFalse(self.service.return_book("none", "none"))
+
+    def test_concurrent_checkouts_issue_one_copy(self):
+        self.service.add_book(Book("One", "A", 2000, "G", "C1"))
+        self.service.register_users([User(f"c{i}", "F", "L", "e") for i in range(8)])
+        results = []
+        barrier = threading.Barrier(8)
+
+        def checkout(uid):
+            barrier.wait()
+            results.append(self.service.issue_book("C1", uid))
 
-    def test_return_book_always_true(self):
-        self.assertTrue(self.service.return_book("none", "none"))
+        threads = [threading.Thread(target=checkout, args=(f"c{i}",)) for i in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(results.count(True), 1)
+        self.assertEqual(self.service.books.get("C1").times_issued, 1)
+        self.assertEqual(self.service.loans.list_issued(), ["C1"])
 
 
 class TestLibraryServiceObserver(unittest.TestCase):
@@ -339,8 +1389,206 @@ class TestLibraryServiceObserver(unittest.TestCase):
         b = Book("X", "A", 2000, "G", "444")
         self.service.add_book(b)
         self.obs.update.assert_any_call("book_added", {"isbn": "444"})
-        self.service.return_book("444", "any")
+        self.service.register_user(User("any", "F", "L", "e"))
+        self.assertTrue(self.service.issue_book("444", "any"))
+        self.assertTrue(self.service.return_book("444", "any"))
         self.obs.update.assert_any_call("book_returned", {"isbn": "444", "user_id": "any"})
+        # Повернення того, що не видавалось, подій не породжує
+        self.obs.update.reset_mock()
+        self.assertFalse(self.service.return_book("444", "any"))
+        self.obs.update.assert_not_called()
+
+    def test_update_book_emits_changed_fields_once(self):
+        self.service.add_book(Book("X", "A", 2000, "G", "555"))
+        book = self.service.books.get("555")
+        self.obs.update.reset_mock()
+        self.service.update_book(book)
+        self.obs.update.assert_not_called()
+        book.genre = "Poetry"
+        self.service.update_book(book)
+        self.obs.update.assert_called_once_with("book_updated", {"isbn": "555", "fields": ["genre"]})
+        self.assertEqual(self.service.books.get("555").genre, "Poetry")
+
+
+class _BatchObserver:
+    def __init__(self):
+        self.calls = []
+
+    def update(self, event, data):
+        self.calls.append((event, [data]))
+
+    def update_many(self, event, items):
+        self.calls.append((event, items))
+
+
+class TestEventBus(unittest.TestCase):
+    def test_coalesce_groups_consecutive_events(self):
+        batch = [("a", {"x": 1}, 0), ("a", {"x": 1}, 0), ("a", {"x": [2]}, 0), ("b", {}, 0), ("a", {"x": 1}, 0)]
+        self.assertEqual(
+            [(e, [d for d, _ in items]) for e, items in coalesce(batch)],
+            [("a", [{"x": 1}, {"x": [2]}]), ("b", [{}]), ("a", [{"x": 1}])],
+        )
+
+    def test_async_bus_batches_within_window(self):
+        bus = AsyncEventBus(max_workers=2, coalesce_window=0.05)
+        self.addCleanup(bus.close)
+        obs = _BatchObserver()
+        bus.subscribe(obs)
+        for isbn in ("1", "2", "2"):
+            bus.publish("book_issued", {"isbn": isbn})
+        bus.publish("book_removed", {"isbn": "3"})
+        self.assertTrue(bus.flush(timeout=5))
+        self.assertEqual(obs.calls, [
+            ("book_issued", [{"isbn": "1"}, {"isbn": "2"}]),
+            ("book_removed", [{"isbn": "3"}]),
+        ])
+        stats = next(iter(bus.stats().values()))
+        self.assertEqual((stats["published"], stats["delivered"], stats["coalesced"]), (4, 3, 1))
+        self.assertGreaterEqual(stats["latency_ms"]["max"], 0.0)
+
+    def test_sync_bus_counters_from_many_threads(self):
+        bus = SyncEventBus()
+        bus.subscribe(MagicMock(spec=["update"]))
+
+        def publisher():
+            for i in range(500):
+                bus.publish("book_added", {"isbn": str(i)})
+
+        threads = [threading.Thread(target=publisher) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        stats = next(iter(bus.stats().values()))
+        self.assertEqual((stats["published"], stats["delivered"], stats["batches"]), (4000, 4000, 4000))
+
+    def test_slow_or_failing_observer_does_not_block_publisher(self):
+        bus = AsyncEventBus(max_workers=3, coalesce_window=0)
+        self.addCleanup(bus.close)
+        gate = threading.Event()
+        good = MagicMock(spec=["update"])
+        bus.subscribe(MagicMock(spec=["update"], update=MagicMock(side_effect=RuntimeError("boom"))))
+        bus.subscribe(MagicMock(spec=["update"], update=lambda e, d: gate.wait(5)))
+        bus.subscribe(good)
+        bus.publish("book_added", {"isbn": "1"})
+        bus.publish("book_added", {"isbn": "2"})
+        good_done = threading.Event()
+        for _ in range(100):
+            if good.update.call_count == 2:
+                good_done.set()
+                break
+            time.sleep(0.01)
+        self.assertTrue(good_done.is_set())
+        gate.set()
+        self.assertTrue(bus.flush(timeout=5))
+        errors = [s["errors"] for s in bus.stats().values()]
+        self.assertEqual(sorted(errors), [0, 0, 2])
+
+    def test_service_keeps_working_when_observer_fails(self):
+        svc = LibraryService.from_bundle(RepositoryFactory.create_in_memory(), event_bus=SyncEventBus())
+        svc.register_observer(MagicMock(spec=["update"], update=MagicMock(side_effect=RuntimeError("boom"))))
+        obs = MagicMock(spec=["update"])
+        svc.register_observer(obs)
+        svc.add_book(Book("T", "A", 2000, "G", "EB1"))
+        self.assertIsNotNone(svc.books.get("EB1"))
+        obs.update.assert_called_once_with("book_added", {"isbn": "EB1"})
+
+    def test_service_with_async_bus(self):
+        bus = AsyncEventBus(coalesce_window=0.01)
+        self.addCleanup(bus.close)
+        svc = LibraryService.from_bundle(RepositoryFactory.create_in_memory(), event_bus=bus)
+        obs = _BatchObserver()
+        svc.register_observer(obs)
+        svc.add_book(Book("T", "A", 2000, "G", "EB2"))
+        svc.remove_book("EB2")
+        bus.flush(timeout=5)
+        self.assertEqual(obs.calls, [("book_added", [{"isbn": "EB2"}]), ("book_removed", [{"isbn": "EB2"}])])
+
+
+class TestAsyncLibraryService(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.bundle = RepositoryFactory.create_sqlite(os.path.join(self.tmp.name, "async.db"), pool_size=6)
+        self.svc = AsyncLibraryService.from_bundle(self.bundle)
+
+    def tearDown(self):
+        self.svc.close()
+        self.bundle.close()
+        self.tmp.cleanup()
+
+    async def test_concurrent_checkouts_serialize(self):
+        await self.svc.add_books([Book(f"T{i}", "Auth", 2000, "G", f"A{i}") for i in range(20)])
+        await self.svc.register_users([User(f"u{i}", "F", "L", "e") for i in range(10)])
+        results = await asyncio.gather(*(self.svc.issue_book("A0", f"u{i}") for i in range(10)))
+        self.assertEqual(results.count(True), 1)
+        book = await self.svc.books.get("A0")
+        self.assertFalse(book.available)
+
+    async def test_reads_overlap_and_observer_runs_on_loop(self):
+        await self.svc.add_books([Book(f"T{i}", "Auth", 2000, "G", f"A{i}") for i in range(5)])
+        loop_thread = threading.get_ident()
+        seen = []
+        self.svc.register_observer(MagicMock(update=lambda e, d: seen.append((e, threading.get_ident()))))
+        found = await asyncio.gather(*(self.svc.search_books(author="auth") for _ in range(20)))
+        self.assertTrue(all(len(r) == 5 for r in found))
+        await self.svc.remove_book("A1")
+        await asyncio.sleep(0)
+        self.assertEqual(seen, [("book_removed", loop_thread)])
+        self.assertEqual(len(await self.svc.books.list_all()), 4)
+
+
+class _FakeRoot:
+    """Замість Tk: запам'ятовує заплановані after-виклики"""
+    def __init__(self):
+        self.scheduled = []
+
+    def after(self, ms, fn):
+        self.scheduled.append(fn)
+
+    def pump(self):
+        pending, self.scheduled = self.scheduled, []
+        for fn in pending:
+            fn()
+
+
+class TestBackgroundWorker(unittest.TestCase):
+    def setUp(self):
+        self.root = _FakeRoot()
+        self.busy = []
+        self.worker = BackgroundWorker(self.root, max_workers=1, on_busy_change=self.busy.append)
+        self.addCleanup(self.worker.shutdown)
+
+    def test_result_delivered_on_poll_not_on_worker_thread(self):
+        results = []
+        future = self.worker.submit(lambda: threading.get_ident(), on_success=results.append)
+        future.result(timeout=5)
+        self.assertEqual(results, [])
+        self.root.pump()
+        self.assertEqual(len(results), 1)
+        self.assertNotEqual(results[0], threading.get_ident())
+        self.assertEqual(self.busy, [True, False])
+
+    def test_superseded_key_result_is_discarded(self):
+        gate = threading.Event()
+        results = []
+        first = self.worker.submit(lambda: gate.wait(5) and "old", key="view", on_success=results.append)
+        second = self.worker.submit(lambda: "new", key="view", on_success=results.append)
+        gate.set()
+        first.result(timeout=5)
+        second.result(timeout=5)
+        self.root.pump()
+        self.assertEqual(results, ["new"])
+        self.assertFalse(self.worker.busy)
+
+    def test_errors_and_call_in_main(self):
+        errors, calls = [], []
+        future = self.worker.submit(lambda: 1 / 0, on_error=errors.append)
+        self.worker.call_in_main(calls.append, "event")
+        with self.assertRaises(ZeroDivisionError):
+            future.result(timeout=5)
+        self.root.pump()
+        self.assertIsInstance(errors[0], ZeroDivisionError)
+        self.assertEqual(calls, ["event"])
 
 
 # -----------------------------------------
@@ -357,54 +1605,55 @@ class TestLibraryGUI(unittest.TestCase):
         self.addCleanup(patch.stopall)
 
         self.app = LibraryGUI()
-        self.app.books_list = MagicMock()
-        self.app.users_list = MagicMock()
+        self.app.worker.shutdown()
+        self.app.worker = InlineWorker()
+        self.app.books_view = MagicMock()
+        self.app.users_view = MagicMock()
+
+    def _shown(self, view):
+        """Джерело і рядки, передані у віртуалізований список останнім set_source"""
+        source, format_row = view.set_source.call_args[0]
+        rows = source.fetch_window(0, 100)
+        return source, [(format_row or self.app._book_row)(item) for item in rows]
+
+    def test_list_books_uses_repository_source(self):
+        self.app.list_books()
+        self.app.books_view.set_source.assert_called_once_with(self.mod.service.books)
+        self.assertEqual(self.app.books_view.empty_text, "")
 
-    def test_list_books_empty_then_entries(self):
-        self.mod.service.books.list_all.return_value = []
+        # Каталог уже показано: лише перечитуємо видиме вікно
+        self.app.books_view.source = self.mod.service.books
+        self.app.books_view.reset_mock()
         self.app.list_books()
-        self.app.books_list.delete.assert_called_once_with("1.0", tk.END)
-        self.app.books_list.insert.assert_not_called()
+        self.app.books_view.refresh.assert_called_once()
+        self.app.books_view.set_source.assert_not_called()
+        self.mod.service.books.iter_all.assert_not_called()
 
+    def test_book_row_format(self):
         b = Book("Z", "Y", 2000, "G", "999")
         b.available = False
         b.issued_to = "uZ"
-        self.mod.service.books.list_all.return_value = [b]
-        self.app.books_list.reset_mock()
-        self.app.list_books()
-        self.app.books_list.insert.assert_called_once_with(
-            tk.END,
-            f"- {b.title} ({b.isbn}), {b.author}, {b.year}, {b.genre}, видана ({b.issued_to})\n"
-        )
+        self.assertEqual(self.app._book_row(b), ("Z", "Y", 2000, "G", "999", "видана (uZ)"))
+        b.available = True
+        self.assertEqual(self.app._book_row(b)[-1], "доступна")
 
     def test_list_overdue_and_list_users(self):
         self.mod.service.list_overdue.return_value = []
         self.app.list_overdue()
-        self.app.books_list.insert.assert_called_with(tk.END, "Немає прострочених книг.")
+        self.assertEqual(self.app.books_view.empty_text, "Немає прострочених книг.")
+        source, rows = self._shown(self.app.books_view)
+        self.assertEqual(source.count(), 0)
 
         b = Book("M", "K", 1999, "G", "888")
         b.issued_to = "uK"
-        self.mod.service.list_overdue.return_value = ["888"]
-        self.mod.service.books.get.return_value = b
-        self.app.books_list.reset_mock()
+        self.mod.service.list_overdue.return_value = [b]
         self.app.list_overdue()
-        self.app.books_list.insert.assert_called_with(
-            tk.END,
-            f"[ПРОСТРОЧЕНА] {b.title} - {b.isbn} (видана {b.issued_to})"
-        )
+        source, rows = self._shown(self.app.books_view)
+        self.assertEqual(rows, [("M", "K", 1999, "G", "888", "ПРОСТРОЧЕНА (uK)")])
+        self.mod.service.books.get.assert_not_called()
 
-        self.mod.service.users.list_all.return_value = []
         self.app.list_users()
-        self.app.users_list.insert.assert_called_with(tk.END, "Немає користувачів.")
-
-        u = User("uV", "AA", "BB", "v@v")
-        self.mod.service.users.list_all.return_value = [u]
-        self.app.users_list.reset_mock()
-        self.app.list_users()
-        self.app.users_list.insert.assert_called_with(
-            tk.END,
-            f"- {u.user_id}: {u.first_name} {u.last_name} {u.email} \n"
-        )
+        self.app.users_view.set_source.assert_called_once_with(self.mod.service.users)
 
     def test_delete_book_popup_calls_remove(self):
         patch('Client.tk.Toplevel').start()
@@ -493,7 +1742,19 @@ class TestLibraryServiceCoverage(unittest.TestCase):
         fail = self.service.issue_book('ISBNX', 'u2')
         self.assertFalse(fail)
 
+    def test_bulk_add_fires_single_event(self):
+        books = [Book(f"T{i}", "A", 2000, "G", f"BK{i}") for i in range(4)]
+        self.assertEqual(self.service.add_books(books, chunk_size=3), 4)
+        self.obs1.update.assert_called_once_with(
+            'books_added', {'isbns': ["BK0", "BK1", "BK2", "BK3"], 'count': 4}
+        )
+        self.assertEqual(self.service.register_users([User("u9", "A", "B", "c")]), 1)
+        self.obs2.update.assert_any_call('users_registered', {'user_ids': ["u9"], 'count': 1})
+
     def test_return_book_and_notification(self):
+        self.service.register_user(User('uY', 'F', 'L', 'e'))
+        self.service.add_book(Book('T', 'A', 2000, 'G', 'ISBNY'))
+        self.service.issue_book('ISBNY', 'uY')
         res = self.service.return_book('ISBNY', 'uY')
         self.assertTrue(res)
         self.obs2.update.assert_any_call('book_returned', {'isbn': 'ISBNY', 'user_id': 'uY'})
@@ -521,7 +1782,8 @@ class TestLibraryServiceCoverage(unittest.TestCase):
         past_date = (datetime.date.today() - timedelta(days=40)).isoformat()
         self.service.loans.issue('OL1', 'u3', past_date)
         overdue = self.service.list_overdue(max_days=30)
-        self.assertIn('OL1', overdue)
+        self.assertIn('OL1', [b.isbn for b in overdue])
+        self.assertEqual(self.service.list_overdue(max_days=30, limit=0), [])
 
 
 # -----------------------------------------
@@ -538,20 +1800,42 @@ class TestLibraryGUIPopupMethods(unittest.TestCase):
         self.addCleanup(patch.stopall)
 
         self.app = LibraryGUI()
-        self.app.books_list = MagicMock()
-        self.app.users_list = MagicMock()
-
-    def test_update_triggers_list_books(self):
-        self.app.list_books = MagicMock()
-        self.app.update('book_added', {'isbn': 'X'})
-        self.app.list_books.assert_called_once()
-        self.app.list_books.reset_mock()
-        self.app.update('user_registered', {'user_id': 'Y'})
-        self.app.list_books.assert_not_called()
+        self.app.worker.shutdown()
+        self.app.worker = InlineWorker()
+        self.app.books_view = MagicMock()
+        self.app.users_view = MagicMock()
+
+    def test_events_patch_rows_once_per_frame(self):
+        self.app.after = MagicMock(return_value="flush")
+        self.app.books_view.source = self.mod.service.books
+        issued = Book("T", "A", 2000, "G", "X")
+        self.mod.service.books.get.return_value = issued
+
+        self.app.update('book_issued', {'isbn': 'X', 'user_id': 'u1'})
+        self.app.update('book_returned', {'isbn': 'X', 'user_id': 'u1'})
+        self.app.update('book_removed', {'isbn': 'Y'})
+        self.app.update('user_registered', {'user_id': 'u2'})
+        # Один відкладений прохід на кадр
+        self.app.after.assert_called_once()
+        flush = self.app.after.call_args[0][1]
+        flush()
+        self.mod.service.books.get.assert_called_once_with('X')
+        self.app.books_view.update_item.assert_called_once_with(issued)
+        self.app.books_view.remove_key.assert_called_once_with('Y')
+        self.app.books_view.refresh.assert_not_called()
+        self.mod.service.books.iter_all.assert_not_called()
+
+    def test_bulk_event_refreshes_window(self):
+        self.app.after = MagicMock(return_value="flush")
+        self.app.books_view.source = self.mod.service.books
+        self.app.update('books_added', {'isbns': [str(i) for i in range(1000)], 'count': 1000})
+        self.app.after.call_args[0][1]()
+        self.app.books_view.refresh.assert_called_once()
+        self.mod.service.books.get.assert_not_called()
 
     def test_search_books_popup_no_results_and_with_results(self):
         patch('Client.tk.Toplevel').start()
-        entry_labels = ["Назва", "Автор", "Рік", "Жанр", "ISBN"]
+        entry_labels = ["Назва", "Автор", "Рік", "Жанр", "ISBN", "Ключові слова"]
         # Case 1: all empty fields
         mocks = [MagicMock(get=MagicMock(return_value="")) for _ in entry_labels]
 
@@ -567,12 +1851,14 @@ class TestLibraryGUIPopupMethods(unittest.TestCase):
                 return btn
             with patch('Client.ttk.Button', side_effect=fake_button):
                 self.app.search_books_popup()
-                self.app.books_list.delete.assert_called_once_with("1.0", tk.END)
-                self.app.books_list.insert.assert_called_with(tk.END, "Нічого не знайдено.")
-            self.app.books_list.reset_mock()
+                self.app.books_view.set_source.assert_called_once()
+                self.assertEqual(self.app.books_view.empty_text, "Нічого не знайдено.")
+                source, _ = self.app.books_view.set_source.call_args[0]
+                self.assertEqual(source.count(), 0)
+            self.app.books_view.reset_mock()
 
         # Case 2: title = "Py", service returns one book
-        mocks = [MagicMock(get=MagicMock(return_value=v)) for v in ["Py", "", "", "", ""]]
+        mocks = [MagicMock(get=MagicMock(return_value=v)) for v in ["Py", "", "", "", "", ""]]
         with patch('Client.ttk.Entry', side_effect=lambda parent: mocks.pop(0)):
             b = Book("Python3", "G", 2021, "Prog", "123")
             b.available = True
@@ -584,9 +1870,19 @@ class TestLibraryGUIPopupMethods(unittest.TestCase):
                 return btn
             with patch('Client.ttk.Button', side_effect=fake_button2):
                 self.app.search_books_popup()
-                expected_line = f"- {b.title} ({b.isbn}), {b.author}, {b.year}, {b.genre}, доступна\n"
-                self.app.books_list.delete.assert_called_once_with("1.0", tk.END)
-                self.app.books_list.insert.assert_called_with(tk.END, expected_line)
+                self.mod.service.search_books.assert_called_with(title="Py")
+                source, _ = self.app.books_view.set_source.call_args[0]
+                self.assertEqual(source.fetch_window(0, 10), [b])
+            self.app.books_view.reset_mock()
+
+        # Case 3: keywords go to the ranked full-text search
+        mocks = [MagicMock(get=MagicMock(return_value=v)) for v in ["", "", "", "", "", "кобзар"]]
+        with patch('Client.ttk.Entry', side_effect=lambda parent: mocks.pop(0)):
+            self.mod.service.full_text_search.return_value = []
+            with patch('Client.ttk.Button', side_effect=fake_button2):
+                self.app.search_books_popup()
+                self.mod.service.full_text_search.assert_called_once_with("кобзар")
+                self.assertEqual(self.app.books_view.empty_text, "Нічого не знайдено.")
 
     def test_add_book_popup_success_and_failure(self):
         patch('Client.tk.Toplevel').start()
@@ -644,7 +1940,7 @@ class TestLibraryGUIPopupMethods(unittest.TestCase):
         mocks = [MagicMock(get=MagicMock(return_value=v)) for v in new_values]
         with patch('Client.ttk.Entry', side_effect=lambda parent: mocks.pop(0)), \
             patch.object(self.mod.service, 'remove_book') as mock_remove, \
-            patch.object(self.mod.service, 'add_book') as mock_add, \
+            patch.object(self.mod.service, 'update_book') as mock_update, \
             patch('Client.messagebox.showinfo') as mock_info:
             def fake_button(parent, text, command, **kwargs):
                 btn = MagicMock()
@@ -653,8 +1949,8 @@ class TestLibraryGUIPopupMethods(unittest.TestCase):
                 return btn
             with patch('Client.ttk.Button', side_effect=fake_button):
                 self.app._show_book_edit_form(orig_book)
-                mock_remove.assert_called_once_with("EDIT0")
-                args, _ = mock_add.call_args
+                mock_remove.assert_not_called()
+                args, _ = mock_update.call_args
                 saved_book = args[0]
                 self.assertEqual(saved_book.title, "EditedTitle")
                 self.assertEqual(saved_book.author, "EditedAuthor")
@@ -754,6 +2050,41 @@ class TestLibraryGUIPopupMethods(unittest.TestCase):
                 mock_info.assert_called_once()
 
 
+class TestVirtualTreeview(unittest.TestCase):
+    def setUp(self):
+        self.root = tk.Tk()
+        self.root.withdraw()
+        self.addCleanup(self.root.destroy)
+        self.view = VirtualTreeview(
+            self.root, InlineWorker(), [("title", "Назва", 100), ("isbn", "ISBN", 100)],
+            lambda b: (b.title, b.isbn), key="isbn", height=3,
+        )
+        self.view.set_source(ListSource(Book(f"T{i}", "A", 2000, "G", f"B{i}") for i in range(10)))
+
+    def shown(self):
+        self.root.update_idletasks()
+        return [self.view.tree.item(iid, "values")[1] for iid in self.view.tree.get_children()]
+
+    def test_only_visible_rows_are_materialized(self):
+        self.assertEqual(self.view.total, 10)
+        self.assertEqual(self.shown(), ["B0", "B1", "B2"])
+        self.view.scroll(5)
+        self.assertEqual(self.shown(), ["B5", "B6", "B7"])
+        self.view.sort_by("title")
+        self.view.sort_by("title")
+        self.assertEqual(self.shown(), ["B9", "B8", "B7"])
+
+    def test_row_patches_without_reload(self):
+        self.view.source = MagicMock()  # подальші читання з джерела не очікуються
+        self.view.insert_item(Book("T00", "A", 2000, "G", "B00"))
+        self.view.update_item(Book("Нова назва", "A", 2000, "G", "B1"))
+        self.view.remove_key("B0")
+        self.assertEqual(self.shown(), ["B00", "B1", "B2"])
+        self.assertEqual(self.view.total, 10)
+        self.assertEqual(self.view.tree.item(self.view.tree.get_children()[1], "values")[0], "Нова назва")
+        self.view.source.fetch_window.assert_not_called()
+
+
 class TestLibraryGUIStructure(unittest.TestCase):
     def setUp(self):
         patch('Client.service', MagicMock()).start()
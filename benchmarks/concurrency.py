@@ -0,0 +1,140 @@
+"""
+Бенчмарк конкурентного доступу: кілька потоків-читачів і потоки-записувачі
+працюють з однією файловою базою через окремі з'єднання (як кілька клієнтів
+на одному library.db). Порівнює профілі сховища з config.STORAGE_PROFILES.
+
+    python -m benchmarks.concurrency --readers 4 --writers 2 --seconds 5
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+
+from config import STORAGE_PROFILES
+from library.book import Book
+from library.user import User
+from repository.factory import RepositoryFactory
+
+
+class _ErrorCounter(logging.Handler):
+    """Рахує помилки репозиторіїв (вони логуються, а не піднімаються)"""
+    def __init__(self):
+        super().__init__(logging.ERROR)
+        self.errors = 0
+        self.locked = 0
+
+    def emit(self, record):
+        self.errors += 1
+        if "locked" in record.getMessage():
+            self.locked += 1
+
+
+def _percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def run_profile(profile_name, db_path, books, readers, writers, seconds, seed=42):
+    bundle = RepositoryFactory.create_sqlite(
+        db_path, pool_size=readers + writers + 1, profile=STORAGE_PROFILES[profile_name]
+    )
+    bundle.book_repo.add_many(
+        Book(f"Title {i}", f"Author {i % 500}", 1900 + i % 120, f"Genre {i % 20}", f"{i:013d}")
+        for i in range(books)
+    )
+    bundle.user_repo.add_many(User(f"u{i}", "F", "L", f"u{i}@example.com") for i in range(writers))
+
+    counter = _ErrorCounter()
+    repo_logger = logging.getLogger("repository.sqlite_repository")
+    repo_logger.addHandler(counter)
+    deadline = time.perf_counter() + seconds
+    read_latencies, write_latencies = [], []
+    lock = threading.Lock()
+
+    def reader(n):
+        rnd = random.Random(seed + n)
+        local = []
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            bundle.book_repo.get(f"{rnd.randrange(books):013d}")
+            bundle.book_repo.search({"author": f"Author {rnd.randrange(500)}"}, limit=20)
+            local.append(time.perf_counter() - start)
+        with lock:
+            read_latencies.extend(local)
+        bundle.pool.release()
+
+    def writer(n):
+        rnd = random.Random(seed + 1000 + n)
+        local = []
+        user_id = f"u{n}"
+        while time.perf_counter() < deadline:
+            isbn = f"{rnd.randrange(books):013d}"
+            start = time.perf_counter()
+            bundle.loan_repo.issue(isbn, user_id, "2025-01-01")
+            bundle.loan_repo.return_book(isbn, user_id)
+            local.append(time.perf_counter() - start)
+        with lock:
+            write_latencies.extend(local)
+        bundle.pool.release()
+
+    threads = [threading.Thread(target=reader, args=(i,)) for i in range(readers)]
+    threads += [threading.Thread(target=writer, args=(i,)) for i in range(writers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    repo_logger.removeHandler(counter)
+    journal = bundle.book_repo.conn.execute("PRAGMA journal_mode").fetchone()[0]
+    bundle.close()
+
+    return {
+        "profile": profile_name,
+        "journal_mode": journal,
+        "reads_per_s": len(read_latencies) / seconds,
+        "writes_per_s": len(write_latencies) / seconds,
+        "read_p50_ms": statistics.median(read_latencies) * 1000 if read_latencies else 0.0,
+        "read_p95_ms": _percentile(read_latencies, 0.95) * 1000,
+        "write_p95_ms": _percentile(write_latencies, 0.95) * 1000,
+        "errors": counter.errors,
+        "locked_errors": counter.locked,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profiles", nargs="+", default=["legacy", "wal"], choices=sorted(STORAGE_PROFILES))
+    parser.add_argument("--books", type=int, default=5000)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--json", help="записати результати у JSON-файл")
+    args = parser.parse_args(argv)
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in args.profiles:
+            db_path = os.path.join(tmp, f"{name}.db")
+            results.append(run_profile(name, db_path, args.books, args.readers, args.writers, args.seconds))
+
+    header = f"{'profile':<8} {'journal':<8} {'reads/s':>9} {'writes/s':>9} {'read p50':>9} {'read p95':>9} {'write p95':>10} {'errors':>7}"
+    print(header)
+    for r in results:
+        print(
+            f"{r['profile']:<8} {r['journal_mode']:<8} {r['reads_per_s']:>9.0f} {r['writes_per_s']:>9.0f} "
+            f"{r['read_p50_ms']:>7.2f}ms {r['read_p95_ms']:>7.2f}ms {r['write_p95_ms']:>8.2f}ms {r['errors']:>7}"
+        )
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Бенчмарк відображення рядків у доменні об'єкти: вартість одного рядка
+list_all() (разом із читанням з SQLite і окремо лише мапінг) і пам'ять
+на об'єкт. «before» — попередній шлях (SELECT *, sqlite3.Row з доступом
+за назвою, клас із __dict__), «after» — поточні репозиторії (явні колонки,
+кортежі, Book/User зі __slots__).
+
+    python -m benchmarks.models --rows 100000 --repeat 5
+"""
+import argparse
+import json
+import sqlite3
+import time
+import tracemalloc
+from datetime import date
+
+from library.book import Book
+from library.user import User
+from repository.sqlite_repository import (
+    SQLiteBookRepository, SQLiteUserRepository,
+    _SELECT_BOOKS, _SELECT_USERS, _book_from_tuple, _user_from_tuple,
+)
+
+
+class _DictBook:
+    """Книга у вигляді до __slots__ (для порівняння)"""
+    def __init__(self, title, author, year, genre, isbn, available=True, issued_to=None):
+        self.title = title
+        self.author = author
+        self.year = year
+        self.genre = genre
+        self.isbn = isbn
+        self.available = available
+        self.issued_to = issued_to
+        self.issue_date = None
+        self.times_issued = 0
+
+
+class _DictUser:
+    def __init__(self, user_id, first_name, last_name, email):
+        self.user_id = user_id
+        self.first_name = first_name
+        self.last_name = last_name
+        self.email = email
+        self.issued_books = []
+
+
+def _legacy_book(row):
+    book = _DictBook(row["title"], row["author"], row["year"], row["genre"], row["isbn"])
+    book.available = bool(row["available"])
+    book.issued_to = row["issued_to"]
+    book.issue_date = date.fromisoformat(row["issue_date"]) if row["issue_date"] else None
+    book.times_issued = row["times_issued"]
+    return book
+
+
+def _legacy_user(row):
+    return _DictUser(row["user_id"], row["first_name"], row["last_name"], row["email"])
+
+
+def _create_db(rows: int) -> sqlite3.Connection:
+    conn = sqlite3.connect(":memory:")
+    conn.row_factory = sqlite3.Row
+    conn.execute("""
+        CREATE TABLE books (
+            isbn TEXT PRIMARY KEY,
+            title TEXT, author TEXT, year INTEGER,
+            genre TEXT, available INTEGER,
+            issued_to TEXT, issue_date TEXT, times_issued INTEGER
+        )
+    """)
+    conn.execute("CREATE TABLE users (user_id TEXT PRIMARY KEY, first_name TEXT, last_name TEXT, email TEXT)")
+    SQLiteBookRepository(conn).add_many(
+        Book(f"Title {i}", f"Author {i % 500}", 1900 + i % 120, f"Genre {i % 20}", f"{i:013d}")
+        for i in range(rows)
+    )
+    # Кожна десята книга видана — щоб мапер розбирав і дати
+    conn.execute("UPDATE books SET available=0, issued_to='u1', issue_date='2025-01-01' WHERE rowid % 10 = 0")
+    SQLiteUserRepository(conn).add_many(User(f"u{i}", "First", f"Last {i}", f"u{i}@example.com") for i in range(rows))
+    conn.commit()
+    return conn
+
+
+def _best_per_row(load, rows: int, repeat: int) -> float:
+    """Найкращий час load() серед repeat спроб, у мікросекундах на рядок"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        load()
+        best = min(best, time.perf_counter() - start)
+    return best / rows * 1e6
+
+
+def _bytes_per_object(load, rows: int) -> float:
+    """Пам'ять, яку займає результат load(), на один об'єкт (tracemalloc)"""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    objects = load()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del objects
+    return (after - before) / rows
+
+
+def run(rows: int, repeat: int) -> list:
+    conn = _create_db(rows)
+    books = SQLiteBookRepository(conn)
+    users = SQLiteUserRepository(conn)
+    # (таблиця, варіант, повне читання, сирі рядки, мапер рядок → об'єкт)
+    cases = [
+        ("books", "before", lambda: [_legacy_book(r) for r in conn.execute("SELECT * FROM books").fetchall()],
+         conn.execute("SELECT * FROM books").fetchall(), _legacy_book),
+        ("books", "after", books.list_all, books._select(_SELECT_BOOKS).fetchall(), _book_from_tuple),
+        ("users", "before", lambda: [_legacy_user(r) for r in conn.execute("SELECT * FROM users").fetchall()],
+         conn.execute("SELECT * FROM users").fetchall(), _legacy_user),
+        ("users", "after", users.list_all, users._select(_SELECT_USERS).fetchall(), _user_from_tuple),
+    ]
+    results = []
+    for table, variant, load, raw_rows, mapper in cases:
+        results.append({
+            "table": table,
+            "variant": variant,
+            "rows": rows,
+            "us_per_row": _best_per_row(load, rows, repeat),
+            "map_us_per_row": _best_per_row(lambda: list(map(mapper, raw_rows)), rows, repeat),
+            "bytes_per_object": _bytes_per_object(load, rows),
+        })
+    conn.close()
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", help="записати результати у JSON-файл")
+    args = parser.parse_args(argv)
+
+    results = run(args.rows, args.repeat)
+    print(f"{'table':<6} {'variant':<7} {'us/row':>8} {'map us/row':>11} {'bytes/obj':>10}")
+    for r in results:
+        print(
+            f"{r['table']:<6} {r['variant']:<7} {r['us_per_row']:>8.2f} "
+            f"{r['map_us_per_row']:>11.2f} {r['bytes_per_object']:>10.0f}"
+        )
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,330 @@
+"""
+Бенчмарк-набір репозиторіїв і LibraryService на синтетичних даних
+(книги, користувачі, видачі) масштабу 1k / 100k / 1m з фіксованим seed.
+Для кожної операції: пропускна здатність, затримка p50/p95/p99 і пікова
+пам'ять одного виклику (tracemalloc). Результати пишуться в JSON разом
+із комітом git, тож прогони різних комітів можна порівняти.
+
+    python -m benchmarks.suite run --scale 100k --json results/100k-new.json
+    python -m benchmarks.suite run --scale 1m --db-dir /tmp/bench --ops get list_overdue
+    python -m benchmarks.suite compare results/100k-old.json results/100k-new.json --threshold 10
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.concurrency import _percentile
+from library.book import Book
+from library.user import User
+from repository.factory import RepositoryFactory
+from service.library_service import LibraryService
+
+SCALES = {"1k": 1_000, "100k": 100_000, "1m": 1_000_000}
+GENRES = ("Поезія", "Проза", "Драма", "Фантастика", "Детектив", "Історія", "Наука", "Дитяча", "Біографія", "Філософія")
+WORDS = ("сад", "ніч", "море", "вітер", "місто", "пісня", "дорога", "зоря", "тінь", "ліс", "камінь", "сон")
+# Частка книг, виданих на момент генерації (кожна LOAN_EVERY-та), і діапазон давності видачі
+LOAN_EVERY = 5
+MAX_LOAN_AGE_DAYS = 60
+USERS_PER_BOOK = 0.1
+AUTHORS_PER_BOOK = 0.02
+
+
+def isbn13(n: int) -> str:
+    """Коректний ISBN-13 (префікс 978) з порядкового номера"""
+    body = f"978{n % 10**9:09d}"
+    total = sum(int(d) * (3 if i % 2 else 1) for i, d in enumerate(body))
+    return body + str((10 - total % 10) % 10)
+
+
+class Dataset:
+    """Розміри й генератори синтетичних даних; однаковий seed — однакові рядки"""
+    def __init__(self, books: int, seed: int = 42):
+        self.books = books
+        self.users = max(1, int(books * USERS_PER_BOOK))
+        self.authors = max(1, int(books * AUTHORS_PER_BOOK))
+        self.seed = seed
+        self.today = datetime.date.today()
+
+    def user_id(self, n: int) -> str:
+        return f"u{n:07d}"
+
+    def is_loaned(self, n: int) -> bool:
+        return n % LOAN_EVERY == 0
+
+    def iter_users(self):
+        rnd = random.Random(self.seed)
+        for n in range(self.users):
+            yield User(self.user_id(n), f"Ім'я{rnd.randrange(500)}", f"Прізвище{rnd.randrange(5000)}", f"user{n}@example.com")
+
+    def iter_books(self, loans: list):
+        """Книги; для виданих у loans додаються пари (user_id, isbn)"""
+        rnd = random.Random(self.seed + 1)
+        for n in range(self.books):
+            title = " ".join(rnd.choice(WORDS) for _ in range(rnd.randint(1, 4))).capitalize()
+            book = Book(
+                f"{title} {n}", f"Автор {rnd.randrange(self.authors)}",
+                rnd.randint(1800, self.today.year), rnd.choice(GENRES), isbn13(n),
+            )
+            book.times_issued = rnd.randrange(20)
+            if self.is_loaned(n):
+                book.available = False
+                book.issued_to = self.user_id(rnd.randrange(self.users))
+                book.issue_date = self.today - datetime.timedelta(days=rnd.randrange(MAX_LOAN_AGE_DAYS))
+                book.times_issued += 1
+                loans.append((book.issued_to, book.isbn))
+            yield book
+
+    def populate(self, bundle) -> None:
+        service = LibraryService.from_bundle(bundle)
+        service.register_users(self.iter_users())
+        loans: list = []
+        service.add_books(self.iter_books(loans), chunk_size=5000)
+        with bundle.transaction():
+            bundle.loan_repo.conn.executemany("INSERT INTO issued_books (user_id, isbn) VALUES (?, ?)", loans)
+
+
+def open_dataset(dataset: Dataset, db_dir: str):
+    """Бандл над згенерованою базою; файл у db_dir перевикористовується між прогонами"""
+    path = os.path.join(db_dir, f"bench-{dataset.books}-{dataset.seed}.db")
+    fresh = not os.path.exists(path)
+    bundle = RepositoryFactory.create_sqlite(path)
+    if fresh or bundle.book_repo.count() != dataset.books:
+        bundle.close()
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+        bundle = RepositoryFactory.create_sqlite(path)
+        start = time.perf_counter()
+        dataset.populate(bundle)
+        print(f"Generated {dataset.books} books in {time.perf_counter() - start:.1f}s -> {path}", file=sys.stderr)
+    return bundle
+
+
+class Operation:
+    """
+    Операція бенчмарку: prepare(rnd) готує аргументи (не входить у час),
+    run(*args) вимірюється, cleanup(*args) повертає стан бази (не входить у час).
+    weight — частка від --iterations (важкі операції виконуються рідше).
+    """
+    def __init__(self, name, run, prepare=None, cleanup=None, weight=1.0):
+        self.name = name
+        self.run = run
+        self.prepare = prepare or (lambda rnd: ())
+        self.cleanup = cleanup
+        self.weight = weight
+
+    def iterations(self, base: int) -> int:
+        return max(1, int(base * self.weight))
+
+
+def build_operations(service: LibraryService, dataset: Dataset) -> list:
+    books, loans = service.books, service.loans
+
+    def any_isbn(rnd):
+        return (isbn13(rnd.randrange(dataset.books)),)
+
+    def free_isbn(rnd):
+        while True:
+            n = rnd.randrange(dataset.books)
+            if not dataset.is_loaned(n):
+                return isbn13(n), dataset.user_id(rnd.randrange(dataset.users))
+
+    def issued(rnd):
+        # Для вимірювання повернення книгу видаємо заздалегідь, поза часом виклику
+        isbn, user_id = free_isbn(rnd)
+        loans.issue(isbn, user_id, dataset.today.isoformat())
+        return isbn, user_id
+
+    def window(rnd):
+        return rnd.randrange(max(1, dataset.books - 50)), 50, rnd.choice((None, "title", "year"))
+
+    operations = [
+        Operation("get", books.get, any_isbn),
+        Operation("count", books.count),
+        Operation("count_available", books.count_available),
+        Operation("fetch_window", books.fetch_window, window),
+        Operation("search_books", lambda author: service.search_books(author=author, limit=100),
+                  lambda rnd: (f"Автор {rnd.randrange(dataset.authors)}",)),
+        Operation("full_text_search", service.full_text_search, lambda rnd: (rnd.choice(WORDS),), weight=0.5),
+        Operation("list_overdue", service.list_overdue, weight=0.1),
+        Operation("issue_book", service.issue_book, free_isbn,
+                  cleanup=lambda isbn, user_id: loans.return_book(isbn, user_id)),
+        Operation("return_book", service.return_book, issued),
+        Operation("list_all", books.list_all, weight=0.01),
+    ]
+    try:
+        import numpy  # noqa: F401 — звіт потребує numpy
+        operations.append(Operation("circulation_report", service.circulation_report, weight=0.01))
+    except ImportError:
+        pass
+    return operations
+
+
+def measure(op: Operation, base_iterations: int, warmup: int, seed: int) -> dict:
+    rnd = random.Random(seed)
+    for _ in range(warmup):
+        args = op.prepare(rnd)
+        op.run(*args)
+        if op.cleanup:
+            op.cleanup(*args)
+
+    latencies, rows = [], 0
+    for _ in range(op.iterations(base_iterations)):
+        args = op.prepare(rnd)
+        start = time.perf_counter()
+        result = op.run(*args)
+        latencies.append(time.perf_counter() - start)
+        if isinstance(result, list):
+            rows += len(result)
+        if op.cleanup:
+            op.cleanup(*args)
+
+    # Пам'ять — окремим викликом: tracemalloc суттєво сповільнює виконання
+    args = op.prepare(rnd)
+    tracemalloc.start()
+    result = op.run(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    del result
+    if op.cleanup:
+        op.cleanup(*args)
+
+    total = sum(latencies)
+    return {
+        "op": op.name,
+        "calls": len(latencies),
+        "ops_per_s": len(latencies) / total if total else 0.0,
+        "rows_per_call": rows / len(latencies),
+        "mean_ms": statistics.fmean(latencies) * 1000,
+        "p50_ms": _percentile(latencies, 0.50) * 1000,
+        "p95_ms": _percentile(latencies, 0.95) * 1000,
+        "p99_ms": _percentile(latencies, 0.99) * 1000,
+        "peak_kib": peak / 1024,
+    }
+
+
+def git_revision() -> dict:
+    def git(*args):
+        try:
+            return subprocess.run(
+                ["git", *args], capture_output=True, text=True, check=True,
+                cwd=os.path.dirname(os.path.abspath(__file__)),
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    commit = git("rev-parse", "HEAD")
+    status = git("status", "--porcelain", "--untracked-files=no")
+    return {"commit": commit, "dirty": bool(status) if status is not None else None}
+
+
+def run(args) -> dict:
+    dataset = Dataset(SCALES[args.scale], args.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        bundle = open_dataset(dataset, args.db_dir or tmp)
+        try:
+            service = LibraryService.from_bundle(bundle)
+            operations = build_operations(service, dataset)
+            if args.ops:
+                operations = [op for op in operations if op.name in args.ops]
+            results = []
+            for op in operations:
+                results.append(measure(op, args.iterations, args.warmup, args.seed))
+                r = results[-1]
+                print(
+                    f"{r['op']:<20} {r['calls']:>6} {r['ops_per_s']:>10.0f} {r['p50_ms']:>9.3f} "
+                    f"{r['p95_ms']:>9.3f} {r['p99_ms']:>9.3f} {r['peak_kib']:>10.0f}"
+                )
+        finally:
+            bundle.close()
+    return {
+        "meta": {
+            **git_revision(),
+            "scale": args.scale,
+            "books": dataset.books,
+            "users": dataset.users,
+            "seed": args.seed,
+            "iterations": args.iterations,
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        },
+        "results": results,
+    }
+
+
+def compare(old: dict, new: dict, threshold: float) -> list:
+    """
+    Порівнює два прогони за операціями. Регресія — p50/p95 зросли або пропускна
+    здатність упала більше ніж на threshold відсотків. Повертає список регресій.
+    """
+    old_ops = {r["op"]: r for r in old["results"]}
+    regressions = []
+    print(f"{old['meta'].get('commit') or '?'} -> {new['meta'].get('commit') or '?'} ({new['meta']['scale']})")
+    print(f"{'op':<20} {'p50 ms':>17} {'p95 ms':>17} {'ops/s':>19}")
+    for r in new["results"]:
+        base = old_ops.get(r["op"])
+        if base is None:
+            continue
+        cells, worse = [], []
+        for metric, higher_is_worse, fmt in (("p50_ms", True, "9.3f"), ("p95_ms", True, "9.3f"),
+                                             ("ops_per_s", False, "11.0f")):
+            before, after = base[metric], r[metric]
+            change = (after - before) / before * 100 if before else 0.0
+            if (change if higher_is_worse else -change) > threshold:
+                worse.append(metric)
+            cells.append(f"{after:{fmt}} {change:>+6.1f}%")
+        print(f"{r['op']:<20} " + " ".join(cells) + ("  REGRESSION" if worse else ""))
+        if worse:
+            regressions.append({"op": r["op"], "metrics": worse})
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="виміряти операції на синтетичних даних")
+    run_parser.add_argument("--scale", choices=sorted(SCALES), default="1k")
+    run_parser.add_argument("--seed", type=int, default=42)
+    run_parser.add_argument("--iterations", type=int, default=200, help="викликів легкої операції")
+    run_parser.add_argument("--warmup", type=int, default=1)
+    run_parser.add_argument("--ops", nargs="+", help="лише ці операції")
+    run_parser.add_argument("--db-dir", help="каталог для згенерованих баз (перевикористовуються)")
+    run_parser.add_argument("--json", help="записати результати у JSON-файл")
+
+    compare_parser = commands.add_parser("compare", help="порівняти два JSON-файли результатів")
+    compare_parser.add_argument("old")
+    compare_parser.add_argument("new")
+    compare_parser.add_argument("--threshold", type=float, default=10.0, help="допустиме погіршення, %%")
+    args = parser.parse_args(argv)
+
+    if args.command == "compare":
+        with open(args.old, encoding="utf-8") as f:
+            old = json.load(f)
+        with open(args.new, encoding="utf-8") as f:
+            new = json.load(f)
+        return 1 if compare(old, new, args.threshold) else 0
+
+    print(f"{'op':<20} {'calls':>6} {'ops/s':>10} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'peak KiB':>10}")
+    report = run(args)
+    if args.json:
+        os.makedirs(os.path.dirname(os.path.abspath(args.json)), exist_ok=True)
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,10 +1,149 @@
+import logging
 import os
+from logging.handlers import RotatingFileHandler
+from typing import Optional
 from dotenv import load_dotenv
 
 load_dotenv()
 
+_JOURNAL_MODES = ("DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF")
+_SYNCHRONOUS_LEVELS = ("OFF", "NORMAL", "FULL", "EXTRA")
+_TEMP_STORES = ("DEFAULT", "FILE", "MEMORY")
+LOG_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+# Логер журналу повільних запитів (repository/slow_query.py)
+SLOW_QUERY_LOGGER = "repository.slow_query"
+# Каталог файлів журналів за замовчуванням: logs/ поруч із кодом, а не поточний каталог процесу
+DEFAULT_LOG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "logs")
+
+
+class StorageProfile:
+    """
+    Набір PRAGMA, що застосовується до кожного з'єднання з SQLite.
+    Значення підставляються в PRAGMA напряму, тому перевіряються тут.
+    """
+    def __init__(
+        self,
+        journal_mode: str = "WAL",
+        synchronous: str = "NORMAL",
+        cache_size: int = -16000,
+        mmap_size: int = 64 * 1024 * 1024,
+        busy_timeout: int = 5000,
+        temp_store: str = "MEMORY",
+    ):
+        self.journal_mode = _choice("journal_mode", journal_mode, _JOURNAL_MODES)
+        self.synchronous = _choice("synchronous", synchronous, _SYNCHRONOUS_LEVELS)
+        # Від'ємне значення — розмір у KiB, додатне — у сторінках
+        self.cache_size = int(cache_size)
+        self.mmap_size = int(mmap_size)
+        self.busy_timeout = int(busy_timeout)
+        self.temp_store = _choice("temp_store", temp_store, _TEMP_STORES)
+
+    def pragmas(self) -> list:
+        # busy_timeout першим: перемикання журналу теж може чекати на блокування
+        return [
+            ("busy_timeout", self.busy_timeout),
+            ("journal_mode", self.journal_mode),
+            ("synchronous", self.synchronous),
+            ("cache_size", self.cache_size),
+            ("mmap_size", self.mmap_size),
+            ("temp_store", self.temp_store),
+        ]
+
+    def __repr__(self):
+        return "StorageProfile(" + ", ".join(f"{k}={v!r}" for k, v in self.pragmas()) + ")"
+
+
+def _choice(name: str, value: str, allowed: tuple) -> str:
+    value = str(value).upper()
+    if value not in allowed:
+        raise ValueError(f"Invalid {name}: {value!r}, expected one of {allowed}")
+    return value
+
+
+# Готові профілі: legacy — поведінка SQLite за замовчуванням (журнал відкату,
+# читачі блокуються на час commit), wal — кілька клієнтів на одній базі
+STORAGE_PROFILES = {
+    "legacy": StorageProfile(
+        journal_mode="DELETE", synchronous="FULL", cache_size=-2000,
+        mmap_size=0, busy_timeout=5000, temp_store="DEFAULT",
+    ),
+    "wal": StorageProfile(),
+}
+
+
 class Settings:
     DB_PATH: str = os.getenv("DB_PATH", "library.db")
     LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
+    # Метрики операцій (metrics.registry); METRICS_PATH — файл, куди їх записати при виході
+    METRICS_ENABLED: bool = os.getenv("METRICS_ENABLED", "0").lower() in ("1", "true", "yes", "on")
+    METRICS_PATH = os.getenv("METRICS_PATH")
+    LOG_DIR: str = os.getenv("LOG_DIR", DEFAULT_LOG_DIR)
+    # Журнал повільних запитів вмикається явно: поріг у мілісекундах ("off" — без вимірювань)
+    # і файл з ротацією (відносний шлях — у LOG_DIR; порожній — записи йдуть у звичайний лог)
+    SLOW_QUERY_MS: str = os.getenv("SLOW_QUERY_MS", "off")
+    SLOW_QUERY_LOG: str = os.getenv("SLOW_QUERY_LOG", "")
+    SLOW_QUERY_LOG_BYTES: int = int(os.getenv("SLOW_QUERY_LOG_BYTES", str(1024 * 1024)))
+    SLOW_QUERY_LOG_BACKUPS: int = int(os.getenv("SLOW_QUERY_LOG_BACKUPS", "5"))
+    # Профіль сховища та точкові перевизначення окремих PRAGMA
+    DB_PROFILE: str = os.getenv("DB_PROFILE", "wal")
+    DB_JOURNAL_MODE = os.getenv("DB_JOURNAL_MODE")
+    DB_SYNCHRONOUS = os.getenv("DB_SYNCHRONOUS")
+    DB_CACHE_SIZE = os.getenv("DB_CACHE_SIZE")
+    DB_MMAP_SIZE = os.getenv("DB_MMAP_SIZE")
+    DB_BUSY_TIMEOUT = os.getenv("DB_BUSY_TIMEOUT")
+    DB_TEMP_STORE = os.getenv("DB_TEMP_STORE")
+
+    def storage_profile(self) -> StorageProfile:
+        if self.DB_PROFILE not in STORAGE_PROFILES:
+            raise ValueError(f"Unknown DB_PROFILE {self.DB_PROFILE!r}, expected one of {sorted(STORAGE_PROFILES)}")
+        base = STORAGE_PROFILES[self.DB_PROFILE]
+        overrides = {
+            "journal_mode": self.DB_JOURNAL_MODE,
+            "synchronous": self.DB_SYNCHRONOUS,
+            "cache_size": self.DB_CACHE_SIZE,
+            "mmap_size": self.DB_MMAP_SIZE,
+            "busy_timeout": self.DB_BUSY_TIMEOUT,
+            "temp_store": self.DB_TEMP_STORE,
+        }
+        values = dict(base.pragmas())
+        values.update({k: v for k, v in overrides.items() if v is not None})
+        return StorageProfile(**values)
+
+    def slow_query_threshold(self) -> Optional[float]:
+        """Поріг повільного запиту в секундах; None — журнал вимкнено"""
+        value = str(self.SLOW_QUERY_MS).strip().lower()
+        if value in ("", "off", "none"):
+            return None
+        threshold = float(value)
+        if threshold < 0:
+            raise ValueError(f"Invalid SLOW_QUERY_MS: {self.SLOW_QUERY_MS!r}, expected milliseconds >= 0 or 'off'")
+        return threshold / 1000
+
+    def configure_logging(self) -> None:
+        """
+        Рівень логування з LOG_LEVEL і файл журналу повільних запитів з ротацією
+        (SLOW_QUERY_LOG у LOG_DIR). Викликається один раз при старті програми чи CLI.
+        """
+        level = self.LOG_LEVEL.upper()
+        if not isinstance(logging.getLevelName(level), int):
+            raise ValueError(f"Invalid LOG_LEVEL: {self.LOG_LEVEL!r}")
+        logging.basicConfig(format=LOG_FORMAT)
+        logging.getLogger().setLevel(level)
+        slow_log = logging.getLogger(SLOW_QUERY_LOGGER)
+        slow_log.setLevel(logging.WARNING)
+        if not self.SLOW_QUERY_LOG:
+            return
+        path = os.path.abspath(os.path.join(self.LOG_DIR, self.SLOW_QUERY_LOG))
+        if any(getattr(h, "baseFilename", None) == path for h in slow_log.handlers):
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        handler = RotatingFileHandler(
+            path, maxBytes=self.SLOW_QUERY_LOG_BYTES, backupCount=self.SLOW_QUERY_LOG_BACKUPS,
+            encoding="utf-8", delay=True,
+        )
+        handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        slow_log.addHandler(handler)
+        # Повільні запити — лише у файл, не в консоль
+        slow_log.propagate = False
 
-settings = Settings()
\ No newline at end of file
+settings = Settings()
@@ -1,15 +1,31 @@
 # container.py
 from dependency_injector import containers, providers
 from repository.factory import RepositoryFactory
+from service.event_bus import event_bus_resource
 from service.library_service import LibraryService
 
 class Container(containers.DeclarativeContainer):
     config = providers.Configuration()
 
+    # Один бандл (і один пул з'єднань) на контейнер; закриття — container.shutdown_resources()
     storage_strategy = providers.Selector(
         config.storage.backend,
-        sqlite=providers.Factory(RepositoryFactory.create_sqlite, db_path=config.storage.db_path),
-        in_memory=providers.Factory(RepositoryFactory.create_in_memory),
+        sqlite=providers.Resource(
+            RepositoryFactory.sqlite_resource,
+            db_path=config.storage.db_path,
+            pool_size=config.storage.pool_size,
+        ),
+        sqlite_cached=providers.Resource(
+            RepositoryFactory.cached_sqlite_resource,
+            db_path=config.storage.db_path,
+            pool_size=config.storage.pool_size,
+            cache_size=config.storage.cache_size,
+            cache_ttl=config.storage.cache_ttl,
+        ),
+        in_memory=providers.Resource(
+            RepositoryFactory.in_memory_resource,
+            pool_size=config.storage.pool_size,
+        ),
     )
 
     # Тепер кожен репозиторій — це екземпляр
@@ -17,9 +33,14 @@ class Container(containers.DeclarativeContainer):
     user_repository = providers.Factory(lambda bundle: bundle.user_repo, storage_strategy)
     loan_repository = providers.Factory(lambda bundle: bundle.loan_repo, storage_strategy)
 
-    library_service = providers.Factory(
-        LibraryService,
-        books=book_repository,
-        users=user_repository,
-        loans=loan_repository,
+    # Одна шина подій на контейнер: events.mode — 'sync' (за замовчуванням) або 'async'
+    event_bus = providers.Resource(
+        event_bus_resource,
+        mode=config.events.mode,
+        workers=config.events.workers,
+        coalesce_ms=config.events.coalesce_ms,
     )
+
+    # Сервіс будується з одного бандла, щоб усі репозиторії ділили з'єднання
+    # і одиницю роботи (транзакції охоплюють книги, користувачів і видачі разом)
+    library_service = providers.Factory(LibraryService.from_bundle, storage_strategy, event_bus=event_bus)
@@ -0,0 +1,99 @@
+"""
+Потоковий експорт таблиць бази в CSV/JSONL (можна .gz) для резервних копій
+і зовнішніх систем. Рядки читаються пачками з узгодженого знімка бази,
+тож пам'ять стала, а клієнти, що пишуть, не блокуються (WAL).
+
+    python -m data_io.exporter --format jsonl.gz --out-dir backup/
+    python -m data_io.exporter issued_books --out-dir - > loans.csv
+"""
+import argparse
+import csv
+import gzip
+import json
+import os
+import sys
+from typing import Iterable, List, Optional, Sequence
+
+from config import settings
+from data_io.formats import FORMAT_CHOICES, detect_format, open_text, parse_format
+from repository.factory import RepositoryFactory
+from service.library_service import LibraryService
+
+EXPORT_KINDS = ("books", "users", "issued_books")
+
+
+def write_rows(columns: Sequence[str], batches: Iterable[List[tuple]], fmt: str, stream) -> int:
+    """Пише пачки кортежів у текстовий потік; повертає кількість рядків"""
+    count = 0
+    if fmt == "csv":
+        writer = csv.writer(stream)
+        writer.writerow(columns)
+        for batch in batches:
+            writer.writerows(batch)
+            count += len(batch)
+    else:
+        encode = json.JSONEncoder(ensure_ascii=False).encode
+        for batch in batches:
+            stream.writelines(encode(dict(zip(columns, row))) + "\n" for row in batch)
+            count += len(batch)
+    return count
+
+
+def export_rows(columns: Sequence[str], batches: Iterable[List[tuple]], fmt: Optional[str], out) -> int:
+    """
+    out — шлях (формат і стиснення можна вивести з розширення) або відкритий потік:
+    текстовий для csv/jsonl, бінарний для стиснених варіантів.
+    """
+    if isinstance(out, (str, os.PathLike)):
+        path = os.fspath(out)
+        fmt, compressed = detect_format(path, fmt)
+        with open_text(path, "w", compressed) as stream:
+            return write_rows(columns, batches, fmt, stream)
+    if fmt is None:
+        raise ValueError("fmt is required when exporting to a stream")
+    fmt, compressed = parse_format(fmt)
+    if not compressed:
+        return write_rows(columns, batches, fmt, out)
+    # Закриття обгортки завершує gzip-потік, але не сам out
+    with gzip.open(out, "wt", encoding="utf-8", newline="") as stream:
+        return write_rows(columns, batches, fmt, stream)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("kinds", nargs="*", metavar="kind",
+                        help=f"таблиці для експорту: {', '.join(EXPORT_KINDS)} (за замовчуванням усі)")
+    parser.add_argument("--format", choices=FORMAT_CHOICES, default="csv")
+    parser.add_argument("--db", default=settings.DB_PATH)
+    parser.add_argument("--out-dir", default=".", help="каталог для <kind>.<format>; '-' — stdout")
+    args = parser.parse_args(argv)
+    settings.configure_logging()
+    # choices з nargs='*' argparse перевіряє й для порожнього списку, тому вручну
+    kinds = args.kinds or EXPORT_KINDS
+    unknown = sorted(set(kinds) - set(EXPORT_KINDS))
+    if unknown:
+        parser.error(f"unknown kinds: {', '.join(unknown)}")
+    if args.out_dir == "-" and len(kinds) != 1:
+        parser.error("stdout export takes exactly one kind")
+
+    bundle = RepositoryFactory.create_sqlite(args.db)
+    service = LibraryService.from_bundle(bundle)
+    counts = {}
+    try:
+        # Один знімок на всі таблиці: видачі посилаються лише на експортовані книги й читачів
+        with service.snapshot():
+            for kind in kinds:
+                if args.out_dir == "-":
+                    stdout = sys.stdout.buffer if args.format.endswith(".gz") else sys.stdout
+                    counts[kind] = service.export(kind, args.format, stdout)
+                else:
+                    path = os.path.join(args.out_dir, f"{kind}.{args.format}")
+                    counts[kind] = service.export(kind, args.format, path)
+    finally:
+        bundle.close()
+    print(", ".join(f"{kind}: {count}" for kind, count in counts.items()), file=sys.stderr)
+    return counts
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+import gzip
+import os
+from typing import IO, Optional, Tuple
+
+FORMATS = ("csv", "jsonl")
+# Формати для CLI, разом зі стисненими варіантами
+FORMAT_CHOICES = FORMATS + tuple(f"{fmt}.gz" for fmt in FORMATS)
+_EXTENSIONS = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl", ".json": "jsonl"}
+
+
+def parse_format(fmt: str) -> Tuple[str, bool]:
+    """'csv' -> ('csv', False), 'jsonl.gz' -> ('jsonl', True)"""
+    compressed = fmt.endswith(".gz")
+    if compressed:
+        fmt = fmt[:-3]
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format {fmt!r}, expected one of {FORMAT_CHOICES}")
+    return fmt, compressed
+
+
+def detect_format(path: str, fmt: Optional[str] = None) -> Tuple[str, bool]:
+    """
+    (формат, gzip) за розширенням файлу: catalog.csv, users.jsonl.gz, ...
+    Явно заданий fmt має пріоритет; без суфікса .gz стиснення визначається за шляхом.
+    """
+    name = path.lower()
+    compressed = name.endswith(".gz")
+    if compressed:
+        name = name[:-3]
+    if fmt is not None:
+        fmt, gz = parse_format(fmt)
+        return fmt, gz or compressed
+    fmt = _EXTENSIONS.get(os.path.splitext(name)[1])
+    if fmt is None:
+        raise ValueError(f"Cannot detect format of {path!r}, expected one of {FORMATS}")
+    return fmt, compressed
+
+
+def open_text(path: str, mode: str, compressed: bool) -> IO[str]:
+    """Текстовий потік UTF-8 (з gzip, якщо compressed); newline='' потрібен модулю csv"""
+    if compressed:
+        return gzip.open(path, mode + "t", encoding="utf-8", newline="")
+    # utf-8-sig: таблиці, збережені з Excel, починаються з BOM
+    return open(path, mode, encoding="utf-8-sig" if mode == "r" else "utf-8", newline="")
@@ -0,0 +1,215 @@
+"""
+Імпорт каталогу філії з CSV/JSONL (можна .gz) без GUI:
+записи читаються потоком, перевіряються й нормалізуються в пулі процесів
+(контрольна цифра ISBN, рік видання, дублікати) і пишуться пачками,
+кожна — однією транзакцією. Відхилені рядки з причиною — в окремий CSV.
+
+    python -m data_io.importer books catalog.csv --rejected rejected.csv
+    python -m data_io.importer users readers.jsonl.gz --workers 4
+"""
+import argparse
+import csv
+import json
+import logging
+import os
+import sqlite3
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Callable, Iterator, Optional
+
+from config import settings
+from data_io.formats import detect_format, open_text
+from data_io.validation import VALIDATORS, validate_chunk
+from library.book import Book
+from library.user import User
+from repository.factory import RepositoryFactory
+from service.library_service import LibraryService
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 5000
+# Пачок у роботі на один процес: пул завантажений, а пам'ять обмежена
+_CHUNKS_PER_WORKER = 2
+
+
+class ImportStats:
+    def __init__(self):
+        self.read = 0
+        self.imported = 0
+        self.rejected = 0
+        self.started = time.monotonic()
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    @property
+    def rate(self) -> float:
+        """Прочитаних записів за секунду"""
+        return self.read / self.elapsed if self.elapsed else 0.0
+
+    def __str__(self):
+        return (f"{self.read} read, {self.imported} imported, {self.rejected} rejected "
+                f"({self.rate:.0f} rows/s, {self.elapsed:.1f}s)")
+
+
+def iter_records(stream, fmt: str) -> Iterator[tuple]:
+    """Пари (номер рядка, сирий запис): dict для CSV, рядок для JSONL (розбирається в пулі)"""
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        for record in reader:
+            yield reader.line_num, record
+    else:
+        for line_number, line in enumerate(stream, 1):
+            if line.strip():
+                yield line_number, line
+
+
+class _RejectedWriter:
+    """CSV відхилених записів: номер рядка, причина, сам запис"""
+    def __init__(self, path: Optional[str]):
+        self._file = open(path, "w", encoding="utf-8", newline="") if path else None
+        self._writer = csv.writer(self._file) if self._file else None
+        if self._writer:
+            self._writer.writerow(("line", "reason", "record"))
+
+    def write(self, rows) -> None:
+        if self._writer:
+            for line, reason, raw in rows:
+                record = raw if isinstance(raw, str) else json.dumps(raw, ensure_ascii=False)
+                self._writer.writerow((line, reason, record.rstrip("\n")))
+
+    def close(self) -> None:
+        if self._file:
+            self._file.close()
+
+
+def import_file(
+    service: LibraryService,
+    kind: str,
+    path: str,
+    fmt: Optional[str] = None,
+    rejected_path: Optional[str] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    workers: Optional[int] = None,
+    replace_existing: bool = False,
+    progress: Optional[Callable[[ImportStats], None]] = None,
+) -> ImportStats:
+    """
+    Імпортує книги (kind='books') або користувачів (kind='users') з файлу.
+    Пам'ять не залежить від розміру файлу, крім множини вже побачених ключів.
+    Записи, що вже є в базі, відхиляються, якщо не replace_existing
+    (заміна книги скидає її стан видачі). workers=0 — перевірка в поточному процесі.
+    """
+    if kind not in VALIDATORS:
+        raise ValueError(f"Unknown import kind {kind!r}, expected one of {sorted(VALIDATORS)}")
+    fmt, compressed = detect_format(path, fmt)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    repo = service.books if kind == "books" else service.users
+    stats = ImportStats()
+    seen = set()
+    rejected = _RejectedWriter(rejected_path)
+
+    def store(result) -> None:
+        valid, bad = result
+        fresh, duplicates = [], []
+        for line, key, values in valid:
+            if key in seen:
+                duplicates.append((line, f"duplicate key {key}", values))
+            else:
+                seen.add(key)
+                fresh.append((line, key, values))
+        if fresh and not replace_existing:
+            existing = repo.existing_keys(key for _, key, _ in fresh)
+            duplicates += [(line, f"already exists: {key}", values) for line, key, values in fresh if key in existing]
+            fresh = [item for item in fresh if item[1] not in existing]
+        if fresh:
+            written = _write(service, kind, [values for _, _, values in fresh])
+            if written != len(fresh):
+                # Пачка відкочена цілком (помилку вже залоговано репозиторієм)
+                bad = bad + [(line, "storage error", values) for line, _, values in fresh]
+                written = 0
+            stats.imported += written
+        rejected.write(bad)
+        rejected.write((line, reason, _as_record(kind, values)) for line, reason, values in duplicates)
+        stats.rejected += len(bad) + len(duplicates)
+        if progress is not None:
+            progress(stats)
+
+    try:
+        with open_text(path, "r", compressed) as stream:
+            records = iter_records(stream, fmt)
+            chunks = iter(lambda: list(islice(records, chunk_size)), [])
+            if workers <= 0:
+                for chunk in chunks:
+                    stats.read += len(chunk)
+                    store(validate_chunk(kind, chunk))
+            else:
+                with ProcessPoolExecutor(max_workers=workers) as pool:
+                    pending: deque = deque()
+                    for chunk in chunks:
+                        stats.read += len(chunk)
+                        pending.append(pool.submit(validate_chunk, kind, chunk))
+                        if len(pending) >= workers * _CHUNKS_PER_WORKER:
+                            store(pending.popleft().result())
+                    # Пачки пишуться в порядку файлу: перший із дублікатів виграє
+                    while pending:
+                        store(pending.popleft().result())
+    finally:
+        rejected.close()
+    logger.info("Imported %s from %s: %s", kind, path, stats)
+    return stats
+
+
+def _write(service: LibraryService, kind: str, rows: list) -> int:
+    # Одна пачка — одна транзакція й одна агрегована подія спостерігачам
+    try:
+        if kind == "books":
+            return service.add_books((Book(*values) for values in rows), chunk_size=len(rows))
+        return service.register_users((User(*values) for values in rows), chunk_size=len(rows))
+    except sqlite3.Error:
+        # Пачку відкочено (TransactionRolledBack або помилка commit) — уже залоговано
+        return 0
+
+
+def _as_record(kind: str, values: tuple) -> dict:
+    fields = ("title", "author", "year", "genre", "isbn") if kind == "books" else User.FIELDS
+    return dict(zip(fields, values))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("kind", choices=sorted(VALIDATORS))
+    parser.add_argument("path", help="CSV або JSONL, можна стиснений .gz")
+    parser.add_argument("--format", choices=("csv", "jsonl"), help="якщо не визначається з розширення")
+    parser.add_argument("--db", default=settings.DB_PATH)
+    parser.add_argument("--rejected", help="CSV для відхилених записів")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--workers", type=int, help="процесів перевірки (0 — без пулу)")
+    parser.add_argument("--replace-existing", action="store_true", help="перезаписувати наявні записи")
+    args = parser.parse_args(argv)
+    settings.configure_logging()
+
+    def report(stats):
+        print(f"\r{stats}", end="", file=sys.stderr, flush=True)
+
+    bundle = RepositoryFactory.create_sqlite(args.db)
+    try:
+        stats = import_file(
+            LibraryService.from_bundle(bundle), args.kind, args.path, args.format,
+            rejected_path=args.rejected, chunk_size=args.chunk_size, workers=args.workers,
+            replace_existing=args.replace_existing, progress=report,
+        )
+    finally:
+        bundle.close()
+    print(file=sys.stderr)
+    print(stats)
+    return stats
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+import datetime
+import json
+import re
+from typing import Callable, Dict, List, Tuple
+
+# Найраніший рік видання, який приймаємо (друкарство Гутенберга)
+MIN_YEAR = 1450
+_EMAIL = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+_SPACES = re.compile(r"\s+")
+
+
+class RecordError(ValueError):
+    """Запис відхилено; текст — причина для файлу відхилених рядків"""
+
+
+def _text(record: dict, field: str, required: bool = True) -> str:
+    value = record.get(field)
+    value = _SPACES.sub(" ", str(value)).strip() if value is not None else ""
+    if required and not value:
+        raise RecordError(f"missing {field}")
+    return value
+
+
+def normalize_isbn(value) -> str:
+    """
+    ISBN без дефісів і пробілів, перевірений за контрольною цифрою.
+    ISBN-10 переводиться в ISBN-13 (префікс 978), щоб дублікати в різних записах збігались.
+    """
+    digits = re.sub(r"[\s-]", "", str(value or "")).upper()
+    if re.fullmatch(r"\d{13}", digits):
+        total = sum(int(d) * (3 if i % 2 else 1) for i, d in enumerate(digits))
+        if total % 10:
+            raise RecordError(f"bad ISBN-13 checksum: {value}")
+        return digits
+    if re.fullmatch(r"\d{9}[\dX]", digits):
+        total = sum((10 if d == "X" else int(d)) * (10 - i) for i, d in enumerate(digits))
+        if total % 11:
+            raise RecordError(f"bad ISBN-10 checksum: {value}")
+        body = "978" + digits[:9]
+        check = (10 - sum(int(d) * (3 if i % 2 else 1) for i, d in enumerate(body)) % 10) % 10
+        return body + str(check)
+    raise RecordError(f"invalid ISBN: {value!r}")
+
+
+def normalize_year(value) -> int:
+    try:
+        year = int(str(value).strip())
+    except (TypeError, ValueError):
+        raise RecordError(f"invalid year: {value!r}") from None
+    if not MIN_YEAR <= year <= datetime.date.today().year + 1:
+        raise RecordError(f"year out of range: {year}")
+    return year
+
+
+def validate_book(record: dict) -> Tuple[str, tuple]:
+    """(isbn, (title, author, year, genre, isbn)) — у порядку аргументів Book"""
+    isbn = normalize_isbn(record.get("isbn"))
+    return isbn, (
+        _text(record, "title"),
+        _text(record, "author"),
+        normalize_year(record.get("year")),
+        _text(record, "genre", required=False) or None,
+        isbn,
+    )
+
+
+def validate_user(record: dict) -> Tuple[str, tuple]:
+    """(user_id, (user_id, first_name, last_name, email)) — у порядку аргументів User"""
+    user_id = _text(record, "user_id")
+    email = _text(record, "email").lower()
+    if not _EMAIL.match(email):
+        raise RecordError(f"invalid email: {email!r}")
+    return user_id, (user_id, _text(record, "first_name"), _text(record, "last_name"), email)
+
+
+VALIDATORS: Dict[str, Callable[[dict], Tuple[str, tuple]]] = {
+    "books": validate_book,
+    "users": validate_user,
+}
+
+
+def validate_chunk(kind: str, chunk: List[tuple]) -> Tuple[list, list]:
+    """
+    Перевіряє пачку записів (виконується в процесі пулу, тож лише прості типи на вході й виході).
+    chunk — пари (номер рядка, запис): dict для CSV або рядок JSONL.
+    Повертає ([(рядок, ключ, значення)], [(рядок, причина, сирий запис)]).
+    """
+    validate = VALIDATORS[kind]
+    valid, rejected = [], []
+    for line, raw in chunk:
+        try:
+            record = json.loads(raw) if isinstance(raw, str) else raw
+            if not isinstance(record, dict):
+                raise RecordError("record is not an object")
+            # Назви колонок — без урахування регістру й пробілів
+            record = {str(k).strip().lower(): v for k, v in record.items() if k is not None}
+            key, values = validate(record)
+        except json.JSONDecodeError as e:
+            rejected.append((line, f"invalid JSON: {e.msg}", raw))
+        except RecordError as e:
+            rejected.append((line, str(e), raw))
+        else:
+            valid.append((line, key, values))
+    return valid, rejected
@@ -1,9 +1,74 @@
+import logging
 import sqlite3
 
+logger = logging.getLogger(__name__)
+
+
 def initialize_database(db_path: str = "library.db"):
+    """Створює або оновлює схему бази до останньої версії (див. MIGRATIONS)"""
     conn = sqlite3.connect(db_path)
-    c = conn.cursor()
+    try:
+        migrate(conn)
+    finally:
+        conn.close()
+
+
+def apply_storage_profile(conn: sqlite3.Connection, profile) -> None:
+    """
+    Застосовує PRAGMA профілю (config.StorageProfile) до з'єднання.
+    journal_mode=WAL зберігається у файлі бази, решта діє лише на це з'єднання.
+    """
+    for name, value in profile.pragmas():
+        row = conn.execute(f"PRAGMA {name} = {value}").fetchone()
+        if name == "journal_mode" and row and str(row[0]).upper() != value:
+            # Напр. для in-memory бази WAL недоступний
+            logger.debug("journal_mode %s not applied, using %s", value, row[0])
+
+
+def schema_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn: sqlite3.Connection) -> int:
+    """
+    Застосовує по порядку всі міграції з номером, більшим за PRAGMA user_version.
+    Кожна міграція виконується в окремій транзакції разом із оновленням версії,
+    тож наявні файли library.db оновлюються на місці, а перерваний запуск
+    можна просто повторити. Повертає поточну версію схеми.
+    """
+    for number, apply in MIGRATIONS:
+        if number <= schema_version(conn):
+            continue
+        # IMMEDIATE: паралельний клієнт чекає на нас і далі бачить нову версію
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if number > schema_version(conn):
+                apply(conn.cursor())
+                conn.execute(f"PRAGMA user_version = {int(number)}")
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        logger.info("Database schema migrated to version %s", number)
+    return schema_version(conn)
 
+
+def vacuum(conn: sqlite3.Connection) -> None:
+    """
+    VACUUM з перебудовою books_fts. У books первинний ключ текстовий, тож VACUUM
+    може перенумерувати rowid, на які посилається зовнішній FTS5-вміст
+    (content_rowid='rowid'). Стискати базу слід лише через цю функцію.
+    """
+    if conn.in_transaction:
+        conn.commit()
+    conn.execute("VACUUM")
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='books_fts'").fetchone():
+        conn.execute("INSERT INTO books_fts(books_fts) VALUES ('rebuild')")
+        conn.commit()
+    logger.info("Database vacuumed")
+
+
+def create_tables(c: sqlite3.Cursor) -> None:
     c.execute("""
     CREATE TABLE IF NOT EXISTS books (
         isbn TEXT PRIMARY KEY,
@@ -34,5 +99,228 @@ def initialize_database(db_path: str = "library.db"):
     )
     """)
 
-    conn.commit()
-    conn.close()
\ No newline at end of file
+
+def create_performance_indexes(c: sqlite3.Cursor) -> None:
+    # Видачі: пошук за книгою (list_overdue, повернення) і за читачем
+    # (user_id, isbn) покриває DELETE ... WHERE user_id=? AND isbn=? у return_book
+    c.execute("CREATE INDEX IF NOT EXISTS idx_issued_books_isbn ON issued_books(isbn)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_issued_books_user ON issued_books(user_id, isbn)")
+    # Книги: доступність, прострочені видачі (issue_date < cutoff), автор і жанр
+    c.execute("CREATE INDEX IF NOT EXISTS idx_books_available ON books(available)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_books_issue_date ON books(issue_date)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_books_author ON books(author)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_books_genre ON books(genre)")
+
+
+def create_fulltext_index(c: sqlite3.Cursor) -> bool:
+    """
+    Створює FTS5-індекс books_fts (title/author/genre) поверх таблиці books
+    і тригери, що підтримують його актуальним.
+    Повертає False, якщо збірка SQLite не підтримує FTS5 (тоді працює пошук через LIKE).
+    Індекс прив'язаний до нестабільного rowid books: після VACUUM його треба
+    перебудувати, тому база стискається через vacuum().
+    """
+    existed = c.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='books_fts'"
+    ).fetchone()
+    try:
+        c.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS books_fts USING fts5(
+            title, author, genre,
+            content='books', content_rowid='rowid'
+        )
+        """)
+    except sqlite3.OperationalError:
+        return False
+
+    # INSERT OR REPLACE не викликає DELETE-тригерів (recursive_triggers вимкнено),
+    # тому старий запис прибираємо з індексу ще до вставки
+    c.execute("""
+    CREATE TRIGGER IF NOT EXISTS books_fts_bi BEFORE INSERT ON books BEGIN
+        INSERT INTO books_fts(books_fts, rowid, title, author, genre)
+        SELECT 'delete', rowid, title, author, genre FROM books WHERE isbn = new.isbn;
+    END
+    """)
+    c.execute("""
+    CREATE TRIGGER IF NOT EXISTS books_fts_ai AFTER INSERT ON books BEGIN
+        INSERT INTO books_fts(rowid, title, author, genre)
+        VALUES (new.rowid, new.title, new.author, new.genre);
+    END
+    """)
+    c.execute("""
+    CREATE TRIGGER IF NOT EXISTS books_fts_ad AFTER DELETE ON books BEGIN
+        INSERT INTO books_fts(books_fts, rowid, title, author, genre)
+        VALUES ('delete', old.rowid, old.title, old.author, old.genre);
+    END
+    """)
+    c.execute("""
+    CREATE TRIGGER IF NOT EXISTS books_fts_au AFTER UPDATE OF title, author, genre ON books BEGIN
+        INSERT INTO books_fts(books_fts, rowid, title, author, genre)
+        VALUES ('delete', old.rowid, old.title, old.author, old.genre);
+        INSERT INTO books_fts(rowid, title, author, genre)
+        VALUES (new.rowid, new.title, new.author, new.genre);
+    END
+    """)
+    if not existed:
+        # Індексуємо книги, що вже є в базі
+        c.execute("INSERT INTO books_fts(books_fts) VALUES ('rebuild')")
+    return True
+
+
+def create_sort_indexes(c: sqlite3.Cursor) -> None:
+    # Сортування віртуалізованих списків GUI (fetch_window): ORDER BY ... LIMIT/OFFSET
+    # іде по індексу замість повного сортування таблиці на кожне вікно
+    c.execute("CREATE INDEX IF NOT EXISTS idx_books_title ON books(title, isbn)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_books_year ON books(year, isbn)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_users_last_name ON users(last_name, user_id)")
+
+
+def create_more_sort_indexes(c: sqlite3.Cursor) -> None:
+    # Решта колонок, за якими сортують списки GUI: одноколонкові індекси міграції 2
+    # не містять isbn, тож ORDER BY author, isbn все одно потребував тимчасового B-дерева
+    c.execute("CREATE INDEX IF NOT EXISTS idx_books_author_isbn ON books(author, isbn)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_books_genre_isbn ON books(genre, isbn)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_books_available_isbn ON books(available, isbn)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_users_first_name ON users(first_name, user_id)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_users_email ON users(email, user_id)")
+
+
+def create_stats_tables(c: sqlite3.Cursor) -> None:
+    """
+    Підсумкові таблиці, які підтримують тригери на books та issued_books:
+    library_totals (один рядок: книги, доступні, активні видачі),
+    genre_stats (за жанром; NULL-жанр зберігається як '') і user_loan_stats
+    (активні видачі читача). Лічильники читаються за O(1) замість COUNT по таблицях.
+    """
+    c.execute("""
+    CREATE TABLE IF NOT EXISTS library_totals (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        books INTEGER NOT NULL DEFAULT 0,
+        available INTEGER NOT NULL DEFAULT 0,
+        active_loans INTEGER NOT NULL DEFAULT 0
+    )
+    """)
+    c.execute("""
+    CREATE TABLE IF NOT EXISTS genre_stats (
+        genre TEXT PRIMARY KEY,
+        books INTEGER NOT NULL DEFAULT 0,
+        available INTEGER NOT NULL DEFAULT 0,
+        times_issued INTEGER NOT NULL DEFAULT 0
+    )
+    """)
+    c.execute("""
+    CREATE TABLE IF NOT EXISTS user_loan_stats (
+        user_id TEXT PRIMARY KEY,
+        active_loans INTEGER NOT NULL DEFAULT 0
+    )
+    """)
+
+    # Початкові значення з наявних даних
+    c.execute("DELETE FROM library_totals")
+    c.execute("""
+    INSERT INTO library_totals (id, books, available, active_loans)
+    SELECT 1, COUNT(*), IFNULL(SUM(IFNULL(available, 0)), 0), (SELECT COUNT(*) FROM issued_books)
+    FROM books
+    """)
+    c.execute("DELETE FROM genre_stats")
+    c.execute("""
+    INSERT INTO genre_stats (genre, books, available, times_issued)
+    SELECT IFNULL(genre, ''), COUNT(*), SUM(IFNULL(available, 0)), SUM(IFNULL(times_issued, 0))
+    FROM books GROUP BY IFNULL(genre, '')
+    """)
+    c.execute("DELETE FROM user_loan_stats")
+    c.execute("""
+    INSERT INTO user_loan_stats (user_id, active_loans)
+    SELECT user_id, COUNT(*) FROM issued_books GROUP BY user_id
+    """)
+
+    # Як і для books_fts: INSERT OR REPLACE не викликає DELETE-тригерів,
+    # тож внесок рядка, що буде замінений, віднімаємо ще до вставки
+    c.execute("""
+    CREATE TRIGGER IF NOT EXISTS books_stats_bi BEFORE INSERT ON books
+    WHEN EXISTS (SELECT 1 FROM books WHERE isbn = new.isbn) BEGIN
+        UPDATE library_totals SET
+            books = books - 1,
+            available = available - (SELECT IFNULL(available, 0) FROM books WHERE isbn = new.isbn)
+        WHERE id = 1;
+        UPDATE genre_stats SET
+            books = books - 1,
+            available = available - b.old_available,
+            times_issued = times_issued - b.old_times_issued
+        FROM (SELECT IFNULL(genre, '') AS old_genre, IFNULL(available, 0) AS old_available,
+                     IFNULL(times_issued, 0) AS old_times_issued
+              FROM books WHERE isbn = new.isbn) AS b
+        WHERE genre_stats.genre = b.old_genre;
+    END
+    """)
+    c.execute("""
+    CREATE TRIGGER IF NOT EXISTS books_stats_ai AFTER INSERT ON books BEGIN
+        UPDATE library_totals SET
+            books = books + 1,
+            available = available + IFNULL(new.available, 0)
+        WHERE id = 1;
+        INSERT INTO genre_stats (genre, books, available, times_issued)
+        VALUES (IFNULL(new.genre, ''), 1, IFNULL(new.available, 0), IFNULL(new.times_issued, 0))
+        ON CONFLICT (genre) DO UPDATE SET
+            books = books + 1,
+            available = available + excluded.available,
+            times_issued = times_issued + excluded.times_issued;
+    END
+    """)
+    c.execute("""
+    CREATE TRIGGER IF NOT EXISTS books_stats_ad AFTER DELETE ON books BEGIN
+        UPDATE library_totals SET
+            books = books - 1,
+            available = available - IFNULL(old.available, 0)
+        WHERE id = 1;
+        UPDATE genre_stats SET
+            books = books - 1,
+            available = available - IFNULL(old.available, 0),
+            times_issued = times_issued - IFNULL(old.times_issued, 0)
+        WHERE genre = IFNULL(old.genre, '');
+    END
+    """)
+    c.execute("""
+    CREATE TRIGGER IF NOT EXISTS books_stats_au AFTER UPDATE OF available, genre, times_issued ON books BEGIN
+        UPDATE library_totals SET
+            available = available - IFNULL(old.available, 0) + IFNULL(new.available, 0)
+        WHERE id = 1;
+        UPDATE genre_stats SET
+            books = books - 1,
+            available = available - IFNULL(old.available, 0),
+            times_issued = times_issued - IFNULL(old.times_issued, 0)
+        WHERE genre = IFNULL(old.genre, '');
+        INSERT INTO genre_stats (genre, books, available, times_issued)
+        VALUES (IFNULL(new.genre, ''), 1, IFNULL(new.available, 0), IFNULL(new.times_issued, 0))
+        ON CONFLICT (genre) DO UPDATE SET
+            books = books + 1,
+            available = available + excluded.available,
+            times_issued = times_issued + excluded.times_issued;
+    END
+    """)
+    c.execute("""
+    CREATE TRIGGER IF NOT EXISTS issued_stats_ai AFTER INSERT ON issued_books BEGIN
+        UPDATE library_totals SET active_loans = active_loans + 1 WHERE id = 1;
+        INSERT INTO user_loan_stats (user_id, active_loans) VALUES (new.user_id, 1)
+        ON CONFLICT (user_id) DO UPDATE SET active_loans = active_loans + 1;
+    END
+    """)
+    c.execute("""
+    CREATE TRIGGER IF NOT EXISTS issued_stats_ad AFTER DELETE ON issued_books BEGIN
+        UPDATE library_totals SET active_loans = active_loans - 1 WHERE id = 1;
+        UPDATE user_loan_stats SET active_loans = active_loans - 1 WHERE user_id = old.user_id;
+    END
+    """)
+
+
+# Нумеровані міграції схеми. Нові міграції лише додаються в кінець списку,
+# наявні не змінюються: вони вже застосовані до робочих баз.
+# FTS5 необов'язковий: без нього міграція 3 нічого не створює, пошук працює через LIKE.
+MIGRATIONS = [
+    (1, create_tables),
+    (2, create_performance_indexes),
+    (3, create_fulltext_index),
+    (4, create_sort_indexes),
+    (5, create_stats_tables),
+    (6, create_more_sort_indexes),
+]
@@ -0,0 +1,152 @@
+import logging
+import queue
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+from repository.connection_pool import run_and_release
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundWorker:
+    """
+    Виконує виклики сервісу у фоновому пулі потоків, щоб вікно Tk не зависало.
+    Результати (і будь-які інші виклики через call_in_main) потрапляють у чергу,
+    яку головний потік розбирає через after(). Нове завдання з тим самим key
+    витісняє попереднє: якщо воно ще не почалося — скасовується, якщо вже
+    виконується — його результат просто відкидається.
+    """
+    def __init__(
+        self,
+        root,
+        max_workers: int = 2,
+        poll_interval_ms: int = 50,
+        on_busy_change: Optional[Callable[[bool], None]] = None,
+    ):
+        self._root = root
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="gui-worker")
+        self._queue: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._poll_interval_ms = poll_interval_ms
+        self._on_busy_change = on_busy_change
+        self._lock = threading.Lock()
+        self._latest: Dict[str, int] = {}
+        self._pending: Dict[str, Future] = {}
+        self._generation = 0
+        self._in_flight = 0
+        self._closed = False
+        self._root.after(self._poll_interval_ms, self._poll)
+
+    @property
+    def busy(self) -> bool:
+        return self._in_flight > 0
+
+    def submit(
+        self,
+        fn: Callable,
+        *args,
+        key: Optional[str] = None,
+        on_success: Optional[Callable] = None,
+        on_error: Optional[Callable[[BaseException], None]] = None,
+    ) -> Optional[Future]:
+        """
+        Запускає fn(*args) у фоні; on_success(result) / on_error(exc) викликаються
+        в головному потоці. Викликати лише з головного потоку.
+        """
+        if self._closed:
+            return None
+        with self._lock:
+            self._generation += 1
+            generation = self._generation
+            if key is not None:
+                self._latest[key] = generation
+                previous = self._pending.pop(key, None)
+                if previous is not None and previous.cancel():
+                    self._task_done()
+        self._task_started()
+        # Потоки пулу живуть довго: з'єднання з пулу сховища звільняється після кожної задачі
+        future = self._executor.submit(run_and_release, fn, *args)
+        if key is not None:
+            with self._lock:
+                self._pending[key] = future
+        future.add_done_callback(
+            lambda f: None if f.cancelled() else self._queue.put(
+                (self._finish, (f, key, generation, on_success, on_error))
+            )
+        )
+        return future
+
+    def call_in_main(self, fn: Callable, *args) -> None:
+        """Потокобезпечно планує fn(*args) у головному потоці Tk"""
+        self._queue.put((fn, args))
+
+    def shutdown(self) -> None:
+        self._closed = True
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _finish(self, future: Future, key, generation, on_success, on_error) -> None:
+        self._task_done()
+        if key is not None:
+            with self._lock:
+                if self._pending.get(key) is future:
+                    del self._pending[key]
+                if self._latest.get(key) != generation:
+                    # Застарілий запит: новіший з тим самим ключем уже в роботі
+                    return
+        error = future.exception()
+        if error is None:
+            if on_success is not None:
+                on_success(future.result())
+        elif on_error is not None:
+            on_error(error)
+        else:
+            logger.error("Background task failed", exc_info=error)
+
+    def _task_started(self) -> None:
+        self._in_flight += 1
+        if self._in_flight == 1 and self._on_busy_change is not None:
+            self._on_busy_change(True)
+
+    def _task_done(self) -> None:
+        self._in_flight -= 1
+        if self._in_flight == 0 and self._on_busy_change is not None:
+            self._on_busy_change(False)
+
+    def _poll(self) -> None:
+        while True:
+            try:
+                fn, args = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                fn(*args)
+            except Exception:
+                logger.exception("Error in main-thread callback")
+        if not self._closed:
+            self._root.after(self._poll_interval_ms, self._poll)
+
+
+class InlineWorker:
+    """
+    Той самий інтерфейс, але все виконується одразу в поточному потоці
+    (тести та відлагодження без циклу подій Tk)
+    """
+    busy = False
+
+    def submit(self, fn, *args, key=None, on_success=None, on_error=None):
+        try:
+            result = fn(*args)
+        except Exception as e:
+            if on_error is None:
+                raise
+            on_error(e)
+            return None
+        if on_success is not None:
+            on_success(result)
+        return None
+
+    def call_in_main(self, fn, *args) -> None:
+        fn(*args)
+
+    def shutdown(self) -> None:
+        pass
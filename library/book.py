@@ -1,4 +1,13 @@
+_MISSING = object()
+_CLEAN = frozenset()
+
+
 class Book:
+    # Атрибути, що зберігаються в колонках таблиці books (у порядку колонок)
+    FIELDS = ("isbn", "title", "author", "year", "genre", "available", "issued_to", "issue_date", "times_issued")
+    # Без __dict__: менше пам'яті на об'єкт; _dirty — змінені поля (спільний порожній frozenset для чистих)
+    __slots__ = FIELDS + ("_dirty",)
+
     def __init__(
         self,
         title: str,
@@ -9,6 +18,8 @@ class Book:
         available: bool = True,
         issued_to: str = None
     ):
+        # Нова книга «брудна» цілком; репозиторій позначає її чистою після запису/читання
+        object.__setattr__(self, "_dirty", _CLEAN)
         self.title = title
         self.author = author
         self.year = year
@@ -19,5 +30,41 @@ class Book:
         self.issue_date = None
         self.times_issued = 0
 
+    @classmethod
+    def restore(cls, values: tuple, dirty: frozenset = _CLEAN) -> "Book":
+        """
+        Книга з уже збережених значень (у порядку FIELDS) — для маперів сховища.
+        Без __init__ і без відстеження кожного присвоєння.
+        """
+        book = object.__new__(cls)
+        for name, value in zip(Book.FIELDS, values):
+            object.__setattr__(book, name, value)
+        object.__setattr__(book, "_dirty", dirty)
+        return book
+
+    def __setattr__(self, name, value):
+        if name in Book.FIELDS and getattr(self, name, _MISSING) != value:
+            # Нова множина, а не зміна старої: копії (copy.copy у кешах) не ділять стан
+            object.__setattr__(self, "_dirty", self._dirty | {name})
+        object.__setattr__(self, name, value)
+
+    @property
+    def dirty_fields(self) -> frozenset:
+        """Атрибути, змінені після останнього читання чи запису в сховище"""
+        return self._dirty
+
+    def mark_clean(self, fields=None) -> None:
+        """Знімає позначку змін з fields (за замовчуванням — з усіх полів)"""
+        dirty = _CLEAN if fields is None else self._dirty.difference(fields) or _CLEAN
+        object.__setattr__(self, "_dirty", dirty)
+
+    def __reduce__(self):
+        # copy.copy і pickle: слоти відновлюються разом зі станом змін, минаючи __setattr__
+        return _rebuild, (tuple(getattr(self, f) for f in Book.FIELDS), self._dirty)
+
     def __repr__(self):
-        return f"Book({self.title!r}, {self.isbn!r})"
\ No newline at end of file
+        return f"Book({self.title!r}, {self.isbn!r})"
+
+
+def _rebuild(values: tuple, dirty: frozenset) -> Book:
+    return Book.restore(values, dirty)
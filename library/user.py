@@ -1,4 +1,8 @@
 class User:
+    # Атрибути, що зберігаються в колонках таблиці users (у порядку колонок)
+    FIELDS = ("user_id", "first_name", "last_name", "email")
+    __slots__ = FIELDS + ("issued_books",)
+
     def __init__(
         self,
         user_id: str,
@@ -13,4 +17,4 @@ class User:
         self.issued_books = []
 
     def __repr__(self):
-        return f"User({self.user_id!r}, {self.email!r})"
\ No newline at end of file
+        return f"User({self.user_id!r}, {self.email!r})"
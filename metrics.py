@@ -0,0 +1,196 @@
+"""
+Метрики операцій у процесі: кількість викликів і помилок, гістограма тривалості,
+кількість повернутих рядків і commit'ів на кожну операцію репозиторіїв і сервісу.
+Вимкнений реєстр (за замовчуванням, METRICS_ENABLED=0) коштує обгортці одну перевірку прапорця.
+
+    from metrics import registry
+    registry.enable()
+    ...
+    registry.dump("metrics.prom")   # text / json / prom — за розширенням
+"""
+import atexit
+import functools
+import inspect
+import json
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, Optional
+
+from config import settings
+
+# Межі кошиків гістограми тривалості, секунди (останній — +Inf)
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+DUMP_FORMATS = ("text", "json", "prom")
+_EXTENSIONS = {".txt": "text", ".json": "json", ".prom": "prom"}
+
+
+class _Operation:
+    __slots__ = ("calls", "errors", "seconds", "rows", "commits", "buckets")
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.seconds = 0.0
+        self.rows = 0
+        self.commits = 0
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+
+
+class MetricsRegistry:
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._ops: Dict[str, _Operation] = {}
+
+    def enable(self) -> None:
+        self.enabled = True
+
+    def disable(self) -> None:
+        self.enabled = False
+
+    def reset(self) -> None:
+        with self._lock:
+            self._ops.clear()
+
+    def observe(self, name: str, seconds: float, rows: int = 0, commits: int = 0, error: bool = False) -> None:
+        with self._lock:
+            op = self._ops.get(name)
+            if op is None:
+                op = self._ops[name] = _Operation()
+            op.calls += 1
+            op.errors += error
+            op.seconds += seconds
+            op.rows += rows
+            op.commits += commits
+            op.buckets[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+
+    def snapshot(self) -> Dict[str, dict]:
+        """Копія лічильників: {операція: {calls, errors, seconds, rows, commits, buckets}}"""
+        with self._lock:
+            return {
+                name: {
+                    "calls": op.calls, "errors": op.errors, "seconds": op.seconds,
+                    "rows": op.rows, "commits": op.commits, "buckets": list(op.buckets),
+                }
+                for name, op in sorted(self._ops.items())
+            }
+
+    def render_text(self) -> str:
+        lines = [f"{'operation':<32} {'calls':>8} {'errors':>6} {'avg ms':>9} {'rows':>9} {'commits':>8}"]
+        for name, op in self.snapshot().items():
+            avg = op["seconds"] / op["calls"] * 1000 if op["calls"] else 0.0
+            lines.append(f"{name:<32} {op['calls']:>8} {op['errors']:>6} {avg:>9.3f} {op['rows']:>9} {op['commits']:>8}")
+        return "\n".join(lines) + "\n"
+
+    def render_json(self) -> str:
+        return json.dumps({"buckets": list(LATENCY_BUCKETS), "operations": self.snapshot()}, indent=2)
+
+    def render_prometheus(self) -> str:
+        """Формат експозиції Prometheus (для textfile-колектора node_exporter)"""
+        ops = self.snapshot()
+        out = []
+
+        def family(metric, kind, help_text, field):
+            out.append(f"# HELP {metric} {help_text}")
+            out.append(f"# TYPE {metric} {kind}")
+            for name, op in ops.items():
+                out.append(f'{metric}{{op="{name}"}} {op[field]}')
+
+        family("library_operation_calls_total", "counter", "Operation calls.", "calls")
+        family("library_operation_errors_total", "counter", "Operation calls that raised.", "errors")
+        family("library_operation_rows_total", "counter", "Rows returned by operations.", "rows")
+        family("library_operation_commits_total", "counter", "Commits made by operations.", "commits")
+        metric = "library_operation_duration_seconds"
+        out.append(f"# HELP {metric} Operation latency.")
+        out.append(f"# TYPE {metric} histogram")
+        for name, op in ops.items():
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS + ("+Inf",), op["buckets"]):
+                cumulative += count
+                out.append(f'{metric}_bucket{{op="{name}",le="{bound}"}} {cumulative}')
+            out.append(f'{metric}_sum{{op="{name}"}} {op["seconds"]}')
+            out.append(f'{metric}_count{{op="{name}"}} {op["calls"]}')
+        return "\n".join(out) + "\n"
+
+    def render(self, fmt: str = "text") -> str:
+        renderers = {"text": self.render_text, "json": self.render_json, "prom": self.render_prometheus}
+        if fmt not in renderers:
+            raise ValueError(f"Unknown metrics format {fmt!r}, expected one of {DUMP_FORMATS}")
+        return renderers[fmt]()
+
+    def dump(self, path: str, fmt: Optional[str] = None) -> None:
+        """Записує метрики у файл; формат за розширенням (.txt, .json, .prom), якщо не заданий"""
+        if fmt is None:
+            fmt = next((f for ext, f in _EXTENSIONS.items() if path.endswith(ext)), "text")
+        text = self.render(fmt)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+
+
+registry = MetricsRegistry(enabled=settings.METRICS_ENABLED)
+if settings.METRICS_PATH:
+    atexit.register(registry.dump, settings.METRICS_PATH)
+
+
+def _rows(result) -> int:
+    if isinstance(result, (list, tuple, set, frozenset)):
+        return len(result)
+    # Одна модель (Book, User)
+    return 1 if hasattr(result, "FIELDS") else 0
+
+
+def _commits(obj) -> int:
+    uow = getattr(obj, "uow", None)
+    return uow.commits if uow is not None else 0
+
+
+def _timed(name: str, fn):
+    if inspect.isgeneratorfunction(fn):
+        @functools.wraps(fn)
+        def stream(self, *args, **kwargs):
+            # Генератор вимірюється до кінця читання; рядки — елементи або розміри пачок
+            if not registry.enabled:
+                yield from fn(self, *args, **kwargs)
+                return
+            commits, rows, error = _commits(self), 0, False
+            started = time.perf_counter()
+            try:
+                for item in fn(self, *args, **kwargs):
+                    rows += len(item) if isinstance(item, list) else 1
+                    yield item
+            except BaseException:
+                error = True
+                raise
+            finally:
+                registry.observe(name, time.perf_counter() - started, rows, _commits(self) - commits, error)
+        return stream
+
+    @functools.wraps(fn)
+    def call(self, *args, **kwargs):
+        if not registry.enabled:
+            return fn(self, *args, **kwargs)
+        commits = _commits(self)
+        started = time.perf_counter()
+        try:
+            result = fn(self, *args, **kwargs)
+        except BaseException:
+            registry.observe(name, time.perf_counter() - started, 0, _commits(self) - commits, True)
+            raise
+        registry.observe(name, time.perf_counter() - started, _rows(result), _commits(self) - commits)
+        return result
+    return call
+
+
+def instrumented(prefix: str, exclude: tuple = ()):
+    """
+    Декоратор класу: публічні методи, оголошені в самому класі, пишуть метрики
+    під іменем '<prefix>.<метод>'. Commit'и рахуються через self.uow (SQLiteUnitOfWork.commits).
+    """
+    def decorate(cls):
+        for name, attr in list(vars(cls).items()):
+            if name.startswith("_") or name in exclude or not inspect.isfunction(attr):
+                continue
+            setattr(cls, name, _timed(f"{prefix}.{name}", attr))
+        return cls
+    return decorate
@@ -0,0 +1,35 @@
+from typing import Dict, Iterable, List, Optional, Protocol
+from library.book import Book
+from library.user import User
+
+class IAsyncBookRepository(Protocol):
+    async def add(self, book: Book) -> None: ...
+    async def add_many(self, books: Iterable[Book], chunk_size: int = ...) -> int: ...
+    async def get(self, isbn: str) -> Optional[Book]: ...
+    async def update(self, book: Book) -> None: ...
+    async def delete(self, isbn: str) -> None: ...
+    async def list_all(self) -> List[Book]: ...
+    async def page(self, after_key: Optional[str] = None, limit: int = 100) -> List[Book]: ...
+    async def count(self) -> int: ...
+    async def count_available(self) -> int: ...
+    async def genre_stats(self) -> Dict[str, dict]: ...
+    async def fetch_window(self, offset: int, limit: int, order_by: Optional[str] = None, descending: bool = False) -> List[Book]: ...
+    async def search(self, criteria: dict, limit: Optional[int] = None, offset: int = 0) -> List[Book]: ...
+    async def full_text_search(self, query: str, limit: int = 50) -> List[Book]: ...
+
+class IAsyncUserRepository(Protocol):
+    async def add(self, user: User) -> None: ...
+    async def add_many(self, users: Iterable[User], chunk_size: int = ...) -> int: ...
+    async def get(self, user_id: str) -> Optional[User]: ...
+    async def list_all(self) -> List[User]: ...
+    async def page(self, after_key: Optional[str] = None, limit: int = 100) -> List[User]: ...
+    async def count(self) -> int: ...
+    async def fetch_window(self, offset: int, limit: int, order_by: Optional[str] = None, descending: bool = False) -> List[User]: ...
+
+class IAsyncLoanRepository(Protocol):
+    async def issue(self, isbn: str, user_id: str, date: str) -> bool: ...
+    async def return_book(self, isbn: str, user_id: str) -> bool: ...
+    async def list_issued(self) -> List[str]: ...
+    async def active_loans(self, user_id: str) -> int: ...
+    async def count_active(self) -> int: ...
+    async def list_overdue(self, cutoff_date: str, limit: Optional[int] = None) -> List[Book]: ...
@@ -0,0 +1,134 @@
+import asyncio
+import functools
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional
+
+from library.book import Book
+from library.user import User
+from repository.async_interfaces import IAsyncBookRepository, IAsyncUserRepository, IAsyncLoanRepository
+from repository.connection_pool import run_and_release
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_READ_WORKERS = 4
+
+
+class SQLiteExecutor:
+    """
+    Виконавець блокуючої роботи з SQLite поза циклом подій.
+    Читання йдуть у пул із кількох потоків (кожен зі своїм з'єднанням пулу,
+    тож запити виконуються паралельно), записи — в один окремий потік:
+    SQLite однаково допускає лише одного записувача, а так записи не
+    змагаються за блокування і виконуються в порядку надходження.
+    Після кожного виклику потік віддає з'єднання назад у пул.
+    """
+    def __init__(self, read_workers: int = DEFAULT_READ_WORKERS):
+        self._reads = ThreadPoolExecutor(max_workers=read_workers, thread_name_prefix="sqlite-read")
+        self._writes = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite-write")
+
+    async def read(self, fn, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._reads, functools.partial(run_and_release, fn, *args, **kwargs))
+
+    async def write(self, fn, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._writes, functools.partial(run_and_release, fn, *args, **kwargs))
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._reads.shutdown(wait=wait)
+        self._writes.shutdown(wait=wait)
+
+
+class _AsyncRepository:
+    def __init__(self, repo, executor: SQLiteExecutor):
+        self.sync = repo
+        self._executor = executor
+
+
+class AsyncBookRepository(_AsyncRepository, IAsyncBookRepository):
+    async def add(self, book: Book) -> None:
+        return await self._executor.write(self.sync.add, book)
+
+    async def add_many(self, books: Iterable[Book], **kwargs) -> int:
+        return await self._executor.write(self.sync.add_many, books, **kwargs)
+
+    async def get(self, isbn: str) -> Optional[Book]:
+        return await self._executor.read(self.sync.get, isbn)
+
+    async def update(self, book: Book) -> None:
+        return await self._executor.write(self.sync.update, book)
+
+    async def delete(self, isbn: str) -> None:
+        return await self._executor.write(self.sync.delete, isbn)
+
+    async def list_all(self) -> List[Book]:
+        return await self._executor.read(self.sync.list_all)
+
+    async def page(self, after_key: Optional[str] = None, limit: int = 100) -> List[Book]:
+        return await self._executor.read(self.sync.page, after_key, limit)
+
+    async def count(self) -> int:
+        return await self._executor.read(self.sync.count)
+
+    async def count_available(self) -> int:
+        return await self._executor.read(self.sync.count_available)
+
+    async def genre_stats(self) -> Dict[str, dict]:
+        return await self._executor.read(self.sync.genre_stats)
+
+    async def fetch_window(
+        self, offset: int, limit: int, order_by: Optional[str] = None, descending: bool = False
+    ) -> List[Book]:
+        return await self._executor.read(self.sync.fetch_window, offset, limit, order_by, descending)
+
+    async def search(self, criteria: dict, limit: Optional[int] = None, offset: int = 0) -> List[Book]:
+        return await self._executor.read(self.sync.search, criteria, limit, offset)
+
+    async def full_text_search(self, query: str, limit: int = 50) -> List[Book]:
+        return await self._executor.read(self.sync.full_text_search, query, limit)
+
+
+class AsyncUserRepository(_AsyncRepository, IAsyncUserRepository):
+    async def add(self, user: User) -> None:
+        return await self._executor.write(self.sync.add, user)
+
+    async def add_many(self, users: Iterable[User], **kwargs) -> int:
+        return await self._executor.write(self.sync.add_many, users, **kwargs)
+
+    async def get(self, user_id: str) -> Optional[User]:
+        return await self._executor.read(self.sync.get, user_id)
+
+    async def list_all(self) -> List[User]:
+        return await self._executor.read(self.sync.list_all)
+
+    async def page(self, after_key: Optional[str] = None, limit: int = 100) -> List[User]:
+        return await self._executor.read(self.sync.page, after_key, limit)
+
+    async def count(self) -> int:
+        return await self._executor.read(self.sync.count)
+
+    async def fetch_window(
+        self, offset: int, limit: int, order_by: Optional[str] = None, descending: bool = False
+    ) -> List[User]:
+        return await self._executor.read(self.sync.fetch_window, offset, limit, order_by, descending)
+
+
+class AsyncLoanRepository(_AsyncRepository, IAsyncLoanRepository):
+    async def issue(self, isbn: str, user_id: str, date: str) -> bool:
+        return await self._executor.write(self.sync.issue, isbn, user_id, date)
+
+    async def return_book(self, isbn: str, user_id: str) -> bool:
+        return await self._executor.write(self.sync.return_book, isbn, user_id)
+
+    async def list_issued(self) -> List[str]:
+        return await self._executor.read(self.sync.list_issued)
+
+    async def active_loans(self, user_id: str) -> int:
+        return await self._executor.read(self.sync.active_loans, user_id)
+
+    async def count_active(self) -> int:
+        return await self._executor.read(self.sync.count_active)
+
+    async def list_overdue(self, cutoff_date: str, limit: Optional[int] = None) -> List[Book]:
+        return await self._executor.read(self.sync.list_overdue, cutoff_date, limit)
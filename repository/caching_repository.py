@@ -0,0 +1,201 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterable, Optional
+
+from library.book import Book
+from library.user import User
+
+DEFAULT_CACHE_SIZE = 1024
+DEFAULT_CACHE_TTL = 300.0
+
+_MISSING = object()
+
+
+class LRUCache:
+    """
+    Потокобезпечний LRU-кеш з обмеженим розміром і часом життя записів (TTL)
+    """
+    def __init__(self, maxsize: int = DEFAULT_CACHE_SIZE, ttl: Optional[float] = DEFAULT_CACHE_TTL,
+                 clock=time.monotonic):
+        if maxsize < 1:
+            raise ValueError("maxsize must be positive")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._data: "OrderedDict[object, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        """Значення або _MISSING"""
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return _MISSING
+            value, expires = entry
+            if expires is not None and expires <= self._clock():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return _MISSING
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value) -> None:
+        expires = None if self.ttl is None else self._clock() + self.ttl
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
+
+
+class _CachingRepository:
+    """
+    Спільна частина декораторів: усе, що не перевизначено, делегується
+    обгорнутому репозиторію (search, iter_all, page, conn, uow, ...).
+    Протоколи з repository.interfaces не успадковуються навмисно: їхні методи-заглушки
+    перекрили б делегування через __getattr__ (відповідність — структурна).
+    """
+    def __init__(self, inner, cache: Optional[LRUCache] = None):
+        self._inner = inner
+        self.cache = cache or LRUCache()
+
+    def __getattr__(self, name):
+        return getattr(self._inner, name)
+
+    def stats(self) -> dict:
+        return self.cache.stats()
+
+    def _cached_get(self, key, load):
+        value = self.cache.get(key)
+        if value is not _MISSING:
+            return copy.copy(value)
+        value = load(key)
+        # Незафіксовані зміни поточної транзакції в кеш не потрапляють
+        uow = getattr(self._inner, "uow", None)
+        if value is not None and not (uow is not None and uow.active):
+            self.cache.put(key, value)
+            # Копія, щоб зміни об'єкта викликачем не потрапили в кеш без збереження
+            return copy.copy(value)
+        return value
+
+    def invalidate(self, key) -> None:
+        """Скидає запис зараз і ще раз після фіксації транзакції, в якій відбувся запис"""
+        self.cache.invalidate(key)
+        uow = getattr(self._inner, "uow", None)
+        if uow is not None:
+            uow.after_finish(lambda: self.cache.invalidate(key))
+
+
+class CachingBookRepository(_CachingRepository):
+    """Read-through кеш get() для книг з інвалідацією при будь-якому записі"""
+    def get(self, isbn: str) -> Optional[Book]:
+        return self._cached_get(isbn, self._inner.get)
+
+    def add(self, book: Book) -> None:
+        self._inner.add(book)
+        self.invalidate(book.isbn)
+
+    def add_many(self, books: Iterable[Book], **kwargs) -> int:
+        written = []
+
+        def track():
+            for book in books:
+                written.append(book.isbn)
+                yield book
+
+        try:
+            return self._inner.add_many(track(), **kwargs)
+        finally:
+            for isbn in written:
+                self.invalidate(isbn)
+
+    def update(self, book: Book) -> None:
+        self._inner.update(book)
+        self.invalidate(book.isbn)
+
+    def delete(self, isbn: str) -> None:
+        self._inner.delete(isbn)
+        self.invalidate(isbn)
+
+
+class CachingUserRepository(_CachingRepository):
+    """Read-through кеш get() для користувачів"""
+    def get(self, user_id: str) -> Optional[User]:
+        return self._cached_get(user_id, self._inner.get)
+
+    def add(self, user: User) -> None:
+        self._inner.add(user)
+        self.invalidate(user.user_id)
+
+    def add_many(self, users: Iterable[User], **kwargs) -> int:
+        written = []
+
+        def track():
+            for user in users:
+                written.append(user.user_id)
+                yield user
+
+        try:
+            return self._inner.add_many(track(), **kwargs)
+        finally:
+            for user_id in written:
+                self.invalidate(user_id)
+
+
+class CachingLoanRepository:
+    """
+    Видача і повернення змінюють рядок книги (available, issued_to, ...),
+    тому скидають відповідні записи кешів книг і користувачів
+    """
+    def __init__(self, inner, books: CachingBookRepository, users: CachingUserRepository):
+        self._inner = inner
+        self._books = books
+        self._users = users
+
+    def __getattr__(self, name):
+        return getattr(self._inner, name)
+
+    def issue(self, isbn: str, user_id: str, date: str):
+        try:
+            return self._inner.issue(isbn, user_id, date)
+        finally:
+            self._books.invalidate(isbn)
+            self._users.invalidate(user_id)
+
+    def return_book(self, isbn: str, user_id: str):
+        try:
+            return self._inner.return_book(isbn, user_id)
+        finally:
+            self._books.invalidate(isbn)
+            self._users.invalidate(user_id)
@@ -0,0 +1,217 @@
+import sqlite3
+import logging
+import threading
+import time
+import uuid
+import weakref
+from typing import Callable, Dict, List, Optional, Tuple, Type
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POOL_SIZE = 5
+DEFAULT_POOL_TIMEOUT = 30.0
+
+
+class PoolTimeoutError(sqlite3.OperationalError):
+    """Усі з'єднання пулу зайняті довше, ніж дозволяє timeout"""
+
+
+# Відкриті пули процесу: release_thread_connections() повертає в них з'єднання потоку
+_pools: "weakref.WeakSet[SQLiteConnectionPool]" = weakref.WeakSet()
+
+
+def release_thread_connections() -> None:
+    """
+    Повертає з'єднання поточного потоку в усі пули. Довгоживучі потоки виконавців
+    (фонові воркери GUI, SQLiteExecutor, AsyncEventBus) викликають це наприкінці
+    кожної задачі, інакше кожен з них тримав би слот пулу до кінця процесу.
+    """
+    for pool in list(_pools):
+        pool.release()
+
+
+def run_and_release(fn, *args, **kwargs):
+    """fn(*args, **kwargs) як окрема задача потоку-виконавця: з'єднання звільняються після неї"""
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        release_thread_connections()
+
+
+def _py_lower(value):
+    return value.lower() if isinstance(value, str) else value
+
+
+def prepare_connection(conn: sqlite3.Connection) -> sqlite3.Connection:
+    """Налаштування, потрібні репозиторіям на кожному з'єднанні"""
+    conn.row_factory = sqlite3.Row
+    # Unicode-нижній регістр для пошуку не-ASCII рядків (LIKE його не підтримує)
+    conn.create_function("py_lower", 1, _py_lower, deterministic=True)
+    return conn
+
+
+class SingleConnection:
+    """
+    Джерело з'єднань над одним готовим sqlite3.Connection
+    (тести та код, що керує з'єднанням сам)
+    """
+    def __init__(self, conn: sqlite3.Connection):
+        self._conn = prepare_connection(conn)
+
+    def connection(self) -> sqlite3.Connection:
+        return self._conn
+
+    def release(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+class SQLiteConnectionPool:
+    """
+    Пул з'єднань SQLite з прив'язкою до потоку: кожен потік працює через власне
+    з'єднання (транзакції різних потоків не змішуються), а загальна кількість
+    відкритих з'єднань обмежена pool_size. З'єднання завершених потоків
+    повертаються в пул автоматично, живий потік може віддати своє через release()
+    (потоки виконавців — через release_thread_connections() після кожної задачі).
+    """
+    def __init__(
+        self,
+        db_path: str,
+        pool_size: int = DEFAULT_POOL_SIZE,
+        timeout: float = DEFAULT_POOL_TIMEOUT,
+        initializer: Optional[Callable[[sqlite3.Connection], None]] = None,
+        factory: Type[sqlite3.Connection] = sqlite3.Connection,
+    ):
+        if pool_size < 1:
+            raise ValueError("pool_size must be positive")
+        self.db_path = db_path
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self._initializer = initializer
+        # Клас з'єднання для sqlite3.connect (наприклад, із журналом повільних запитів)
+        self._factory = factory
+        self._cond = threading.Condition()
+        self._local = threading.local()
+        self._idle: List[sqlite3.Connection] = []
+        self._owned: Dict[int, Tuple[threading.Thread, sqlite3.Connection]] = {}
+        self._open = 0
+        self._closed = False
+        self._keeper: Optional[sqlite3.Connection] = None
+        self._uri = False
+        if db_path == ":memory:":
+            # Окремі з'єднання до ':memory:' бачили б різні бази, тому для
+            # in-memory використовується іменована база VFS memdb, яку тримає keeper.
+            # Не cache=shared: там конфлікт потоків — SQLITE_LOCKED, який busy_timeout
+            # не повторює, а memdb блокує як звичайний файл (SQLITE_BUSY з очікуванням)
+            if sqlite3.sqlite_version_info >= (3, 36, 0):
+                self.db_path = f"file:/memdb-{uuid.uuid4().hex}?vfs=memdb"
+            else:
+                # Старі SQLite без спільних memdb-баз
+                self.db_path = f"file:memdb-{uuid.uuid4().hex}?mode=memory&cache=shared"
+            self._uri = True
+            self._keeper = sqlite3.connect(self.db_path, uri=True, check_same_thread=False)
+        _pools.add(self)
+
+    @property
+    def open_connections(self) -> int:
+        return self._open
+
+    def connection(self) -> sqlite3.Connection:
+        """З'єднання поточного потоку (створюється або береться з пулу при першому виклику)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and not self._closed:
+            return conn
+        with self._cond:
+            conn = self._acquire()
+        self._local.conn = conn
+        return conn
+
+    def release(self) -> None:
+        """Повертає з'єднання поточного потоку в пул (наприклад, наприкінці задачі воркера)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            return
+        self._local.conn = None
+        with self._cond:
+            self._owned.pop(threading.get_ident(), None)
+            if self._closed:
+                return
+            if conn.in_transaction:
+                conn.rollback()
+            self._idle.append(conn)
+            self._cond.notify()
+
+    def close(self) -> None:
+        """Явне завершення: закриває всі з'єднання, подальші запити до пулу — помилка"""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            _pools.discard(self)
+            conns = self._idle + [conn for _, conn in self._owned.values()]
+            self._idle.clear()
+            self._owned.clear()
+            self._open = 0
+            self._cond.notify_all()
+        for conn in conns:
+            try:
+                conn.close()
+            except sqlite3.Error as e:
+                logger.error("Error closing pooled connection: %s", e)
+        if self._keeper is not None:
+            self._keeper.close()
+        logger.debug("Connection pool closed, %s connections", len(conns))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _acquire(self) -> sqlite3.Connection:
+        deadline = time.monotonic() + self.timeout
+        while True:
+            if self._closed:
+                raise sqlite3.ProgrammingError("Connection pool is closed")
+            self._reclaim_dead_threads()
+            if self._idle:
+                conn = self._idle.pop()
+            elif self._open < self.pool_size:
+                conn = self._connect()
+                self._open += 1
+            else:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolTimeoutError(
+                        f"No free connection in pool (size={self.pool_size}) after {self.timeout}s"
+                    )
+                self._cond.wait(min(remaining, 0.1))
+                continue
+            self._owned[threading.get_ident()] = (threading.current_thread(), conn)
+            return conn
+
+    def _reclaim_dead_threads(self) -> None:
+        for ident, (thread, conn) in list(self._owned.items()):
+            if not thread.is_alive():
+                del self._owned[ident]
+                if conn.in_transaction:
+                    conn.rollback()
+                self._idle.append(conn)
+
+    def _connect(self) -> sqlite3.Connection:
+        # Пул гарантує, що з'єднанням одночасно користується лише один потік
+        conn = sqlite3.connect(self.db_path, uri=self._uri, check_same_thread=False, factory=self._factory)
+        prepare_connection(conn)
+        if self._initializer is not None:
+            self._initializer(conn)
+        logger.debug("Opened pooled connection to %s", self.db_path)
+        return conn
+
+
+def as_connection_source(conn):
+    """Приводить sqlite3.Connection або пул до спільного інтерфейсу connection()"""
+    if isinstance(conn, sqlite3.Connection):
+        return SingleConnection(conn)
+    return conn
@@ -1,31 +1,88 @@
-import sqlite3
-from database import initialize_database
+from typing import Optional
+from config import StorageProfile, settings
+from database import apply_storage_profile, migrate
+from repository.caching_repository import (
+    CachingBookRepository, CachingUserRepository, CachingLoanRepository, LRUCache,
+    DEFAULT_CACHE_SIZE, DEFAULT_CACHE_TTL,
+)
+from repository.connection_pool import DEFAULT_POOL_SIZE, SQLiteConnectionPool
+from repository.slow_query import slow_query_connection
 from repository.sqlite_repository import (
-    SQLiteBookRepository, SQLiteUserRepository, SQLiteLoanRepository
+    SQLiteBookRepository, SQLiteUserRepository, SQLiteLoanRepository, SQLiteUnitOfWork
 )
 
 class RepoBundle:
     """
     Бандл репозиторіїв для одного бекенду
     """
-    def __init__(self, book_repo, user_repo, loan_repo):
+    def __init__(self, book_repo, user_repo, loan_repo, uow=None, pool=None):
         self.book_repo = book_repo
         self.user_repo = user_repo
         self.loan_repo = loan_repo
+        self.uow = uow
+        self.pool = pool
+
+    def transaction(self):
+        """
+        Unit of work: усередині блоку репозиторії не комітять кожен виклик,
+        наприкінці виконується один commit (або rollback при помилці)
+        """
+        return self.uow.transaction()
+
+    def close(self) -> None:
+        """Закриває всі з'єднання бандла"""
+        if self.pool is not None:
+            self.pool.close()
 
 class RepositoryFactory:
     @staticmethod
-    def create_sqlite(db_path: str) -> RepoBundle:
+    def create_sqlite(
+        db_path: str,
+        pool_size: int = DEFAULT_POOL_SIZE,
+        profile: Optional[StorageProfile] = None,
+    ) -> RepoBundle:
         """
-        Створює бандл репозиторіїв на основі SQLite
+        Створює бандл репозиторіїв на основі SQLite.
+        Усі репозиторії ділять один пул з'єднань (по з'єднанню на потік);
+        профіль PRAGMA (за замовчуванням — з config.settings) застосовується до кожного з'єднання.
+        Запити, довші за settings.SLOW_QUERY_MS, потрапляють у журнал повільних запитів.
         """
-        initialize_database(db_path)
-        conn = sqlite3.connect(db_path)
-        conn.row_factory = sqlite3.Row
+        profile = profile or settings.storage_profile()
+        pool = SQLiteConnectionPool(
+            db_path,
+            pool_size=pool_size,
+            initializer=lambda conn: apply_storage_profile(conn, profile),
+            factory=slow_query_connection(settings.slow_query_threshold()),
+        )
+        migrate(pool.connection())
+        uow = SQLiteUnitOfWork(pool)
         return RepoBundle(
-            book_repo=SQLiteBookRepository(conn),
-            user_repo=SQLiteUserRepository(conn),
-            loan_repo=SQLiteLoanRepository(conn),
+            book_repo=SQLiteBookRepository(pool, uow),
+            user_repo=SQLiteUserRepository(pool, uow),
+            loan_repo=SQLiteLoanRepository(pool, uow),
+            uow=uow,
+            pool=pool,
+        )
+
+    @staticmethod
+    def create_cached_sqlite(
+        db_path: str,
+        pool_size: int = DEFAULT_POOL_SIZE,
+        cache_size: int = DEFAULT_CACHE_SIZE,
+        cache_ttl: Optional[float] = DEFAULT_CACHE_TTL,
+    ) -> RepoBundle:
+        """
+        SQLite-бандл, у якому книги й користувачі читаються через LRU-кеш з TTL
+        """
+        bundle = RepositoryFactory.create_sqlite(db_path, pool_size)
+        books = CachingBookRepository(bundle.book_repo, LRUCache(cache_size, cache_ttl))
+        users = CachingUserRepository(bundle.user_repo, LRUCache(cache_size, cache_ttl))
+        return RepoBundle(
+            book_repo=books,
+            user_repo=users,
+            loan_repo=CachingLoanRepository(bundle.loan_repo, books, users),
+            uow=bundle.uow,
+            pool=bundle.pool,
         )
 
     @staticmethod
@@ -33,12 +90,40 @@ class RepositoryFactory:
         """
         Створює бандл репозиторіїв in-memory (для тестування)
         """
-        path = ':memory:'
-        initialize_database(path)
-        conn = sqlite3.connect(path)
-        conn.row_factory = sqlite3.Row
-        return RepoBundle(
-            book_repo=SQLiteBookRepository(conn),
-            user_repo=SQLiteUserRepository(conn),
-            loan_repo=SQLiteLoanRepository(conn),
+        return RepositoryFactory.create_sqlite(':memory:', pool_size=DEFAULT_POOL_SIZE)
+
+    @staticmethod
+    def sqlite_resource(db_path: str, pool_size: Optional[int] = None):
+        """
+        Ресурс для DI-контейнера: один бандл на контейнер,
+        закривається через container.shutdown_resources()
+        """
+        bundle = RepositoryFactory.create_sqlite(db_path, pool_size or DEFAULT_POOL_SIZE)
+        try:
+            yield bundle
+        finally:
+            bundle.close()
+
+    @staticmethod
+    def cached_sqlite_resource(
+        db_path: str,
+        pool_size: Optional[int] = None,
+        cache_size: Optional[int] = None,
+        cache_ttl: Optional[float] = None,
+    ):
+        """Ресурс кешованого SQLite-бандла для DI-контейнера"""
+        bundle = RepositoryFactory.create_cached_sqlite(
+            db_path,
+            pool_size or DEFAULT_POOL_SIZE,
+            cache_size or DEFAULT_CACHE_SIZE,
+            DEFAULT_CACHE_TTL if cache_ttl is None else cache_ttl,
         )
+        try:
+            yield bundle
+        finally:
+            bundle.close()
+
+    @staticmethod
+    def in_memory_resource(pool_size: Optional[int] = None):
+        """Ресурс in-memory бандла для DI-контейнера"""
+        yield from RepositoryFactory.sqlite_resource(':memory:', pool_size)
@@ -1,20 +1,43 @@
-from typing import List, Optional, Protocol
+from typing import Dict, Iterable, Iterator, List, Optional, Protocol, Sequence, Set
 from library.book import Book
 from library.user import User
 
 class IBookRepository(Protocol):
     def add(self, book: Book) -> None: ...
+    def add_many(self, books: Iterable[Book], chunk_size: int = ...) -> int: ...
     def get(self, isbn: str) -> Optional[Book]: ...
     def update(self, book: Book) -> None: ...
     def delete(self, isbn: str) -> None: ...
     def list_all(self) -> List[Book]: ...
+    def iter_all(self, batch_size: int = ...) -> Iterator[Book]: ...
+    def column_batches(self, columns: Sequence[str], batch_size: int = ...) -> Iterator[List[tuple]]: ...
+    def row_batches(self, batch_size: int = ...) -> Iterator[List[tuple]]: ...
+    def page(self, after_key: Optional[str] = None, limit: int = 100) -> List[Book]: ...
+    def existing_keys(self, isbns: Iterable[str]) -> Set[str]: ...
+    def count(self) -> int: ...
+    def count_available(self) -> int: ...
+    def genre_stats(self) -> Dict[str, dict]: ...
+    def fetch_window(self, offset: int, limit: int, order_by: Optional[str] = None, descending: bool = False) -> List[Book]: ...
+    def search(self, criteria: dict, limit: Optional[int] = None, offset: int = 0) -> List[Book]: ...
+    def full_text_search(self, query: str, limit: int = 50) -> List[Book]: ...
 
 class IUserRepository(Protocol):
     def add(self, user: User) -> None: ...
+    def add_many(self, users: Iterable[User], chunk_size: int = ...) -> int: ...
     def get(self, user_id: str) -> Optional[User]: ...
     def list_all(self) -> List[User]: ...
+    def iter_all(self, batch_size: int = ...) -> Iterator[User]: ...
+    def row_batches(self, batch_size: int = ...) -> Iterator[List[tuple]]: ...
+    def page(self, after_key: Optional[str] = None, limit: int = 100) -> List[User]: ...
+    def existing_keys(self, user_ids: Iterable[str]) -> Set[str]: ...
+    def count(self) -> int: ...
+    def fetch_window(self, offset: int, limit: int, order_by: Optional[str] = None, descending: bool = False) -> List[User]: ...
 
 class ILoanRepository(Protocol):
-    def issue(self, isbn: str, user_id: str, date: str) -> None: ...
-    def return_book(self, isbn: str, user_id: str) -> None: ...
-    def list_issued(self) -> List[str]: ...
\ No newline at end of file
+    def issue(self, isbn: str, user_id: str, date: str) -> bool: ...
+    def return_book(self, isbn: str, user_id: str) -> bool: ...
+    def list_issued(self) -> List[str]: ...
+    def row_batches(self, batch_size: int = ...) -> Iterator[List[tuple]]: ...
+    def active_loans(self, user_id: str) -> int: ...
+    def count_active(self) -> int: ...
+    def list_overdue(self, cutoff_date: str, limit: Optional[int] = None) -> List[Book]: ...
\ No newline at end of file
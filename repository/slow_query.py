@@ -0,0 +1,167 @@
+"""
+Журнал повільних запитів: з'єднання, курсори якого вимірюють кожен запит
+(execute/executemany разом із вибіркою рядків) і пишуть у логер repository.slow_query
+текст SQL, форму параметрів (типи, не значення), тривалість і EXPLAIN QUERY PLAN
+для запитів, довших за поріг.
+Файл журналу налаштовує Settings.configure_logging; без налаштованого логування
+журнал мовчить.
+"""
+import logging
+import sqlite3
+import time
+from typing import Optional, Type
+
+from config import SLOW_QUERY_LOGGER
+
+slow_log = logging.getLogger(SLOW_QUERY_LOGGER)
+# Без configure_logging() записи не йдуть у stderr через logging.lastResort
+slow_log.addHandler(logging.NullHandler())
+
+
+def params_shape(params) -> str:
+    """Типи параметрів без значень (у журнал не потрапляють персональні дані читачів)"""
+    if isinstance(params, dict):
+        return "{" + ", ".join(f"{k}: {type(v).__name__}" for k, v in params.items()) + "}"
+    return "(" + ", ".join(type(v).__name__ for v in params) + ")"
+
+
+def _query_plan(conn: sqlite3.Connection, sql: str, params) -> str:
+    try:
+        # Звичайний курсор: сам EXPLAIN не має потрапляти в журнал
+        rows = sqlite3.Cursor(conn).execute("EXPLAIN QUERY PLAN " + sql, params).fetchall()
+    except sqlite3.Error as e:
+        return f"unavailable ({e})"
+    return "; ".join(row[3] for row in rows) or "-"
+
+
+def _has_listeners() -> bool:
+    """Чи дійде запис хоч до одного справжнього обробника (логування налаштовано)"""
+    logger = slow_log
+    while logger is not None:
+        if any(not isinstance(h, logging.NullHandler) for h in logger.handlers):
+            return True
+        logger = logger.parent if logger.propagate else None
+    return False
+
+
+def _report(conn, sql: str, params, shape: str, elapsed: float) -> None:
+    # Без налаштованого логування не виконуємо зайвий EXPLAIN
+    if not slow_log.isEnabledFor(logging.WARNING) or not _has_listeners():
+        return
+    slow_log.warning(
+        "duration_ms=%.1f params=%s sql=%s plan=%s",
+        elapsed * 1000, shape, " ".join(sql.split()), _query_plan(conn, sql, params),
+    )
+
+
+_now = time.perf_counter
+_fetchone, _fetchmany, _fetchall, _next = (
+    sqlite3.Cursor.fetchone, sqlite3.Cursor.fetchmany, sqlite3.Cursor.fetchall, sqlite3.Cursor.__next__,
+)
+
+
+class SlowQueryCursor(sqlite3.Cursor):
+    """
+    Час запиту — сума execute і всіх вибірок рядків (fetch*/ітерація): SQLite
+    виконує більшу частину роботи саме під час вибірки. Запит потрапляє в журнал
+    один раз, щойно сумарний час перевищить поріг.
+    """
+    _sql = None
+    _params = ()
+    _shape = ""
+    _elapsed = 0.0
+    _reported = True
+
+    def _account(self, elapsed: float) -> None:
+        self._elapsed += elapsed
+        if not self._reported and self._elapsed >= self.connection.slow_query_threshold:
+            self._reported = True
+            _report(self.connection, self._sql, self._params, self._shape, self._elapsed)
+
+    def _start(self, sql, params, shape) -> None:
+        self._sql, self._params, self._shape = sql, params, shape
+        self._elapsed, self._reported = 0.0, False
+
+    def execute(self, sql, parameters=()):
+        self._start(sql, parameters, params_shape(parameters))
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._account(time.perf_counter() - started)
+
+    def executemany(self, sql, seq_of_parameters):
+        # Параметри можуть бути генератором: запам'ятовуємо перший набір і кількість
+        first, count = [], 0
+
+        def tapped():
+            nonlocal count
+            for params in seq_of_parameters:
+                if not first:
+                    first.append(params)
+                count += 1
+                yield params
+
+        self._start(sql, (), "")
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, tapped())
+        finally:
+            if first:
+                self._params, self._shape = first[0], f"{count} x {params_shape(first[0])}"
+            else:
+                self._reported = True
+            self._account(time.perf_counter() - started)
+
+    def fetchone(self):
+        started = _now()
+        try:
+            return _fetchone(self)
+        finally:
+            self._account(_now() - started)
+
+    def fetchmany(self, size=None):
+        started = _now()
+        try:
+            return _fetchmany(self, self.arraysize if size is None else size)
+        finally:
+            self._account(_now() - started)
+
+    def fetchall(self):
+        started = _now()
+        try:
+            return _fetchall(self)
+        finally:
+            self._account(_now() - started)
+
+    def __next__(self):
+        # Викликається на кожен рядок: без super() і зайвого виклику методу
+        started = _now()
+        try:
+            return _next(self)
+        finally:
+            self._elapsed += _now() - started
+            if not self._reported and self._elapsed >= self.connection.slow_query_threshold:
+                self._account(0.0)
+
+
+class SlowQueryConnection(sqlite3.Connection):
+    """Фабрика з'єднань для sqlite3.connect(factory=...): усі курсори — SlowQueryCursor"""
+    slow_query_threshold = 0.0
+
+    def cursor(self, factory=None):
+        return super().cursor(factory or SlowQueryCursor)
+
+    # Вбудовані Connection.execute/executemany створюють курсор в обхід cursor()
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+def slow_query_connection(threshold: Optional[float]) -> Type[sqlite3.Connection]:
+    """Клас з'єднання з порогом threshold (секунди); None — звичайне з'єднання без вимірювань"""
+    if threshold is None:
+        return sqlite3.Connection
+    return type("SlowQueryConnection", (SlowQueryConnection,), {"slow_query_threshold": threshold})
@@ -1,199 +1,939 @@
+import re
 import sqlite3
 import logging
-from typing import List, Optional
+import threading
+from contextlib import contextmanager
+from itertools import islice
+from typing import Collection, Dict, Iterable, Iterator, List, Optional, Sequence, Set
 from datetime import date
 
 from library.book import Book
 from library.user import User
+from metrics import instrumented
+from repository.connection_pool import as_connection_source
 from repository.interfaces import IBookRepository, IUserRepository, ILoanRepository
 
 # Модульний логер
 logger = logging.getLogger(__name__)
 
+# Розмір пачки для executemany у масових вставках
+DEFAULT_CHUNK_SIZE = 500
 
-class SQLiteBookRepository(IBookRepository):
-    def __init__(self, conn: sqlite3.Connection):
-        self.conn = conn
+_BOOK_UPSERT = (
+    "INSERT OR REPLACE INTO books "
+    "(isbn, title, author, year, genre, available, issued_to, issue_date, times_issued) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+_USER_UPSERT = (
+    "INSERT OR REPLACE INTO users (user_id, first_name, last_name, email) "
+    "VALUES (?, ?, ?, ?)"
+)
 
-    def add(self, book: Book) -> None:
+
+def _book_columns(alias: Optional[str] = None) -> str:
+    prefix = f"{alias}." if alias else ""
+    return ", ".join(prefix + f for f in Book.FIELDS)
+
+
+# Явний перелік колонок замість SELECT *: порядок відомий мапперам _*_from_tuple
+_SELECT_BOOKS = f"SELECT {_book_columns()} FROM books"
+_SELECT_USERS = f"SELECT {', '.join(User.FIELDS)} FROM users"
+
+_restore_book = Book.restore
+_new_object = object.__new__
+
+
+def _chunked(items: Iterable, size: int) -> Iterator[list]:
+    """Розбиває потік записів на списки довжиною не більше size"""
+    if size < 1:
+        raise ValueError("chunk_size must be positive")
+    it = iter(items)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class TransactionRolledBack(sqlite3.Error):
+    """Одиницю роботи відкочено через помилку сховища, яку репозиторій уже залогував"""
+
+
+class _UnitOfWorkState(threading.local):
+    # Значення за замовчуванням для потоку, який ще не відкривав транзакцій
+    commits = 0
+    committed = True
+
+
+class SQLiteUnitOfWork:
+    """
+    Одиниця роботи над спільним джерелом з'єднань.
+    Поки відкрита transaction(), репозиторії не комітять самі:
+    наприкінці виконується один commit або rollback.
+    Стан транзакції ведеться окремо для кожного потоку (у кожного своє з'єднання).
+    Якщо одиницю відкочено (помилка репозиторію чи commit), transaction() кидає виняток,
+    тож виклик не може вдавати успіх.
+    """
+    def __init__(self, conn):
+        self._connections = as_connection_source(conn)
+        self._state = _UnitOfWorkState()
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        return self._connections.connection()
+
+    @property
+    def active(self) -> bool:
+        return getattr(self._state, "depth", 0) > 0
+
+    @property
+    def commits(self) -> int:
+        """Кількість commit'ів у поточному потоці (для метрик операцій)"""
+        return self._state.commits
+
+    @property
+    def committed(self) -> bool:
+        """Чи зафіксовано останню завершену в цьому потоці транзакцію"""
+        return self._state.committed
+
+    def _count_commit(self) -> None:
+        self._state.commits += 1
+
+    @contextmanager
+    def transaction(self):
+        state = self._state
+        state.depth = getattr(state, "depth", 0) + 1
         try:
-            self.conn.execute(
-                "INSERT OR REPLACE INTO books "
-                "(isbn, title, author, year, genre, available, issued_to, issue_date, times_issued) "
-                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
-                (
-                    book.isbn,
-                    book.title,
-                    book.author,
-                    book.year,
-                    book.genre,
-                    int(book.available),
-                    book.issued_to,
-                    book.issue_date.isoformat() if book.issue_date else None,
-                    book.times_issued,
-                ),
-            )
+            yield self
+        except BaseException:
+            state.failed = True
+            state.depth -= 1
+            if state.depth == 0:
+                self._finish()
+            raise
+        state.depth -= 1
+        if state.depth == 0 and not self._finish():
+            # Репозиторій перехопив помилку і позначив відкат: повідомляємо викликача
+            raise TransactionRolledBack("Unit of work rolled back after a storage error")
+
+    def after_finish(self, callback) -> None:
+        """
+        Викликає callback після завершення поточної транзакції (commit чи rollback);
+        поза транзакцією — одразу. Потрібно кешам, щоб скинути записи після фіксації.
+        """
+        if not self.active:
+            callback()
+            return
+        if getattr(self._state, "callbacks", None) is None:
+            self._state.callbacks = []
+        self._state.callbacks.append(callback)
+
+    def after_commit(self, callback) -> None:
+        """Як after_finish, але callback викликається лише якщо транзакцію зафіксовано"""
+        if not self.active:
+            callback()
+            return
+        self.after_finish(lambda: callback() if self._state.committed else None)
+
+    def _finish(self) -> bool:
+        """Commit або rollback наприкінці; повертає False, якщо одиницю відкочено"""
+        state = self._state
+        failed, state.failed = getattr(state, "failed", False), False
+        callbacks, state.callbacks = getattr(state, "callbacks", None) or [], None
+        state.committed = False
+        conn = self.conn
+        try:
+            if failed:
+                conn.rollback()
+                logger.debug("Unit of work rolled back")
+                return False
+            try:
+                conn.commit()
+            except sqlite3.Error as e:
+                conn.rollback()
+                logger.error("Error committing unit of work: %s", e)
+                raise
+            state.committed = True
+            self._count_commit()
+            logger.debug("Unit of work committed")
+            return True
+        finally:
+            for callback in callbacks:
+                callback()
+
+    @contextmanager
+    def snapshot(self):
+        """
+        Узгоджений знімок для довгих читань (експорт): усі запити потоку в блоці
+        бачать базу на момент першого з них. Це лише транзакція читання (query_only),
+        тож у режимі WAL записувачі в інших потоках не блокуються.
+        Усередині transaction() чи іншого snapshot() — просто поточна транзакція.
+        """
+        state = self._state
+        if self.active or getattr(state, "snapshot", False):
+            yield self.conn
+            return
+        conn = self.conn
+        conn.execute("BEGIN")
+        conn.execute("PRAGMA query_only=ON")
+        state.snapshot = True
+        try:
+            yield conn
+        finally:
+            state.snapshot = False
+            conn.rollback()
+            conn.execute("PRAGMA query_only=OFF")
+
+    def commit(self) -> None:
+        """Commit поза транзакцією; всередині неї фіксація відкладається до кінця"""
+        if not self.active and not getattr(self._state, "snapshot", False):
             self.conn.commit()
-            logger.debug(f"Added/Updated book: {book.isbn}")
+            self._count_commit()
+
+    def rollback(self) -> None:
+        """Rollback поза транзакцією; всередині неї — позначка відкотити все наприкінці"""
+        if self.active:
+            self._state.failed = True
+        elif not getattr(self._state, "snapshot", False):
+            # У знімку писати нічого (query_only), а rollback завершив би сам знімок
+            self.conn.rollback()
+
+
+class _SQLiteRepository:
+    def __init__(self, conn, uow: Optional[SQLiteUnitOfWork] = None):
+        # conn — sqlite3.Connection або пул (SQLiteConnectionPool)
+        self._connections = as_connection_source(conn)
+        self.uow = uow or SQLiteUnitOfWork(self._connections)
+        self._has_stats: Optional[bool] = None
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """З'єднання поточного потоку"""
+        return self._connections.connection()
+
+    def _select(self, sql: str, params=()) -> sqlite3.Cursor:
+        """
+        Запит, рядки якого — звичайні кортежі (без sqlite3.Row):
+        мапери нижче розбирають їх за позицією колонок
+        """
+        cursor = self.conn.cursor()
+        cursor.row_factory = None
+        return cursor.execute(sql, params)
+
+    def _stats_available(self) -> bool:
+        """Чи є підсумкові таблиці, які ведуть тригери (міграція 5)"""
+        if self._has_stats is None:
+            self._has_stats = self.conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type='table' AND name='library_totals'"
+            ).fetchone() is not None
+        return self._has_stats
+
+    def _scalar(self, stats_sql: str, fallback_sql: str, params=()) -> int:
+        """Лічильник з підсумкової таблиці; без неї — підрахунок по самій таблиці"""
+        sql = stats_sql if self._stats_available() else fallback_sql
+        row = self.conn.execute(sql, params).fetchone()
+        return row[0] if row and row[0] is not None else 0
+
+    def _existing(self, table: str, key: str, keys: Iterable[str]) -> Set[str]:
+        """Які з ключів уже є в таблиці: пачками IN (...), по запиту на DEFAULT_CHUNK_SIZE ключів"""
+        found: Set[str] = set()
+        for chunk in _chunked(keys, DEFAULT_CHUNK_SIZE):
+            marks = ", ".join("?" * len(chunk))
+            found.update(row[0] for row in self._select(f"SELECT {key} FROM {table} WHERE {key} IN ({marks})", chunk))
+        return found
+
+    def _batches(self, sql: str, batch_size: int) -> Iterator[List[tuple]]:
+        """Результат запиту пачками кортежів fetchmany — пам'ять не залежить від розміру таблиці"""
+        cursor = self._select(sql)
+        return iter(lambda: cursor.fetchmany(batch_size), [])
+
+    def _commit(self) -> None:
+        self.uow.commit()
+
+    def _rollback(self) -> None:
+        self.uow.rollback()
+
+
+def _snapshot(book: Book, fields: Iterable[str] = Book.FIELDS) -> Dict[str, object]:
+    """Значення полів, записаних у сховище (для позначки чистоти після commit)"""
+    return {f: getattr(book, f) for f in fields}
+
+
+def _mark_flushed(book: Book, written: Dict[str, object]) -> None:
+    # Поле, змінене знову після запису (ще до commit), лишається "брудним"
+    book.mark_clean([f for f, value in written.items() if getattr(book, f) == value])
+
+
+def _book_params(book: Book) -> tuple:
+    return (
+        book.isbn,
+        book.title,
+        book.author,
+        book.year,
+        book.genre,
+        int(book.available),
+        book.issued_to,
+        book.issue_date.isoformat() if book.issue_date else None,
+        book.times_issued,
+    )
+
+
+def _book_column(book: Book, field: str):
+    """Значення атрибута книги в поданні колонки SQLite"""
+    value = getattr(book, field)
+    if field == "available":
+        return int(value)
+    if field == "issue_date":
+        return value.isoformat() if value else None
+    return value
+
+
+def _user_params(user: User) -> tuple:
+    return (user.user_id, user.first_name, user.last_name, user.email)
+
+
+def _book_from_tuple(row: tuple) -> Book:
+    """Книга з рядка _SELECT_BOOKS (колонки в порядку Book.FIELDS)"""
+    isbn, title, author, year, genre, available, issued_to, issue_date, times_issued = row
+    return _restore_book((
+        isbn, title, author, year, genre, bool(available), issued_to,
+        date.fromisoformat(issue_date) if issue_date else None, times_issued,
+    ))
+
+
+def _user_from_tuple(row: tuple) -> User:
+    """Користувач з рядка _SELECT_USERS (колонки в порядку User.FIELDS)"""
+    user = _new_object(User)
+    user.user_id, user.first_name, user.last_name, user.email = row
+    user.issued_books = []
+    return user
+
+
+# Атрибути Book, за якими дозволено шукати (збігаються з назвами колонок)
+_BOOK_SEARCH_COLUMNS = frozenset(
+    ("isbn", "title", "author", "year", "genre", "available", "issued_to", "issue_date", "times_issued")
+)
+_BOOK_TEXT_COLUMNS = frozenset(("isbn", "title", "author", "genre", "issued_to"))
+# Допустимі типи значень критеріїв для нетекстових колонок (bool — підклас int)
+_BOOK_VALUE_TYPES = {"year": (int, float), "available": (int,), "times_issued": (int, float), "issue_date": (date,)}
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _contains_clause(column: str, value: str) -> tuple:
+    """Умова «колонка містить підрядок» без урахування регістру"""
+    needle = value.lower()
+    if needle.isascii():
+        # LIKE у SQLite ігнорує регістр лише для ASCII
+        return f"{column} LIKE ? ESCAPE '\\'", f"%{_escape_like(needle)}%"
+    return f"instr(py_lower({column}), ?) > 0", needle
+
+
+def _fts_query(terms: List[str]) -> str:
+    """Кожне слово — префіксний терм FTS5 у лапках (без спецсинтаксису користувача)"""
+    return " ".join('"{}"*'.format(t.replace('"', '""')) for t in terms)
+
+
+def _sql_value(value):
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+
+def _check_criterion(key: str, value) -> None:
+    """
+    Значення має тип атрибута книги (None — відсутнє значення). Інакше SQLite порівняв би
+    його через приведення типів (year='2000' знайшов би 2000), а фільтр об'єктів — ні.
+    """
+    expected = (str,) if key in _BOOK_TEXT_COLUMNS else _BOOK_VALUE_TYPES[key]
+    if value is not None and not isinstance(value, expected):
+        names = "/".join(t.__name__ for t in expected)
+        raise ValueError(f"Search criterion {key!r} expects {names}, got {type(value).__name__}")
+
+
+def _compile_book_criteria(criteria: dict) -> tuple:
+    """
+    Перетворює критерії пошуку на параметризований WHERE.
+    Рядок — регістронезалежний пошук підрядка, кортеж (від, до) — діапазон
+    (None означає відкриту межу), будь-що інше — точна рівність.
+    Значення невідповідного колонці типу — ValueError (див. _check_criterion).
+    """
+    clauses: List[str] = []
+    params: list = []
+    for key, value in criteria.items():
+        if key not in _BOOK_SEARCH_COLUMNS:
+            raise ValueError(f"Unknown search criterion: {key!r}")
+        for item in value if isinstance(value, tuple) else (value,):
+            _check_criterion(key, item)
+        if isinstance(value, str) and key in _BOOK_TEXT_COLUMNS:
+            clause, param = _contains_clause(key, value)
+            clauses.append(clause)
+            params.append(param)
+        elif isinstance(value, tuple) and len(value) == 2:
+            low, high = value
+            if low is not None:
+                clauses.append(f"{key} >= ?")
+                params.append(_sql_value(low))
+            if high is not None:
+                clauses.append(f"{key} <= ?")
+                params.append(_sql_value(high))
+        else:
+            clauses.append(f"{key} IS ?")
+            params.append(_sql_value(value))
+    where = " WHERE " + " AND ".join(clauses) if clauses else ""
+    return where, params
+
+
+# Колонки, за якими віртуалізовані списки можуть сортувати (ORDER BY)
+_USER_SORT_COLUMNS = frozenset(("user_id", "first_name", "last_name", "email"))
+
+
+def _order_clause(order_by: Optional[str], descending: bool, allowed: frozenset, key: str) -> str:
+    """
+    ORDER BY для вікна рядків. Первинний ключ додається останнім,
+    щоб порядок був повним і сусідні вікна не перекривались.
+    """
+    direction = "DESC" if descending else "ASC"
+    if order_by is None or order_by == key:
+        return f" ORDER BY {key} {direction}"
+    if order_by not in allowed:
+        raise ValueError(f"Unknown sort column: {order_by!r}")
+    return f" ORDER BY {order_by} {direction}, {key} {direction}"
+
+
+@instrumented("books")
+class SQLiteBookRepository(_SQLiteRepository, IBookRepository):
+    # Колонки рядків row_batches
+    EXPORT_COLUMNS = Book.FIELDS
+
+    def __init__(self, conn, uow: Optional[SQLiteUnitOfWork] = None):
+        super().__init__(conn, uow)
+        self._has_fts: Optional[bool] = None
+
+    def add(self, book: Book) -> None:
+        try:
+            self.conn.execute(_BOOK_UPSERT, _book_params(book))
+            self._commit()
+            # У транзакції зміни ще можуть відкотитися: книга лишається "брудною" до commit
+            written = _snapshot(book)
+            self.uow.after_commit(lambda: _mark_flushed(book, written))
+            logger.debug("Added/Updated book: %s", book.isbn)
+        except sqlite3.Error as e:
+            self._rollback()
+            logger.error("Error adding book [%s]: %s", book.isbn, e)
+
+    def add_many(self, books: Iterable[Book], chunk_size: int = DEFAULT_CHUNK_SIZE) -> int:
+        """
+        Масова вставка книг: пачки по chunk_size через executemany,
+        одна транзакція та один commit на весь потік.
+        Повертає кількість записаних книг (0 у разі помилки — все відкочено).
+        Інші винятки (наприклад, з генератора книг) теж відкочують вставку і прокидаються далі.
+        """
+        count = 0
+        try:
+            for chunk in _chunked(books, chunk_size):
+                self.conn.executemany(_BOOK_UPSERT, [_book_params(b) for b in chunk])
+                count += len(chunk)
+            self._commit()
+            if isinstance(books, Collection):
+                # Книги з генератора ніхто не тримає: не зберігаємо їх заради mark_clean
+                written = [(book, _snapshot(book)) for book in books]
+                self.uow.after_commit(lambda: [_mark_flushed(*item) for item in written])
+            logger.debug("Bulk added/updated books, count=%s", count)
+            return count
         except sqlite3.Error as e:
-            logger.error(f"Error adding book [{book.isbn}]: {e}")
+            self._rollback()
+            logger.error("Error bulk adding books after %s rows: %s", count, e)
+            return 0
+        except BaseException:
+            # Помилка джерела записів чи самих об'єктів: записані пачки не мають
+            # лишитися у відкритій транзакції, яку зафіксує наступний add()
+            self._rollback()
+            raise
 
     def get(self, isbn: str) -> Optional[Book]:
         try:
-            row = self.conn.execute(
-                "SELECT * FROM books WHERE isbn=?", (isbn,)
+            row = self._select(
+                _SELECT_BOOKS + " WHERE isbn=?", (isbn,)
             ).fetchone()
             if not row:
-                logger.debug(f"Book not found: {isbn}")
+                logger.debug("Book not found: %s", isbn)
                 return None
-            book = Book(
-                title=row["title"],
-                author=row["author"],
-                year=row["year"],
-                genre=row["genre"],
-                isbn=row["isbn"],
-            )
-            book.available = bool(row["available"])
-            book.issued_to = row["issued_to"]
-            book.issue_date = date.fromisoformat(row["issue_date"]) if row["issue_date"] else None
-            book.times_issued = row["times_issued"]
-            logger.debug(f"Fetched book: {isbn}")
+            book = _book_from_tuple(row)
+            logger.debug("Fetched book: %s", isbn)
             return book
         except sqlite3.Error as e:
-            logger.error(f"Error fetching book [{isbn}]: {e}")
+            logger.error("Error fetching book [%s]: %s", isbn, e)
             return None
 
     def update(self, book: Book) -> None:
-        # Оскільки add робить INSERT OR REPLACE, просто викликаємо add
-        self.add(book)
+        """
+        Часткове оновлення: UPDATE лише змінених колонок (book.dirty_fields),
+        без видалення й повторної вставки рядка. Якщо змін немає — нічого не робить;
+        якщо рядка ще немає (або змінено сам isbn) — звичайний add.
+        """
+        dirty = book.dirty_fields
+        if not dirty:
+            return
+        if "isbn" in dirty:
+            self.add(book)
+            return
+        fields = [f for f in Book.FIELDS if f in dirty]
+        assignments = ", ".join(f"{f}=?" for f in fields)
+        try:
+            cursor = self.conn.execute(
+                f"UPDATE books SET {assignments} WHERE isbn=?",
+                [_book_column(book, f) for f in fields] + [book.isbn],
+            )
+            if cursor.rowcount == 0:
+                self.conn.execute(_BOOK_UPSERT, _book_params(book))
+            self._commit()
+            written = _snapshot(book, fields)
+            self.uow.after_commit(lambda: _mark_flushed(book, written))
+            logger.debug("Updated book %s: %s", book.isbn, fields)
+        except sqlite3.Error as e:
+            self._rollback()
+            logger.error("Error updating book [%s]: %s", book.isbn, e)
 
     def delete(self, isbn: str) -> None:
         try:
             self.conn.execute("DELETE FROM books WHERE isbn=?", (isbn,))
-            self.conn.commit()
-            logger.debug(f"Deleted book: {isbn}")
+            self._commit()
+            logger.debug("Deleted book: %s", isbn)
         except sqlite3.Error as e:
-            logger.error(f"Error deleting book [{isbn}]: {e}")
+            self._rollback()
+            logger.error("Error deleting book [%s]: %s", isbn, e)
 
     def list_all(self) -> List[Book]:
         try:
-            rows = self.conn.execute("SELECT * FROM books").fetchall()
-            books: List[Book] = []
-            for row in rows:
-                book = Book(
-                    title=row["title"],
-                    author=row["author"],
-                    year=row["year"],
-                    genre=row["genre"],
-                    isbn=row["isbn"],
-                )
-                book.available = bool(row["available"])
-                book.issued_to = row["issued_to"]
-                book.issue_date = date.fromisoformat(row["issue_date"]) if row["issue_date"] else None
-                book.times_issued = row["times_issued"]
-                books.append(book)
-            logger.debug(f"Listed all books, count={len(books)}")
+            rows = self._select(_SELECT_BOOKS).fetchall()
+            books = list(map(_book_from_tuple, rows))
+            logger.debug("Listed all books, count=%s", len(books))
+            return books
+        except sqlite3.Error as e:
+            logger.error("Error listing books: %s", e)
+            return []
+
+    def iter_all(self, batch_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[Book]:
+        """
+        Потокове читання каталогу: рядки тягнуться пачками через fetchmany,
+        тож пам'ять не залежить від розміру таблиці
+        """
+        try:
+            cursor = self._select(_SELECT_BOOKS)
+            for rows in iter(lambda: cursor.fetchmany(batch_size), []):
+                for row in rows:
+                    yield _book_from_tuple(row)
+        except sqlite3.Error as e:
+            logger.error("Error iterating books: %s", e)
+
+    def column_batches(self, columns: Sequence[str], batch_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[List[tuple]]:
+        """
+        Обрані колонки всього каталогу одним запитом, пачками кортежів fetchmany
+        (без побудови об'єктів Book) — для колонкових знімків аналітики
+        """
+        unknown = [c for c in columns if c not in _BOOK_SEARCH_COLUMNS]
+        if unknown or not columns:
+            raise ValueError(f"Unknown book columns: {unknown or columns!r}")
+        try:
+            cursor = self._select(f"SELECT {', '.join(columns)} FROM books")
+            yield from iter(lambda: cursor.fetchmany(batch_size), [])
+        except sqlite3.Error as e:
+            logger.error("Error reading book columns %s: %s", list(columns), e)
+
+    def row_batches(self, batch_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[List[tuple]]:
+        """Сирі рядки каталогу (колонки EXPORT_COLUMNS) у порядку isbn, пачками — для експорту"""
+        try:
+            yield from self._batches(_SELECT_BOOKS + " ORDER BY isbn", batch_size)
+        except sqlite3.Error as e:
+            logger.error("Error exporting books: %s", e)
+
+    def page(self, after_key: Optional[str] = None, limit: int = 100) -> List[Book]:
+        """
+        Keyset-пагінація за isbn: наступна сторінка — page(after_key=<останній isbn>).
+        На відміну від OFFSET, вартість не росте з номером сторінки.
+        """
+        try:
+            if after_key is None:
+                rows = self._select(
+                    _SELECT_BOOKS + " ORDER BY isbn LIMIT ?", (limit,)
+                ).fetchall()
+            else:
+                rows = self._select(
+                    _SELECT_BOOKS + " WHERE isbn > ? ORDER BY isbn LIMIT ?", (after_key, limit)
+                ).fetchall()
+            return list(map(_book_from_tuple, rows))
+        except sqlite3.Error as e:
+            logger.error("Error paging books after [%s]: %s", after_key, e)
+            return []
+
+    def count(self) -> int:
+        try:
+            return self._scalar("SELECT books FROM library_totals WHERE id=1", "SELECT COUNT(*) FROM books")
+        except sqlite3.Error as e:
+            logger.error("Error counting books: %s", e)
+            return 0
+
+    def existing_keys(self, isbns: Iterable[str]) -> Set[str]:
+        try:
+            return self._existing("books", "isbn", isbns)
+        except sqlite3.Error as e:
+            logger.error("Error checking existing books: %s", e)
+            return set()
+
+    def count_available(self) -> int:
+        """Кількість доступних книг за O(1) з library_totals"""
+        try:
+            return self._scalar(
+                "SELECT available FROM library_totals WHERE id=1",
+                "SELECT COUNT(*) FROM books WHERE available=1",
+            )
+        except sqlite3.Error as e:
+            logger.error("Error counting available books: %s", e)
+            return 0
+
+    def genre_stats(self) -> Dict[str, dict]:
+        """
+        Книги, доступні й сумарні видачі за жанрами (книги без жанру — під ключем '').
+        Читається з genre_stats: один рядок на жанр, без перегляду каталогу.
+        """
+        if self._stats_available():
+            sql = "SELECT genre, books, available, times_issued FROM genre_stats WHERE books > 0 ORDER BY genre"
+        else:
+            sql = (
+                "SELECT IFNULL(genre, ''), COUNT(*), SUM(IFNULL(available, 0)), SUM(IFNULL(times_issued, 0)) "
+                "FROM books GROUP BY IFNULL(genre, '') ORDER BY 1"
+            )
+        try:
+            return {
+                genre: {"books": books, "available": available, "times_issued": times_issued}
+                for genre, books, available, times_issued in self._select(sql)
+            }
+        except sqlite3.Error as e:
+            logger.error("Error reading genre stats: %s", e)
+            return {}
+
+    def fetch_window(
+        self, offset: int, limit: int, order_by: Optional[str] = None, descending: bool = False
+    ) -> List[Book]:
+        """
+        Вікно каталогу для віртуалізованих списків GUI:
+        сортування (за будь-якою колонкою книги) і LIMIT/OFFSET виконуються в SQL.
+        Індекс сортування прибирає повне сортування, але OFFSET однаково проходить
+        усі пропущені рядки: вартість росте з глибиною прокрутки (O(offset); на 300 тис.
+        книг ~1.5 мс на початку і ~18 мс у кінці). Для послідовного обходу — page().
+        """
+        sql = _SELECT_BOOKS + _order_clause(order_by, descending, _BOOK_SEARCH_COLUMNS, "isbn")
+        try:
+            rows = self._select(sql + " LIMIT ? OFFSET ?", (limit, offset)).fetchall()
+            return list(map(_book_from_tuple, rows))
+        except sqlite3.Error as e:
+            logger.error("Error fetching books window [%s:%s] by %s: %s", offset, offset + limit, order_by, e)
+            return []
+
+    def search(self, criteria: dict, limit: Optional[int] = None, offset: int = 0) -> List[Book]:
+        """
+        Пошук книг з фільтрацією на боці SQL (див. _compile_book_criteria)
+        """
+        where, params = _compile_book_criteria(criteria)
+        sql = f"{_SELECT_BOOKS}{where} ORDER BY rowid"
+        if limit is not None or offset:
+            sql += " LIMIT ? OFFSET ?"
+            params += [-1 if limit is None else limit, offset]
+        try:
+            rows = self._select(sql, params).fetchall()
+            books = list(map(_book_from_tuple, rows))
+            logger.debug("Searched books %s, count=%s", sorted(criteria), len(books))
+            return books
+        except sqlite3.Error as e:
+            logger.error("Error searching books %s: %s", criteria, e)
+            return []
+
+    def full_text_search(self, query: str, limit: int = 50) -> List[Book]:
+        """
+        Ранжований повнотекстовий пошук за назвою, автором і жанром (FTS5, bm25).
+        Кожне слово запиту шукається як префікс. Якщо FTS5-індексу немає —
+        повільніший запасний варіант: кожне слово має входити в одне з полів.
+        """
+        terms = re.findall(r"\w+", query)
+        if not terms:
+            return []
+        try:
+            if self._fulltext_available():
+                rows = self._select(
+                    f"SELECT {_book_columns('books')} FROM books_fts JOIN books ON books.rowid = books_fts.rowid "
+                    "WHERE books_fts MATCH ? "
+                    "ORDER BY bm25(books_fts, 10.0, 5.0, 1.0) LIMIT ?",
+                    (_fts_query(terms), limit),
+                ).fetchall()
+            else:
+                clauses: List[str] = []
+                params: list = []
+                for term in terms:
+                    parts = [_contains_clause(col, term) for col in ("title", "author", "genre")]
+                    clauses.append("(" + " OR ".join(clause for clause, _ in parts) + ")")
+                    params.extend(param for _, param in parts)
+                rows = self._select(
+                    f"{_SELECT_BOOKS} WHERE {' AND '.join(clauses)} ORDER BY title LIMIT ?",
+                    params + [limit],
+                ).fetchall()
+            books = list(map(_book_from_tuple, rows))
+            logger.debug("Full-text search %r, count=%s", query, len(books))
             return books
         except sqlite3.Error as e:
-            logger.error(f"Error listing books: {e}")
+            logger.error("Error in full-text search %r: %s", query, e)
             return []
 
+    def _fulltext_available(self) -> bool:
+        if self._has_fts is None:
+            self._has_fts = self.conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type='table' AND name='books_fts'"
+            ).fetchone() is not None
+        return self._has_fts
+
 
-class SQLiteUserRepository(IUserRepository):
-    def __init__(self, conn: sqlite3.Connection):
-        self.conn = conn
+@instrumented("users")
+class SQLiteUserRepository(_SQLiteRepository, IUserRepository):
+    EXPORT_COLUMNS = User.FIELDS
 
     def add(self, user: User) -> None:
         try:
-            self.conn.execute(
-                "INSERT OR REPLACE INTO users (user_id, first_name, last_name, email) "
-                "VALUES (?, ?, ?, ?)",
-                (user.user_id, user.first_name, user.last_name, user.email),
-            )
-            self.conn.commit()
-            logger.debug(f"Added/Updated user: {user.user_id}")
+            self.conn.execute(_USER_UPSERT, _user_params(user))
+            self._commit()
+            logger.debug("Added/Updated user: %s", user.user_id)
+        except sqlite3.Error as e:
+            self._rollback()
+            logger.error("Error adding user [%s]: %s", user.user_id, e)
+
+    def add_many(self, users: Iterable[User], chunk_size: int = DEFAULT_CHUNK_SIZE) -> int:
+        """
+        Масова вставка користувачів однією транзакцією (див. SQLiteBookRepository.add_many)
+        """
+        count = 0
+        try:
+            for chunk in _chunked(users, chunk_size):
+                self.conn.executemany(_USER_UPSERT, [_user_params(u) for u in chunk])
+                count += len(chunk)
+            self._commit()
+            logger.debug("Bulk added/updated users, count=%s", count)
+            return count
         except sqlite3.Error as e:
-            logger.error(f"Error adding user [{user.user_id}]: {e}")
+            self._rollback()
+            logger.error("Error bulk adding users after %s rows: %s", count, e)
+            return 0
+        except BaseException:
+            self._rollback()
+            raise
 
     def get(self, user_id: str) -> Optional[User]:
         try:
-            row = self.conn.execute(
-                "SELECT * FROM users WHERE user_id=?", (user_id,)
+            row = self._select(
+                _SELECT_USERS + " WHERE user_id=?", (user_id,)
             ).fetchone()
             if not row:
-                logger.debug(f"User not found: {user_id}")
+                logger.debug("User not found: %s", user_id)
                 return None
-            user = User(
-                user_id=row["user_id"],
-                first_name=row["first_name"],
-                last_name=row["last_name"],
-                email=row["email"],
-            )
-            logger.debug(f"Fetched user: {user_id}")
+            user = _user_from_tuple(row)
+            logger.debug("Fetched user: %s", user_id)
             return user
         except sqlite3.Error as e:
-            logger.error(f"Error fetching user [{user_id}]: {e}")
+            logger.error("Error fetching user [%s]: %s", user_id, e)
             return None
 
     def list_all(self) -> List[User]:
         try:
-            rows = self.conn.execute("SELECT * FROM users").fetchall()
-            users = [
-                User(
-                    user_id=row["user_id"],
-                    first_name=row["first_name"],
-                    last_name=row["last_name"],
-                    email=row["email"],
-                )
-                for row in rows
-            ]
-            logger.debug(f"Listed all users, count={len(users)}")
+            rows = self._select(_SELECT_USERS).fetchall()
+            users = list(map(_user_from_tuple, rows))
+            logger.debug("Listed all users, count=%s", len(users))
             return users
         except sqlite3.Error as e:
-            logger.error(f"Error listing users: {e}")
+            logger.error("Error listing users: %s", e)
+            return []
+
+    def iter_all(self, batch_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[User]:
+        """Потокове читання користувачів пачками fetchmany"""
+        try:
+            cursor = self._select(_SELECT_USERS)
+            for rows in iter(lambda: cursor.fetchmany(batch_size), []):
+                for row in rows:
+                    yield _user_from_tuple(row)
+        except sqlite3.Error as e:
+            logger.error("Error iterating users: %s", e)
+
+    def row_batches(self, batch_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[List[tuple]]:
+        """Сирі рядки користувачів у порядку user_id, пачками (див. SQLiteBookRepository.row_batches)"""
+        try:
+            yield from self._batches(_SELECT_USERS + " ORDER BY user_id", batch_size)
+        except sqlite3.Error as e:
+            logger.error("Error exporting users: %s", e)
+
+    def page(self, after_key: Optional[str] = None, limit: int = 100) -> List[User]:
+        """Keyset-пагінація за user_id (див. SQLiteBookRepository.page)"""
+        try:
+            if after_key is None:
+                rows = self._select(
+                    _SELECT_USERS + " ORDER BY user_id LIMIT ?", (limit,)
+                ).fetchall()
+            else:
+                rows = self._select(
+                    _SELECT_USERS + " WHERE user_id > ? ORDER BY user_id LIMIT ?", (after_key, limit)
+                ).fetchall()
+            return list(map(_user_from_tuple, rows))
+        except sqlite3.Error as e:
+            logger.error("Error paging users after [%s]: %s", after_key, e)
             return []
 
+    def existing_keys(self, user_ids: Iterable[str]) -> Set[str]:
+        try:
+            return self._existing("users", "user_id", user_ids)
+        except sqlite3.Error as e:
+            logger.error("Error checking existing users: %s", e)
+            return set()
 
-class SQLiteLoanRepository(ILoanRepository):
-    def __init__(self, conn: sqlite3.Connection):
-        self.conn = conn
+    def count(self) -> int:
+        try:
+            return self.conn.execute("SELECT COUNT(*) FROM users").fetchone()[0]
+        except sqlite3.Error as e:
+            logger.error("Error counting users: %s", e)
+            return 0
 
-    def issue(self, isbn: str, user_id: str, date: str) -> None:
+    def fetch_window(
+        self, offset: int, limit: int, order_by: Optional[str] = None, descending: bool = False
+    ) -> List[User]:
+        """
+        Вікно користувачів із сортуванням у SQL; як і для книг,
+        вартість O(offset) (див. SQLiteBookRepository.fetch_window)
+        """
+        sql = _SELECT_USERS + _order_clause(order_by, descending, _USER_SORT_COLUMNS, "user_id")
         try:
+            rows = self._select(sql + " LIMIT ? OFFSET ?", (limit, offset)).fetchall()
+            return list(map(_user_from_tuple, rows))
+        except sqlite3.Error as e:
+            logger.error("Error fetching users window [%s:%s] by %s: %s", offset, offset + limit, order_by, e)
+            return []
+
+
+@instrumented("loans")
+class SQLiteLoanRepository(_SQLiteRepository, ILoanRepository):
+    EXPORT_COLUMNS = ("user_id", "isbn")
+
+    def issue(self, isbn: str, user_id: str, date: str) -> bool:
+        """
+        Атомарна видача: книга позначається виданою одним умовним UPDATE —
+        лише якщо вона доступна і читач існує, — тож два клієнти не можуть
+        видати один примірник. Разом із записом видачі збільшується times_issued.
+        Повертає True, якщо книгу видано.
+        """
+        try:
+            cursor = self.conn.execute(
+                "UPDATE books SET available=0, issued_to=?, issue_date=?, "
+                "times_issued=COALESCE(times_issued, 0) + 1 "
+                "WHERE isbn=? AND available=1 "
+                "AND EXISTS (SELECT 1 FROM users WHERE user_id=?)",
+                (user_id, date, isbn, user_id),
+            )
+            if cursor.rowcount != 1:
+                self._commit()
+                logger.debug("Book %s not issued to %s: unavailable or unknown user", isbn, user_id)
+                return False
             self.conn.execute(
                 "INSERT INTO issued_books (user_id, isbn) VALUES (?, ?)",
                 (user_id, isbn),
             )
-            self.conn.execute(
-                "UPDATE books SET available=0, issued_to=?, issue_date=? WHERE isbn=?",
-                (user_id, date, isbn),
-            )
-            self.conn.commit()
-            logger.debug(f"Issued book {isbn} to user {user_id}")
+            self._commit()
+            logger.debug("Issued book %s to user %s", isbn, user_id)
+            return True
         except sqlite3.Error as e:
-            logger.error(f"Error issuing book [{isbn}] to [{user_id}]: {e}")
+            self._rollback()
+            logger.error("Error issuing book [%s] to [%s]: %s", isbn, user_id, e)
+            return False
 
-    def return_book(self, isbn: str, user_id: str) -> None:
+    def return_book(self, isbn: str, user_id: str) -> bool:
+        """Повертає True, якщо ця книга справді була видана цьому читачеві"""
         try:
-            self.conn.execute(
+            cursor = self.conn.execute(
                 "DELETE FROM issued_books WHERE user_id=? AND isbn=?",
                 (user_id, isbn),
             )
+            if cursor.rowcount == 0:
+                self._commit()
+                logger.debug("Book %s is not issued to user %s", isbn, user_id)
+                return False
             self.conn.execute(
                 "UPDATE books SET available=1, issued_to=NULL, issue_date=NULL WHERE isbn=?",
                 (isbn,),
             )
-            self.conn.commit()
-            logger.debug(f"Returned book {isbn} from user {user_id}")
+            self._commit()
+            logger.debug("Returned book %s from user %s", isbn, user_id)
+            return True
+        except sqlite3.Error as e:
+            self._rollback()
+            logger.error("Error returning book [%s] from [%s]: %s", isbn, user_id, e)
+            return False
+
+    def list_overdue(self, cutoff_date, limit: Optional[int] = None) -> List[Book]:
+        """
+        Видані книги з issue_date раніше за cutoff_date — одним запитом
+        по індексу issue_date, з повністю заповненими об'єктами Book
+        """
+        sql = (
+            f"SELECT {_book_columns('b')} FROM books b "
+            "WHERE b.issue_date < ? "
+            "AND EXISTS (SELECT 1 FROM issued_books l WHERE l.isbn = b.isbn) "
+            "ORDER BY b.issue_date"
+        )
+        params = [_sql_value(cutoff_date)]
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        try:
+            rows = self._select(sql, params).fetchall()
+            books = list(map(_book_from_tuple, rows))
+            logger.debug("Listed overdue books before %s, count=%s", cutoff_date, len(books))
+            return books
+        except sqlite3.Error as e:
+            logger.error("Error listing overdue books: %s", e)
+            return []
+
+    def active_loans(self, user_id: str) -> int:
+        """Кількість книг на руках у читача (user_loan_stats, без перегляду issued_books)"""
+        try:
+            return self._scalar(
+                "SELECT active_loans FROM user_loan_stats WHERE user_id=?",
+                "SELECT COUNT(*) FROM issued_books WHERE user_id=?",
+                (user_id,),
+            )
         except sqlite3.Error as e:
-            logger.error(f"Error returning book [{isbn}] from [{user_id}]: {e}")
+            logger.error("Error counting loans of [%s]: %s", user_id, e)
+            return 0
+
+    def count_active(self) -> int:
+        """Усього виданих зараз книг"""
+        try:
+            return self._scalar(
+                "SELECT active_loans FROM library_totals WHERE id=1",
+                "SELECT COUNT(*) FROM issued_books",
+            )
+        except sqlite3.Error as e:
+            logger.error("Error counting active loans: %s", e)
+            return 0
 
     def list_issued(self) -> List[str]:
         try:
-            rows = self.conn.execute("SELECT isbn FROM issued_books").fetchall()
-            isbns = [row["isbn"] for row in rows]
-            logger.debug(f"Listed issued books, count={len(isbns)}")
+            isbns = [row[0] for row in self._select("SELECT isbn FROM issued_books")]
+            logger.debug("Listed issued books, count=%s", len(isbns))
             return isbns
         except sqlite3.Error as e:
-            logger.error(f"Error listing issued books: {e}")
-            return []
\ No newline at end of file
+            logger.error("Error listing issued books: %s", e)
+            return []
+
+    def row_batches(self, batch_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[List[tuple]]:
+        """Записи видач (user_id, isbn) у порядку видачі, пачками"""
+        try:
+            yield from self._batches("SELECT user_id, isbn FROM issued_books ORDER BY rowid", batch_size)
+        except sqlite3.Error as e:
+            logger.error("Error exporting issued books: %s", e)
@@ -0,0 +1,143 @@
+"""
+Колонковий знімок каталогу для звітів про обіг книг.
+Потребує numpy (необов'язкова залежність: імпортується лише тут).
+"""
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Колонки знімка в порядку запиту
+_COLUMNS = ("genre", "author", "year", "available", "times_issued")
+# Категоріальні колонки: у знімку — коди int32 і список підписів
+CATEGORICAL = ("genre", "author", "year")
+DEFAULT_BATCH_SIZE = 10_000
+DEFAULT_PERCENTILES = (50, 90, 99)
+
+
+def _label_key(label) -> tuple:
+    # Як у SQLite: NULL перед будь-яким значенням
+    return label is not None, label
+
+
+class CirculationSnapshot:
+    """
+    Каталог у вигляді масивів NumPy: коди жанру/автора/року, доступність,
+    кількість видач. Групування, перцентилі й top-N рахуються векторно,
+    без об'єктів Book і циклів по рядках.
+    """
+    def __init__(self, codes: Dict[str, np.ndarray], labels: Dict[str, list],
+                 available: np.ndarray, times_issued: np.ndarray):
+        self.codes = codes
+        self.labels = labels
+        self.available = available
+        self.times_issued = times_issued
+
+    @classmethod
+    def load(cls, books, batch_size: int = DEFAULT_BATCH_SIZE) -> "CirculationSnapshot":
+        """Знімок з репозиторію книг: один потоковий запит books.column_batches"""
+        return cls.from_batches(books.column_batches(_COLUMNS, batch_size))
+
+    @classmethod
+    def from_batches(cls, batches: Iterable[List[tuple]]) -> "CirculationSnapshot":
+        """batches — пачки кортежів (genre, author, year, available, times_issued)"""
+        index: Dict[str, dict] = {name: {} for name in CATEGORICAL}
+        parts: Dict[str, list] = {name: [] for name in _COLUMNS}
+        for batch in batches:
+            genres, authors, years, available, times_issued = zip(*batch)
+            for name, values in (("genre", genres), ("author", authors), ("year", years)):
+                codes = index[name]
+                parts[name].append(np.fromiter(
+                    (codes.setdefault(v, len(codes)) for v in values), dtype=np.int32, count=len(values)
+                ))
+            parts["available"].append(np.fromiter(available, dtype=bool, count=len(available)))
+            parts["times_issued"].append(np.fromiter(
+                (t or 0 for t in times_issued), dtype=np.int64, count=len(times_issued)
+            ))
+
+        def column(name, dtype):
+            return np.concatenate(parts[name]) if parts[name] else np.empty(0, dtype=dtype)
+
+        return cls(
+            codes={name: column(name, np.int32) for name in CATEGORICAL},
+            labels={name: list(index[name]) for name in CATEGORICAL},
+            available=column("available", bool),
+            times_issued=column("times_issued", np.int64),
+        )
+
+    def __len__(self) -> int:
+        return len(self.available)
+
+    def _codes(self, column: str) -> np.ndarray:
+        if column not in self.codes:
+            raise ValueError(f"Unknown group column {column!r}, expected one of {CATEGORICAL}")
+        return self.codes[column]
+
+    def _grouped(self, column: str, weights: Optional[np.ndarray]) -> np.ndarray:
+        return np.bincount(self._codes(column), weights=weights, minlength=len(self.labels[column]))
+
+    def count_by(self, column: str) -> Dict[object, int]:
+        """Кількість книг у кожній групі (підписи впорядковані)"""
+        return self._as_dict(column, self._grouped(column, None))
+
+    def issues_by(self, column: str) -> Dict[object, int]:
+        """Сумарна кількість видач у кожній групі"""
+        return self._as_dict(column, self._grouped(column, self.times_issued))
+
+    def available_by(self, column: str) -> Dict[object, int]:
+        """Кількість доступних (не виданих) книг у кожній групі"""
+        return self._as_dict(column, self._grouped(column, self.available))
+
+    def top(self, column: str, n: int = 10, by: str = "issues") -> List[Tuple[object, int]]:
+        """n груп з найбільшою кількістю видач (by='issues') або книг (by='count')"""
+        if by not in ("issues", "count"):
+            raise ValueError(f"Unknown top metric {by!r}, expected 'issues' or 'count'")
+        totals = self._grouped(column, self.times_issued if by == "issues" else None)
+        n = min(n, len(totals))
+        if n <= 0:
+            return []
+        # argpartition — O(груп), сортуються лише n відібраних
+        chosen = np.argpartition(-totals, n - 1)[:n]
+        chosen = chosen[np.lexsort((chosen, -totals[chosen]))]
+        labels = self.labels[column]
+        return [(labels[i], int(totals[i])) for i in chosen]
+
+    def availability_ratio(self) -> float:
+        return float(self.available.mean()) if len(self) else 0.0
+
+    def percentiles(self, q: Sequence[float] = DEFAULT_PERCENTILES) -> Dict[str, float]:
+        """Перцентилі кількості видач на книгу"""
+        if not len(self):
+            return {f"p{p:g}": 0.0 for p in q}
+        values = np.percentile(self.times_issued, q)
+        return {f"p{p:g}": float(v) for p, v in zip(q, values)}
+
+    def times_issued_histogram(self) -> Dict[int, int]:
+        """Скільки книг видавались рівно k разів"""
+        counts = np.bincount(self.times_issued) if len(self) else np.empty(0, dtype=np.int64)
+        return {k: int(c) for k, c in enumerate(counts) if c}
+
+    def report(self, top_n: int = 10, q: Sequence[float] = DEFAULT_PERCENTILES) -> dict:
+        """Місячний звіт про обіг: один прохід по знімку на кожен показник"""
+        issues = self.times_issued
+        return {
+            "books": len(self),
+            "available": int(self.available.sum()),
+            "availability_ratio": self.availability_ratio(),
+            "total_issues": int(issues.sum()),
+            "books_by_genre": self.count_by("genre"),
+            "issues_by_genre": self.issues_by("genre"),
+            "issues_by_year": self.issues_by("year"),
+            "times_issued": {
+                "mean": float(issues.mean()) if len(self) else 0.0,
+                "max": int(issues.max()) if len(self) else 0,
+                **self.percentiles(q),
+                "histogram": self.times_issued_histogram(),
+            },
+            "top_authors": self.top("author", top_n),
+            "top_genres": self.top("genre", top_n),
+        }
+
+    def _as_dict(self, column: str, totals: np.ndarray) -> Dict[object, int]:
+        labels = self.labels[column]
+        order = sorted(range(len(labels)), key=lambda i: _label_key(labels[i]))
+        return {labels[i]: int(totals[i]) for i in order}
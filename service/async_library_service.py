@@ -0,0 +1,99 @@
+import asyncio
+from typing import Iterable, List, Optional
+
+from library.book import Book
+from library.user import User
+from repository.async_sqlite_repository import (
+    AsyncBookRepository, AsyncUserRepository, AsyncLoanRepository,
+    SQLiteExecutor, DEFAULT_READ_WORKERS,
+)
+from service.library_service import LibraryService, Observer
+
+
+class _LoopObserver:
+    """Переносить виклики update спостерігача з потоку сховища в цикл подій"""
+    def __init__(self, observer: Observer, loop: asyncio.AbstractEventLoop):
+        self._observer = observer
+        self._loop = loop
+
+    def update(self, event: str, data: dict):
+        self._loop.call_soon_threadsafe(self._observer.update, event, data)
+
+
+class AsyncLibraryService:
+    """
+    Асинхронний фасад над LibraryService для asyncio-процесів (кіоск, API).
+    Бізнес-логіка та транзакції ті самі: операція цілком виконується
+    синхронним сервісом у потоці SQLiteExecutor — читання паралельно,
+    записи послідовно, тож цикл подій ніколи не блокується на запитах.
+    """
+    def __init__(self, service: LibraryService, executor: SQLiteExecutor):
+        self.service = service
+        self._executor = executor
+        self.books = AsyncBookRepository(service.books, executor)
+        self.users = AsyncUserRepository(service.users, executor)
+        self.loans = AsyncLoanRepository(service.loans, executor)
+
+    @classmethod
+    def from_bundle(cls, bundle, read_workers: Optional[int] = None) -> "AsyncLibraryService":
+        if read_workers is None:
+            # Кожному потоку читання — своє з'єднання; залишаємо місце записувачу і викликачу
+            pool = getattr(bundle, "pool", None)
+            read_workers = max(1, pool.pool_size - 2) if pool is not None else DEFAULT_READ_WORKERS
+        return cls(LibraryService.from_bundle(bundle), SQLiteExecutor(read_workers))
+
+    def register_observer(self, observer: Observer):
+        """Спостерігач отримує події в потоці поточного циклу подій"""
+        self.service.register_observer(_LoopObserver(observer, asyncio.get_running_loop()))
+
+    async def add_book(self, book: Book):
+        return await self._executor.write(self.service.add_book, book)
+
+    async def add_books(self, books: Iterable[Book], chunk_size: int = 500) -> int:
+        return await self._executor.write(self.service.add_books, books, chunk_size)
+
+    async def update_book(self, book: Book):
+        return await self._executor.write(self.service.update_book, book)
+
+    async def remove_book(self, isbn: str):
+        return await self._executor.write(self.service.remove_book, isbn)
+
+    async def register_user(self, user: User):
+        return await self._executor.write(self.service.register_user, user)
+
+    async def register_users(self, users: Iterable[User], chunk_size: int = 500) -> int:
+        return await self._executor.write(self.service.register_users, users, chunk_size)
+
+    async def issue_book(self, isbn: str, user_id: str) -> bool:
+        return await self._executor.write(self.service.issue_book, isbn, user_id)
+
+    async def return_book(self, isbn: str, user_id: str) -> bool:
+        return await self._executor.write(self.service.return_book, isbn, user_id)
+
+    async def search_books(self, *, limit: Optional[int] = None, offset: int = 0, **criteria) -> List[Book]:
+        return await self._executor.read(self.service.search_books, limit=limit, offset=offset, **criteria)
+
+    async def full_text_search(self, query: str, limit: int = 50) -> List[Book]:
+        return await self._executor.read(self.service.full_text_search, query, limit)
+
+    async def list_overdue(self, max_days: int = 30, limit: Optional[int] = None) -> List[Book]:
+        return await self._executor.read(self.service.list_overdue, max_days, limit)
+
+    async def library_stats(self) -> dict:
+        return await self._executor.read(self.service.library_stats)
+
+    async def circulation_report(self, top_n: int = 10) -> dict:
+        return await self._executor.read(self.service.circulation_report, top_n)
+
+    async def export(self, kind: str, fmt: Optional[str], out) -> int:
+        return await self._executor.read(self.service.export, kind, fmt, out)
+
+    def close(self) -> None:
+        """Зупиняє потоки виконавця (бандл і пул закриває їх власник)"""
+        self._executor.shutdown()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await asyncio.get_running_loop().run_in_executor(None, self.close)
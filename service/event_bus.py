@@ -0,0 +1,297 @@
+import heapq
+import itertools
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Protocol
+
+from repository.connection_pool import release_thread_connections
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_EVENT_WORKERS = 2
+# Вікно накопичення подій для одного спостерігача (секунди)
+DEFAULT_COALESCE_WINDOW = 0.05
+# Скільки останніх затримок доставки зберігати для перцентилів
+LATENCY_SAMPLES = 1024
+
+
+class Observer(Protocol):
+    def update(self, event: str, data: dict): ...
+
+
+def _observer_name(observer) -> str:
+    return f"{type(observer).__name__}@{id(observer):x}"
+
+
+def _freeze(value):
+    """Хешоване представлення даних події (для відкидання дублікатів)"""
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def coalesce(batch: list) -> list:
+    """
+    Групує послідовні події одного типу: [(event, [data, ...]), ...].
+    Порядок різних типів зберігається; однакові дані в межах групи — один раз.
+    batch — список (event, data, published_at); у групах — пари (data, published_at).
+    """
+    groups: list = []
+    seen: set = set()
+    for event, data, published in batch:
+        if not groups or groups[-1][0] != event:
+            groups.append((event, []))
+            seen = set()
+        try:
+            key = _freeze(data)
+            if key in seen:
+                continue
+            seen.add(key)
+        except TypeError:
+            pass
+        groups[-1][1].append((data, published))
+    return groups
+
+
+class _Subscription:
+    """Спостерігач із власною чергою подій і метриками доставки"""
+    def __init__(self, observer):
+        self.observer = observer
+        self.name = _observer_name(observer)
+        self.queue: deque = deque()
+        self.lock = threading.Lock()
+        self.scheduled = False
+        self.published = 0
+        self.delivered = 0
+        self.coalesced = 0
+        self.batches = 0
+        self.errors = 0
+        self.latencies: deque = deque(maxlen=LATENCY_SAMPLES)
+        self.max_latency = 0.0
+
+    def deliver(self, batch: list) -> None:
+        """
+        Викликає спостерігача; помилки логуються й не виходять за межі підписки.
+        Лічильники оновлюються під lock (не під час виклику спостерігача):
+        синхронна шина може доставляти одній підписці з кількох потоків.
+        """
+        observer = self.observer
+        # Пакетний метод шукаємо на класі: так його не «знайде» динамічний проксі
+        batched = getattr(type(observer), "update_many", None) is not None
+        groups = coalesce(batch)
+        with self.lock:
+            self.coalesced += len(batch) - sum(len(items) for _, items in groups)
+        for event, items in groups:
+            failed = False
+            try:
+                if batched:
+                    observer.update_many(event, [data for data, _ in items])
+                else:
+                    for data, _ in items:
+                        observer.update(event, data)
+            except Exception:
+                failed = True
+                logger.exception("Observer %s failed on %r", self.name, event)
+            now = time.monotonic()
+            with self.lock:
+                for _, published in items:
+                    latency = now - published
+                    self.latencies.append(latency)
+                    self.max_latency = max(self.max_latency, latency)
+                self.errors += failed
+                self.delivered += len(items)
+                self.batches += 1
+
+    def stats(self) -> dict:
+        with self.lock:
+            samples = sorted(self.latencies)
+
+        def percentile(q):
+            return samples[min(len(samples) - 1, int(q * len(samples)))] * 1000 if samples else 0.0
+
+        return {
+            "published": self.published,
+            "delivered": self.delivered,
+            "coalesced": self.coalesced,
+            "batches": self.batches,
+            "errors": self.errors,
+            "queued": len(self.queue),
+            "latency_ms": {
+                "avg": sum(samples) / len(samples) * 1000 if samples else 0.0,
+                "p50": percentile(0.5),
+                "p95": percentile(0.95),
+                "max": self.max_latency * 1000,
+            },
+        }
+
+
+class SyncEventBus:
+    """
+    Доставка подій одразу в потоці, що їх опублікував (поведінка за замовчуванням).
+    Помилка одного спостерігача не перериває операцію сервісу й інших спостерігачів.
+    Публікувати можна з кількох потоків: лічильники підписок захищені їхнім lock.
+    """
+    def __init__(self):
+        self._subscriptions: List[_Subscription] = []
+
+    def subscribe(self, observer: Observer) -> None:
+        self._subscriptions.append(_Subscription(observer))
+
+    def unsubscribe(self, observer: Observer) -> None:
+        self._subscriptions = [s for s in self._subscriptions if s.observer is not observer]
+
+    def publish(self, event: str, data: dict) -> None:
+        published = time.monotonic()
+        for sub in list(self._subscriptions):
+            with sub.lock:
+                sub.published += 1
+            sub.deliver([(event, data, published)])
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        return True
+
+    def stats(self) -> dict:
+        return {s.name: s.stats() for s in self._subscriptions}
+
+    def close(self) -> None:
+        pass
+
+
+class AsyncEventBus:
+    """
+    Асинхронна доставка: у кожного спостерігача своя черга, яку розбирає пул потоків.
+    Події, що надійшли протягом coalesce_window від першої в черзі, доставляються
+    разом: послідовні події одного типу групуються (дублікати відкидаються) і,
+    якщо спостерігач має update_many(event, items), передаються одним викликом.
+    Один спостерігач обробляється не більше ніж одним потоком одночасно,
+    тож порядок подій для нього зберігається. publish() не чекає на спостерігачів.
+    """
+    def __init__(self, max_workers: int = DEFAULT_EVENT_WORKERS,
+                 coalesce_window: float = DEFAULT_COALESCE_WINDOW):
+        self.coalesce_window = coalesce_window
+        self._subscriptions: List[_Subscription] = []
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="event-bus")
+        self._cond = threading.Condition()
+        self._timers: list = []
+        self._seq = itertools.count()
+        self._closed = False
+        self._scheduler = threading.Thread(target=self._run_scheduler, name="event-bus-timer", daemon=True)
+        self._scheduler.start()
+
+    def subscribe(self, observer: Observer) -> None:
+        with self._cond:
+            self._subscriptions = self._subscriptions + [_Subscription(observer)]
+
+    def unsubscribe(self, observer: Observer) -> None:
+        with self._cond:
+            self._subscriptions = [s for s in self._subscriptions if s.observer is not observer]
+
+    def publish(self, event: str, data: dict) -> None:
+        if self._closed:
+            logger.warning("Event %r published after event bus was closed", event)
+            return
+        published = time.monotonic()
+        for sub in self._subscriptions:
+            with sub.lock:
+                sub.queue.append((event, data, published))
+                sub.published += 1
+                if sub.scheduled:
+                    continue
+                sub.scheduled = True
+            self._schedule(sub, published + self.coalesce_window)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Чекає, доки всі черги спорожніють; False — якщо не встигли за timeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while any(s.scheduled for s in self._subscriptions):
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def stats(self) -> dict:
+        """Метрики доставки для кожного спостерігача (лічильники й затримка publish → update)"""
+        return {s.name: s.stats() for s in self._subscriptions}
+
+    def close(self, timeout: Optional[float] = 5.0) -> None:
+        """Доставляє події, що лишилися в чергах, і зупиняє потоки"""
+        self.flush(timeout)
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._scheduler.join(timeout)
+        self._executor.shutdown(wait=True)
+
+    def _schedule(self, sub: _Subscription, due: float) -> None:
+        if self.coalesce_window <= 0:
+            self._executor.submit(self._drain, sub)
+            return
+        with self._cond:
+            heapq.heappush(self._timers, (due, next(self._seq), sub))
+            self._cond.notify_all()
+
+    def _run_scheduler(self) -> None:
+        with self._cond:
+            while not self._closed:
+                now = time.monotonic()
+                while self._timers and self._timers[0][0] <= now:
+                    _, _, sub = heapq.heappop(self._timers)
+                    self._executor.submit(self._drain, sub)
+                timeout = self._timers[0][0] - now if self._timers else None
+                self._cond.wait(timeout)
+            # Під час закриття відкладені пачки доставляються одразу
+            while self._timers:
+                _, _, sub = heapq.heappop(self._timers)
+                self._executor.submit(self._drain, sub)
+
+    def _drain(self, sub: _Subscription) -> None:
+        with sub.lock:
+            batch = list(sub.queue)
+            sub.queue.clear()
+        try:
+            sub.deliver(batch)
+        finally:
+            # Спостерігачі можуть читати сховище: потік пулу не тримає з'єднання між пачками
+            release_thread_connections()
+            with sub.lock:
+                if sub.queue:
+                    # Нові події, що прийшли під час доставки, — наступною пачкою
+                    due = sub.queue[0][2] + self.coalesce_window
+                else:
+                    sub.scheduled = False
+                    due = None
+            if due is not None:
+                self._schedule(sub, due)
+            with self._cond:
+                self._cond.notify_all()
+
+
+def create_event_bus(mode: Optional[str] = None, workers: Optional[int] = None,
+                     coalesce_ms: Optional[float] = None):
+    """Шина за назвою режиму: 'sync' (за замовчуванням) або 'async'"""
+    mode = (mode or "sync").lower()
+    if mode == "sync":
+        return SyncEventBus()
+    if mode == "async":
+        return AsyncEventBus(
+            max_workers=workers or DEFAULT_EVENT_WORKERS,
+            coalesce_window=DEFAULT_COALESCE_WINDOW if coalesce_ms is None else coalesce_ms / 1000,
+        )
+    raise ValueError(f"Unknown event bus mode {mode!r}, expected 'sync' or 'async'")
+
+
+def event_bus_resource(mode: Optional[str] = None, workers: Optional[int] = None,
+                       coalesce_ms: Optional[float] = None):
+    """Ресурс для DI-контейнера: шина закривається через container.shutdown_resources()"""
+    bus = create_event_bus(mode, workers, coalesce_ms)
+    try:
+        yield bus
+    finally:
+        bus.close()
@@ -1,72 +1,203 @@
-from typing import List, Protocol
+from contextlib import contextmanager, nullcontext
+from typing import Iterable, List, Optional
 from library.book import Book
 from library.user import User
+from metrics import instrumented
+from service.event_bus import Observer, SyncEventBus
 import datetime
+import threading
 
-class Observer(Protocol):
-    def update(self, event: str, data: dict): ...
-
+@instrumented("service", exclude=("register_observer", "notify_observers", "transaction", "snapshot"))
 class LibraryService:
-    def __init__(self, books, users, loans):
+    def __init__(self, books, users, loans, uow=None, event_bus=None):
         self.books = books
         self.users = users
         self.loans = loans
-        self._observers: List[Observer] = []
+        self.uow = uow
+        # Шина подій: за замовчуванням синхронна, AsyncEventBus — доставка у фоні
+        self.events = event_bus or SyncEventBus()
+        # Події, відкладені до фіксації транзакції (окремо для кожного потоку)
+        self._tx_state = threading.local()
+
+    @classmethod
+    def from_bundle(cls, bundle, event_bus=None) -> "LibraryService":
+        """Сервіс над репозиторіями одного бандла зі спільною одиницею роботи"""
+        return cls(
+            books=bundle.book_repo,
+            users=bundle.user_repo,
+            loans=bundle.loan_repo,
+            uow=bundle.uow,
+            event_bus=event_bus,
+        )
 
     def register_observer(self, observer: Observer):
         """Реєстрація спостерігача для подій"""
-        self._observers.append(observer)
+        self.events.subscribe(observer)
 
     def notify_observers(self, event: str, data: dict):
-        """Оповіщення зареєстрованих спостерігачів"""
-        for obs in self._observers:
-            obs.update(event, data)
+        """Оповіщення зареєстрованих спостерігачів (після фіксації поточної транзакції)"""
+        pending = getattr(self._tx_state, 'events', None)
+        if pending is not None:
+            pending.append((event, data))
+            return
+        self.events.publish(event, data)
+
+    @contextmanager
+    def transaction(self):
+        """
+        Виконує кілька операцій як одну транзакцію сховища: один commit наприкінці.
+        Події спостерігачам надсилаються лише після успішного завершення; якщо сховище
+        відкотило транзакцію, події відкидаються, а виняток (TransactionRolledBack
+        чи помилка commit) передається викликачу.
+        """
+        outermost = getattr(self._tx_state, 'events', None) is None
+        if outermost:
+            self._tx_state.events = []
+        try:
+            with self.uow.transaction() if self.uow else nullcontext():
+                yield self
+        except BaseException:
+            if outermost:
+                self._tx_state.events = None
+            raise
+        if outermost:
+            events, self._tx_state.events = self._tx_state.events, None
+            for event, data in events:
+                self.notify_observers(event, data)
 
     def add_book(self, book: Book):
-        self.books.add(book)
-        self.notify_observers('book_added', {'isbn': book.isbn})
+        with self.transaction():
+            self.books.add(book)
+            self.notify_observers('book_added', {'isbn': book.isbn})
+
+    def add_books(self, books: Iterable[Book], chunk_size: int = 500) -> int:
+        """
+        Масове додавання книг однією транзакцією.
+        Спостерігачі отримують одну агреговану подію 'books_added' на всю пачку.
+        """
+        isbns: List[str] = []
+
+        def collect():
+            for book in books:
+                isbns.append(book.isbn)
+                yield book
+
+        with self.transaction():
+            count = self.books.add_many(collect(), chunk_size=chunk_size)
+            if count:
+                self.notify_observers('books_added', {'isbns': isbns, 'count': count})
+        return count
+
+    def update_book(self, book: Book) -> None:
+        """
+        Зберігає лише змінені поля книги; подія 'book_updated' містить їхній перелік.
+        Якщо нічого не змінено — ні запису, ні події.
+        """
+        fields = sorted(book.dirty_fields)
+        if not fields:
+            return
+        with self.transaction():
+            self.books.update(book)
+            self.notify_observers('book_updated', {'isbn': book.isbn, 'fields': fields})
 
     def remove_book(self, isbn: str):
-        self.books.delete(isbn)
-        self.notify_observers('book_removed', {'isbn': isbn})
+        with self.transaction():
+            self.books.delete(isbn)
+            self.notify_observers('book_removed', {'isbn': isbn})
 
     def register_user(self, user: User):
-        self.users.add(user)
-        self.notify_observers('user_registered', {'user_id': user.user_id})
+        with self.transaction():
+            self.users.add(user)
+            self.notify_observers('user_registered', {'user_id': user.user_id})
+
+    def register_users(self, users: Iterable[User], chunk_size: int = 500) -> int:
+        """Масова реєстрація користувачів з однією подією 'users_registered'"""
+        user_ids: List[str] = []
+
+        def collect():
+            for user in users:
+                user_ids.append(user.user_id)
+                yield user
+
+        with self.transaction():
+            count = self.users.add_many(collect(), chunk_size=chunk_size)
+            if count:
+                self.notify_observers('users_registered', {'user_ids': user_ids, 'count': count})
+        return count
 
     def issue_book(self, isbn: str, user_id: str) -> bool:
-        book = self.books.get(isbn)
-        user = self.users.get(user_id)
-        if book and user and book.available:
+        """
+        Видача без попередніх читань: доступність книги й наявність читача
+        перевіряє сам умовний запис у сховищі (без гонки між клієнтами)
+        """
+        with self.transaction():
             today = datetime.date.today().isoformat()
-            self.loans.issue(isbn, user_id, today)
+            if not self.loans.issue(isbn, user_id, today):
+                return False
             self.notify_observers('book_issued', {'isbn': isbn, 'user_id': user_id})
             return True
-        return False
 
     def return_book(self, isbn: str, user_id: str) -> bool:
-        self.loans.return_book(isbn, user_id)
-        self.notify_observers('book_returned', {'isbn': isbn, 'user_id': user_id})
-        return True
-
-    def search_books(self, **criteria) -> List[Book]:
-        all_books = self.books.list_all()
-        def match(b: Book):
-            for k, v in criteria.items():
-                attr = getattr(b, k)
-                if isinstance(attr, str) and isinstance(v, str):
-                    if v.lower() not in attr.lower():
-                        return False
-                elif attr != v:
-                    return False
+        """False, якщо ця книга не була видана цьому читачеві"""
+        with self.transaction():
+            if not self.loans.return_book(isbn, user_id):
+                return False
+            self.notify_observers('book_returned', {'isbn': isbn, 'user_id': user_id})
             return True
-        return [b for b in all_books if match(b)]
-
-    def list_overdue(self, max_days: int = 30) -> List[str]:
-        overdue = []
-        today = datetime.date.today()
-        for isbn in self.loans.list_issued():
-            book = self.books.get(isbn)
-            if book and book.issue_date and (today - book.issue_date).days > max_days:
-                overdue.append(isbn)
-        return overdue
+
+    def search_books(self, *, limit: Optional[int] = None, offset: int = 0, **criteria) -> List[Book]:
+        """
+        Пошук книг: рядкові критерії — регістронезалежний підрядок, решта — рівність.
+        Кортеж (від, до) — діапазон включно, None — відкрита межа: year=(2000, None).
+        Значення має тип атрибута книги (year=2000, не "2000"), інакше ValueError.
+        Фільтрація виконується у сховищі, а не перебором усього каталогу.
+        """
+        return self.books.search(criteria, limit=limit, offset=offset)
+
+    def full_text_search(self, query: str, limit: int = 50) -> List[Book]:
+        """Ранжований пошук за ключовими словами в назві, авторі та жанрі"""
+        return self.books.full_text_search(query, limit=limit)
+
+    def list_overdue(self, max_days: int = 30, limit: Optional[int] = None) -> List[Book]:
+        """Книги, видані більше ніж max_days днів тому (один запит до сховища)"""
+        cutoff = datetime.date.today() - datetime.timedelta(days=max_days)
+        return self.loans.list_overdue(cutoff.isoformat(), limit)
+
+    def library_stats(self) -> dict:
+        """Лічильники для рядка стану: з підсумкових таблиць, без перегляду каталогу"""
+        return {
+            'books': self.books.count(),
+            'available': self.books.count_available(),
+            'active_loans': self.loans.count_active(),
+        }
+
+    def circulation_report(self, top_n: int = 10) -> dict:
+        """
+        Звіт про обіг: видачі за жанрами й роками видання, частка доступних,
+        розподіл times_issued, top-N авторів і жанрів. Рахується векторно
+        над колонковим знімком каталогу (service.analytics, потребує numpy).
+        """
+        # numpy — необов'язкова залежність, тому імпорт лише тут
+        from service.analytics import CirculationSnapshot
+        return CirculationSnapshot.load(self.books).report(top_n)
+
+    def snapshot(self):
+        """
+        Узгоджене читання кількох запитів (транзакція лише для читання, записувачі
+        в інших потоках не блокуються). Без одиниці роботи — звичайні запити.
+        """
+        return self.uow.snapshot() if self.uow else nullcontext()
+
+    def export(self, kind: str, fmt: Optional[str], out) -> int:
+        """
+        Потоковий експорт 'books', 'users' або 'issued_books' у CSV/JSONL ('csv.gz', 'jsonl.gz' — стиснено).
+        out — шлях або потік; рядки читаються пачками з одного знімка бази.
+        Повертає кількість експортованих рядків.
+        """
+        from data_io.exporter import export_rows
+        repos = {'books': self.books, 'users': self.users, 'issued_books': self.loans}
+        if kind not in repos:
+            raise ValueError(f"Unknown export kind {kind!r}, expected one of {sorted(repos)}")
+        repo = repos[kind]
+        with self.snapshot():
+            return export_rows(repo.EXPORT_COLUMNS, repo.row_batches(), fmt, out)
@@ -0,0 +1,327 @@
+from tkinter import ttk
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# Скільки рядків читати з джерела понад видимі з кожного боку
+PREFETCH_ROWS = 200
+
+
+def _sort_value(item, attr: str) -> tuple:
+    # Як у SQLite: NULL менший за будь-яке значення
+    value = getattr(item, attr)
+    return value is not None, value
+
+
+class ListSource:
+    """
+    Джерело рядків для VirtualTreeview поверх готового списку
+    (результати пошуку, прострочені книги). Сортування — в пам'яті.
+    """
+    def __init__(self, items: Sequence):
+        self._items = list(items)
+
+    def count(self) -> int:
+        return len(self._items)
+
+    def fetch_window(self, offset: int, limit: int, order_by: Optional[str] = None,
+                     descending: bool = False) -> list:
+        items = self._items
+        if order_by is not None:
+            items = sorted(items, key=lambda item: _sort_value(item, order_by), reverse=descending)
+        elif descending:
+            items = items[::-1]
+        return items[offset:offset + limit]
+
+
+class VirtualTreeview(ttk.Frame):
+    """
+    Віртуалізований список на ttk.Treeview. У віджеті існує лише стільки рядків,
+    скільки видно на екрані; дані читаються з джерела (репозиторій або ListSource)
+    через source.fetch_window(offset, limit, order_by, descending) у фоновому
+    worker-і, з запасом PREFETCH_ROWS рядків навколо видимої частини.
+    Клік по заголовку колонки сортує список на боці джерела (для репозиторію — в SQL).
+
+    Завантажені рядки утворюють модель key → об'єкт: після змін у базі
+    update_item/insert_item/remove_key латають лише зачеплені рядки,
+    а перемальовування збирається в одне на цикл подій.
+
+    columns — кортежі (атрибут, заголовок, ширина); атрибут є також ключем сортування.
+    key — атрибут-первинний ключ (isbn, user_id).
+    """
+    def __init__(
+        self,
+        master,
+        worker,
+        columns: List[Tuple[str, str, int]],
+        format_row: Callable[[object], tuple],
+        key: str,
+        empty_text: str = "",
+        height: int = 20,
+    ):
+        super().__init__(master)
+        self._worker = worker
+        self._columns = columns
+        self._format_row = format_row
+        self._default_format = format_row
+        self.key = key
+        self.empty_text = empty_text
+        self._request_key = f"virtual_list:{id(self)}"
+
+        self.source = None
+        self.total = 0
+        self.offset = 0
+        self.order_by: Optional[str] = None
+        self.descending = False
+        self._visible = height
+        # Кешований суцільний діапазон рядків [_start, _start + len(_rows)) і модель за ключем
+        self._start = 0
+        self._rows: list = []
+        self._model: Dict[object, object] = {}
+        # generation — інше джерело/сортування; version — локальні латки поверх завантаженого
+        self._generation = 0
+        self._version = 0
+        self._pending: Optional[tuple] = None
+        self._render_scheduled = False
+
+        self.tree = ttk.Treeview(
+            self, columns=[c[0] for c in columns], show="headings", selectmode="browse", height=height
+        )
+        for attr, heading, width in columns:
+            self.tree.heading(attr, text=heading, command=lambda a=attr: self.sort_by(a))
+            self.tree.column(attr, width=width, stretch=True)
+        self.scrollbar = ttk.Scrollbar(self, orient="vertical", command=self._on_scrollbar)
+        self.scrollbar.pack(side="right", fill="y")
+        self.tree.pack(side="left", fill="both", expand=True)
+
+        self.tree.bind("<Configure>", self._on_configure)
+        self.tree.bind("<MouseWheel>", self._on_mousewheel)
+        self.tree.bind("<Button-4>", lambda e: self.scroll(-3))
+        self.tree.bind("<Button-5>", lambda e: self.scroll(3))
+        self.tree.bind("<Prior>", lambda e: self.scroll(-self._visible))
+        self.tree.bind("<Next>", lambda e: self.scroll(self._visible))
+
+    def set_source(self, source, format_row: Optional[Callable[[object], tuple]] = None) -> None:
+        """Показує інше джерело з початку списку, зберігаючи вибране сортування"""
+        self.source = source
+        self._format_row = format_row or self._default_format
+        self.offset = 0
+        self.refresh()
+
+    def refresh(self) -> None:
+        """Перечитує кількість рядків і видиму частину"""
+        if self.source is None:
+            return
+        self._reset()
+        self._request_count()
+
+    def sort_by(self, attr: str) -> None:
+        """Клік по заголовку: нова колонка — за зростанням, повторний — зміна напрямку"""
+        if self.order_by == attr:
+            self.descending = not self.descending
+        else:
+            self.order_by, self.descending = attr, False
+        for column, heading, _ in self._columns:
+            mark = (" ▼" if self.descending else " ▲") if column == attr else ""
+            self.tree.heading(column, text=heading + mark)
+        self.offset = 0
+        self._reset()
+        self._render()
+
+    def scroll(self, rows: int) -> str:
+        self._scroll_to(self.offset + rows)
+        return "break"
+
+    def update_item(self, item) -> None:
+        """Запис змінився: оновлюємо його рядок, якщо він завантажений"""
+        old = self._model.get(getattr(item, self.key))
+        if old is None:
+            if self.order_by not in (None, self.key):
+                # Запис поза кешем міг переміститися відносно видимих рядків
+                self.refresh()
+            return
+        self._changed()
+        if self._sort_key(old) == self._sort_key(item):
+            self._rows[self._rows.index(old)] = item
+            self._model[getattr(item, self.key)] = item
+        else:
+            self._take(old)
+            self._place(item)
+        self._schedule_render()
+
+    def insert_item(self, item) -> None:
+        """Новий запис: вставляємо на його місце в порядку сортування"""
+        if getattr(item, self.key) in self._model:
+            self.update_item(item)
+            return
+        self._changed()
+        self._place(item)
+        self._schedule_render()
+
+    def remove_key(self, key) -> None:
+        """Запис видалено: прибираємо рядок без перечитування вікна"""
+        old = self._model.get(key)
+        if old is None:
+            # Позиція невідома (рядок поза кешем або його й не було) — перечитуємо вікно
+            self.refresh()
+            return
+        self._changed()
+        self._take(old)
+        self._schedule_render()
+
+    def _sort_key(self, item) -> tuple:
+        return _sort_value(item, self.order_by or self.key), _sort_value(item, self.key)
+
+    def _place(self, item) -> None:
+        key = self._sort_key(item)
+        if self.descending:
+            index = sum(1 for row in self._rows if self._sort_key(row) > key)
+        else:
+            index = sum(1 for row in self._rows if self._sort_key(row) < key)
+        end = self._start + len(self._rows)
+        old_total, self.total = self.total, self.total + 1
+        if index == 0 and self._start > 0:
+            # Десь перед кешованим діапазоном: весь діапазон зсувається на позицію
+            position = self._start - 1
+            self._start += 1
+        elif index == len(self._rows) and end < old_total:
+            # Після кешованого діапазону: видимих рядків не зачіпає
+            return
+        else:
+            position = self._start + index
+            self._rows.insert(index, item)
+            self._model[getattr(item, self.key)] = item
+        if position < self.offset:
+            # Тримаємо на екрані ті самі рядки
+            self.offset += 1
+
+    def _take(self, item) -> None:
+        index = self._rows.index(item)
+        del self._rows[index]
+        del self._model[getattr(item, self.key)]
+        self.total -= 1
+        if self._start + index < self.offset:
+            self.offset -= 1
+
+    def _reset(self) -> None:
+        self._generation += 1
+        self._start, self._rows, self._model = 0, [], {}
+        self._pending = None
+
+    def _changed(self) -> None:
+        # Запити, відправлені до латки, могли прочитати старий стан — їхні результати відкидаються
+        self._version += 1
+        self._pending = None
+
+    def _request_count(self) -> None:
+        generation, version = self._generation, self._version
+        self._worker.submit(
+            self.source.count,
+            key=f"{self._request_key}:count",
+            on_success=lambda total: self._on_count(generation, version, total),
+        )
+
+    def _on_count(self, generation: int, version: int, total: int) -> None:
+        if generation != self._generation:
+            return
+        if version != self._version:
+            self._request_count()
+            return
+        self.total = total
+        self._scroll_to(self.offset)
+
+    def _scroll_to(self, offset: int) -> None:
+        self.offset = max(0, min(offset, self.total - self._visible))
+        self._render()
+
+    def _on_scrollbar(self, action, *args) -> None:
+        if action == "moveto":
+            self._scroll_to(int(float(args[0]) * self.total))
+        elif action == "scroll":
+            step = self._visible if args[1] == "pages" else 1
+            self._scroll_to(self.offset + int(args[0]) * step)
+
+    def _on_mousewheel(self, event) -> str:
+        # Windows: крок 120 на «клац», macOS: дрібні значення
+        delta = event.delta // 120 if abs(event.delta) >= 120 else event.delta
+        return self.scroll(-3 * delta)
+
+    def _on_configure(self, event) -> None:
+        row_height = int(ttk.Style().lookup("Treeview", "rowheight") or 20)
+        # Мінус рядок на заголовки колонок
+        visible = max(1, event.height // row_height - 1)
+        if visible != self._visible:
+            self._visible = visible
+            self._scroll_to(self.offset)
+
+    def _schedule_render(self) -> None:
+        if not self._render_scheduled:
+            self._render_scheduled = True
+            self.after_idle(self._scheduled_render)
+
+    def _scheduled_render(self) -> None:
+        self._render_scheduled = False
+        self._scroll_to(self.offset)
+
+    def _render(self) -> None:
+        self._update_scrollbar()
+        if self.source is None:
+            return
+        if self.total == 0:
+            self._fill([])
+            if self.empty_text:
+                self.tree.insert("", "end", values=(self.empty_text,))
+            return
+        last = min(self.offset + self._visible, self.total)
+        end = self._start + len(self._rows)
+        if not (self._start <= self.offset and last <= end):
+            # Поки вікно читається, на екрані лишається попередній вміст
+            self._load()
+            return
+        self._fill(self._rows[self.offset - self._start:last - self._start])
+        if (self.offset - self._start < self._visible and self._start > 0) or \
+                (end - last < self._visible and end < self.total):
+            # Видима частина підходить до краю кешу — підвантажуємо наперед
+            self._load()
+
+    def _fill(self, items: list) -> None:
+        self.tree.delete(*self.tree.get_children())
+        for item in items:
+            self.tree.insert("", "end", values=self._format_row(item))
+
+    def _load(self) -> None:
+        start = max(0, self.offset - PREFETCH_ROWS)
+        limit = self._visible + 2 * PREFETCH_ROWS
+        last = min(self.offset + self._visible, self.total)
+        pending = self._pending
+        if pending and pending[:2] == (self._generation, self._version) \
+                and pending[2] <= self.offset and last <= pending[3]:
+            return
+        generation, version = self._generation, self._version
+        self._pending = (generation, version, start, start + limit)
+        # Один ключ на список: під час швидкої прокрутки проміжні запити витісняються
+        self._worker.submit(
+            self.source.fetch_window,
+            start,
+            limit,
+            self.order_by,
+            self.descending,
+            key=f"{self._request_key}:window",
+            on_success=lambda rows: self._on_loaded(generation, version, start, limit, rows),
+        )
+
+    def _on_loaded(self, generation: int, version: int, start: int, limit: int, rows: list) -> None:
+        if generation != self._generation:
+            return
+        self._pending = None
+        if version == self._version:
+            self._start, self._rows = start, rows
+            self._model = {getattr(item, self.key): item for item in rows}
+            if len(rows) < limit:
+                # Джерело коротше, ніж вважалось (рядки видалено іншим клієнтом)
+                self.total = start + len(rows)
+        self._scroll_to(self.offset)
+
+    def _update_scrollbar(self) -> None:
+        if self.total <= self._visible:
+            self.scrollbar.set(0.0, 1.0)
+        else:
+            self.scrollbar.set(self.offset / self.total, (self.offset + self._visible) / self.total)